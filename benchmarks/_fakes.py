@@ -0,0 +1,272 @@
+"""벤치마크/부하 테스트용 Discord 대역 (채널/메시지/Interaction)
+
+실제 게이트웨이 없이 poker.py의 슬래시 커맨드 콜백과 버튼 콜백을 그대로 호출할 수 있게
+send/edit 등을 기록만 하는 가짜 객체들. REST 지연과 429는 Rest 객체로 주입한다.
+"""
+import asyncio
+import itertools
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_ids = itertools.count(10**17)
+
+
+class Rest:
+    """가짜 REST 비용: latency초 대기, rate_limit_p 확률로 429 (retry_after만큼 추가 대기 후 재시도)"""
+
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit_p=0.0, retry_after=0.5):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_p = rate_limit_p
+        self.retry_after = retry_after
+        self.calls = 0
+        self.rate_limited = 0
+
+    async def __call__(self):
+        self.calls += 1
+        delay = self.latency + (random.random() * self.jitter if self.jitter else 0.0)
+        if self.rate_limit_p and random.random() < self.rate_limit_p:
+            self.rate_limited += 1
+            delay += self.retry_after
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+NO_REST = Rest()
+
+
+class FakeMessage:
+    __slots__ = ("id", "channel", "content", "view", "embed", "files", "edits")
+
+    def __init__(self, channel, content=None, view=None, embed=None, files=0):
+        self.id = next(_ids)
+        self.channel = channel
+        self.content = content
+        self.view = view
+        self.embed = embed
+        self.files = files
+        self.edits = 0
+
+    async def edit(self, **kwargs):
+        await self.channel.rest()
+        self.edits += 1
+        for k in ("content", "view", "embed"):
+            if k in kwargs:
+                setattr(self, k, kwargs[k])
+        return self
+
+
+class FakeGuild:
+    def __init__(self, guild_id=1):
+        self.id = guild_id
+
+
+class FakeChannel:
+    def __init__(self, channel_id=None, rest=NO_REST, keep=200, guild_id=1):
+        self.id = channel_id or next(_ids)
+        self.guild = FakeGuild(guild_id) # FakeInteraction.guild_id 기본값과 같은 서버
+        self.rest = rest
+        self.keep = keep # 최근 메시지만 보관 (부하 테스트 메모리 측정 왜곡 방지)
+        self.messages = []
+        self.sent = 0
+
+    async def send(self, content=None, *, view=None, embed=None, file=None, files=None, **kwargs):
+        await self.rest()
+        self.sent += 1
+        msg = FakeMessage(self, content, view, embed, 1 if file else len(files or ()))
+        self.messages.append(msg)
+        if len(self.messages) > self.keep:
+            del self.messages[: len(self.messages) - self.keep]
+        return msg
+
+    async def fetch_message(self, message_id):
+        await self.rest()
+        for m in reversed(self.messages):
+            if m.id == message_id:
+                return m
+        raise LookupError(message_id)
+
+    def last_view(self, cls_name):
+        for m in reversed(self.messages):
+            if m.view is not None and type(m.view).__name__ == cls_name:
+                return m
+        return None
+
+
+class FakeResponse:
+    def __init__(self, inter):
+        self._inter = inter
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def _respond(self, kind, content=None, **kwargs):
+        if self._done:
+            raise RuntimeError("interaction already responded")
+        await self._inter.channel.rest()
+        self._done = True
+        self._inter.responded_at = asyncio.get_running_loop().time()
+        self._inter.replies.append((kind, content, kwargs))
+
+    async def send_message(self, content=None, **kwargs):
+        await self._respond("send", content, **kwargs)
+
+    async def edit_message(self, content=None, **kwargs):
+        await self._respond("edit", content, **kwargs)
+
+    async def defer(self, **kwargs):
+        await self._respond("defer", None, **kwargs)
+
+    async def send_modal(self, modal):
+        await self._respond("modal", None, modal=modal)
+
+
+class FakeFollowup:
+    def __init__(self, inter):
+        self._inter = inter
+
+    async def send(self, content=None, **kwargs):
+        await self._inter.channel.rest()
+        self._inter.replies.append(("followup", content, kwargs))
+        return FakeMessage(self._inter.channel, content, kwargs.get("view"))
+
+
+class _Perms:
+    def __init__(self, admin):
+        self.administrator = admin
+
+
+class FakeUser:
+    def __init__(self, uid, admin=False):
+        self.id = uid
+        self.name = f"user{uid}"
+        self.guild_permissions = _Perms(admin)
+
+
+class FakeInteraction:
+    def __init__(self, uid, channel, admin=False, message=None, guild_id=1):
+        self.user = FakeUser(uid, admin)
+        self.channel = channel
+        self.channel_id = channel.id
+        self.guild_id = guild_id
+        self.message = message
+        self.replies = []
+        self.created_at = asyncio.get_running_loop().time()
+        self.responded_at = None
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+
+def install(poker, channels, db_path, snapshot_path, fast_sleep=True):
+    """poker 모듈이 가짜 채널을 쓰도록 연결. channels: {channel_id: FakeChannel}"""
+    poker.DB_PATH = db_path
+    poker.SNAPSHOT_PATH = snapshot_path
+    poker.CARDS_DIR = os.path.join(ROOT, "cards")
+    poker.PREFLOP_EQUITY_PATH = os.path.join(ROOT, "preflop_equity.bin")
+    poker.bot.get_channel = channels.get
+    if fast_sleep and not getattr(asyncio.sleep, "_fake", False):
+        # 스트리트 사이 연출용 sleep(1)만 건너뜀 (카운트다운 등 다른 대기는 그대로)
+        real_sleep = asyncio.sleep
+
+        async def sleep(delay, result=None):
+            return await real_sleep(0 if delay == 1 else delay, result)
+
+        sleep._fake = True
+        asyncio.sleep = sleep
+
+
+def random_policy(rng=random, fold_p=0.15, raise_p=0.15, raise_amt=40):
+    """(actor_id, need_to_call) -> 'check'/'call'/'raise'/'fold', raise면 금액도"""
+    def policy(uid, need):
+        r = rng.random()
+        if need > 0 and r < fold_p:
+            return "fold", 0
+        if r < fold_p + raise_p:
+            return "raise", raise_amt
+        return ("call" if need > 0 else "check"), 0
+    return policy
+
+
+async def seat_players(poker, channel, uids, min_coins=500):
+    """uids를 실제 /참가로 로비에 앉힘. 파산했거나 코인이 min_coins 미만이면 DB에서 먼저 채워줌"""
+    for uid in uids:
+        row = await poker.get_character(uid)
+        if row and row[1] < min_coins:
+            async with poker.db_connect("loadtest_topup") as db:
+                await db.execute("UPDATE character SET coin=? WHERE user_id=?", (min_coins, uid))
+                await db.commit()
+            poker.char_cache.put(uid, row[0], min_coins, row[2])
+        if uid in poker.players:
+            p = poker.players[uid]
+            p.coins = max(p.coins, min_coins)
+        else:
+            await poker.참가.callback(FakeInteraction(uid, channel))
+
+
+async def _finish_pending_views(poker, channel):
+    """단독 승리 뷰가 떠 있으면 '숨기기'로 닫음. 닫았으면 True"""
+    msg = channel.last_view("WinnerOptionsView")
+    if msg and not msg.view.already_acted:
+        view = msg.view
+        inter = FakeInteraction(view.winner_uid, channel, message=msg)
+        if await view.interaction_check(inter):
+            await view._hide.callback(inter)
+            return True
+    return False
+
+
+async def play_hand(poker, channel, starter_uid, policy, on_action=None, max_actions=200, start=True):
+    """
+    /시작부터 end_game까지 실제 커맨드/버튼 콜백으로 한 핸드를 진행.
+    on_action(inter)는 응답이 끝난 각 Interaction마다 호출 (지연 측정용). 진행한 액션 수 반환
+    start=False면 이미 (자동 진행으로) 시작된 핸드를 이어서 진행
+    """
+    game = poker.game
+    if start:
+        inter = FakeInteraction(starter_uid, channel)
+        await poker.시작.callback(inter)
+        if on_action: on_action(inter)
+    actions = 0
+    while game.game_started and game.channel_id == channel.id and actions < max_actions:
+        msg = channel.last_view("ActionPromptView")
+        if msg is None or msg.id != game.last_prompt_msg_id:
+            if not await _finish_pending_views(poker, channel):
+                break # 더 진행할 수 있는 버튼이 없음
+            continue
+        actor = game.turn_order[game.idx]
+        prompt_btn = msg.view.children[0]
+        inter = FakeInteraction(actor, channel, message=msg)
+        await prompt_btn.callback(inter)
+        if on_action: on_action(inter)
+        kind, _, kw = inter.replies[-1]
+        action_view = kw.get("view")
+        if action_view is None:
+            break
+        p = poker.players[actor]
+        action, amount = policy(actor, max(0, game.current_bet - p.bet))
+        button = next(b for b in action_view.children if b.action == action)
+        if button.item.disabled:
+            button = next(b for b in action_view.children if b.action in ("check", "call") and not b.item.disabled)
+            action = button.action
+        inter = FakeInteraction(actor, channel)
+        await button.callback(inter)
+        if action == "raise":
+            modal = inter.replies[-1][2]["modal"]
+            modal.amount._value = str(amount)
+            inter = FakeInteraction(actor, channel)
+            await modal.on_submit(inter)
+        elif action == "fold":
+            fold_view = inter.replies[-1][2].get("view")
+            if fold_view is not None:
+                fold_inter = FakeInteraction(actor, channel)
+                await fold_view._hide.callback(fold_inter)
+        if on_action: on_action(inter)
+        actions += 1
+        await _finish_pending_views(poker, channel)
+    await _finish_pending_views(poker, channel)
+    return actions
@@ -0,0 +1,56 @@
+"""핸드 스냅샷 저장 비용 측정 (save_snapshot 1회당 시간/바이트)
+
+    python benchmarks/bench_snapshot.py [--repeat 2000]
+
+임시 디렉터리에 저장하므로 실제 스냅샷 파일은 건드리지 않는다.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import poker  # noqa: E402
+
+
+def setup_table(seats):
+    poker.players.clear()
+    poker.game.reset(channel_id=1234567890123, dealer_pos=0)
+    for uid in range(seats):
+        poker.players[100000000000000000 + uid] = poker.Player(name=f"player{uid}", coins=1000)
+    poker.game.turn_order.extend(poker.players)
+    poker.game.game_started = True
+    poker.game.round = "flop"
+    poker.deal_hole()
+    deck = poker.game.deck
+    poker.game.community.extend((deck.pop(), deck.pop(), deck.pop()))
+    poker.game.deadline_ts = int(time.time()) + 120
+    for uid, p in poker.players.items():
+        p.bet = random.choice((0, 20, 40))
+        if p.bet:
+            poker.game.acted.add(uid)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=2000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        poker.SNAPSHOT_PATH = os.path.join(tmp, "hand_snapshot.json")
+        print(f"{'seats':>5}{'bytes':>8}{'us/save':>10}")
+        for seats in (2, 6, 10):
+            setup_table(seats)
+            poker.save_snapshot()
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                poker.save_snapshot()
+            elapsed = (time.perf_counter() - t0) / args.repeat
+            size = os.path.getsize(poker.SNAPSHOT_PATH)
+            print(f"{seats:>5}{size:>8}{elapsed * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
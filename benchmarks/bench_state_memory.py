@@ -0,0 +1,82 @@
+"""테이블 1개당 메모리 측정 (대기 중 / 핸드 진행 중)
+
+    python benchmarks/bench_state_memory.py [--tables 1000] [--seats 6]
+
+예전 dict 기반 구조와 Player/GameState(__slots__) 구조를 같은 조건에서 비교한다.
+"""
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from poker import Player, GameState, create_deck  # noqa: E402
+
+
+def legacy_table(seats, active):
+    players = {}
+    for uid in range(seats):
+        players[uid] = {"name": f"player{uid}", "coins": 1000, "bet": 0, "contrib": 0,
+                        "cards": [], "folded": False, "all_in": False, "afk_kicked": False}
+    game = {
+        "deck": [], "community": [], "pot": 0, "round": None,
+        "turn_order": [], "idx": 0, "current_bet": 0, "acted": set(),
+        "game_started": False, "last_prompt_msg_id": None, "channel_id": None,
+        "dealer_pos": -1, "sb": 10, "bb": 20,
+        "timer_task": None, "deadline_ts": None,
+    }
+    if active:
+        deck = create_deck(); random.shuffle(deck)
+        game["deck"] = deck
+        game["turn_order"] = list(players)
+        game["game_started"] = True
+        for p in players.values():
+            p["cards"] = [deck.pop(), deck.pop()]
+        game["community"] = [deck.pop(), deck.pop(), deck.pop()]
+    return players, game
+
+
+def slotted_table(seats, active):
+    players = {uid: Player(name=f"player{uid}", coins=1000) for uid in range(seats)}
+    game = GameState()
+    if active:
+        deck = game.deck
+        deck[:] = create_deck(); random.shuffle(deck)
+        game.turn_order.extend(players)
+        game.game_started = True
+        for p in players.values():
+            p.reset_for_hand((deck.pop(), deck.pop()))
+        game.community.extend((deck.pop(), deck.pop(), deck.pop()))
+    return players, game
+
+
+def measure(factory, tables, seats, active):
+    # 카드 문자열 등 공유 객체가 측정에 섞이지 않도록 한 번 미리 만든다
+    factory(seats, active)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    keep = [factory(seats, active) for _ in range(tables)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(s.size_diff for s in after.compare_to(before, "filename"))
+    del keep
+    return total / tables
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tables", type=int, default=1000)
+    ap.add_argument("--seats", type=int, default=6)
+    args = ap.parse_args()
+
+    print(f"tables={args.tables} seats={args.seats}")
+    print(f"{'layout':<10}{'state':<8}{'bytes/table':>14}")
+    for label, factory in (("dict", legacy_table), ("slots", slotted_table)):
+        for state, active in (("idle", False), ("active", True)):
+            per_table = measure(factory, args.tables, args.seats, active)
+            print(f"{label:<10}{state:<8}{per_table:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
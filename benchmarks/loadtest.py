@@ -0,0 +1,250 @@
+"""부하 테스트: 가짜 Discord 위에서 여러 테이블과 수백 명의 유저를 실제 커맨드/버튼 콜백으로 돌린다
+
+    python benchmarks/loadtest.py                                        # 기본 단계 (동시 유저 50,100,200,400)
+    python benchmarks/loadtest.py --users 100,400,1600 --duration 20
+    python benchmarks/loadtest.py --latency 0.08 --jitter 0.04 --rate-limit 0.02 --json out.json
+
+봇의 게임 상태(GameState)는 하나뿐이라 테이블들은 채널을 바꿔 가며 한 핸드씩 번갈아 진행된다
+(이전 테이블 인원은 /퇴장, 다음 테이블 인원은 /참가). 그동안 나머지 유저들은 /조회 /상태 /랭킹 /내핸드를
+무작위 간격으로 동시에 보낸다. 모든 Discord 호출은 --latency/--rate-limit만큼 지연된다.
+
+단계별로 처리량(actions/s), 응답 시간(Interaction 생성 ~ 첫 응답) p50/p99, 이벤트 루프 지연,
+메모리 증가량을 출력하고, p99가 Discord 응답 제한(3초)을 넘거나 처리량이 요청량을 따라가지 못하는
+첫 단계를 현재 단일 프로세스 구조의 한계로 표시한다.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _fakes  # noqa: E402  (poker 경로 설정 포함)
+import poker  # noqa: E402
+
+INTERACTION_DEADLINE = 3.0 # Discord는 3초 안에 응답하지 않은 Interaction을 실패 처리
+SPECTATOR_UID_BASE = 10_000
+
+
+def _rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * (os.sysconf("SC_PAGE_SIZE") // 1024)
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # 리눅스 외: 최대 RSS로 대신
+
+
+def _pct(values, q):
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.actions = 0
+        self.table_actions = 0
+        self.unanswered = 0
+        self.errors = 0
+        self.hands = 0
+        self.closed = False
+
+    def record(self, inter, table=False):
+        if self.closed: return # 측정 구간이 끝난 뒤 도착한 응답은 제외
+        self.actions += 1
+        if table: self.table_actions += 1
+        if inter.responded_at is None:
+            self.unanswered += 1
+        else:
+            self.latencies.append(inter.responded_at - inter.created_at)
+
+
+async def _lag_probe(stop, lags, interval=0.05):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - t0 - interval)
+
+
+async def _spectator(uid, channels, stats, stop, rng, think):
+    commands = (poker.조회.callback, poker.상태.callback, poker.랭킹.callback, poker.내핸드.callback)
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), rng.expovariate(1 / think))
+            break
+        except asyncio.TimeoutError:
+            pass
+        inter = _fakes.FakeInteraction(uid, rng.choice(channels))
+        try:
+            # 게이트웨이 이벤트처럼 새 태스크로 디스패치 (대기 시간도 응답 시간에 포함)
+            await asyncio.create_task(rng.choice(commands)(inter))
+        except Exception:
+            logging.exception("spectator command failed")
+            stats.errors += 1
+            continue
+        stats.record(inter)
+
+
+async def _table_driver(tables, stats, stop, policy):
+    while not stop.is_set():
+        for channel, uids in tables:
+            if stop.is_set(): break
+            seated = set(uids)
+            for uid in [u for u in poker.players if u not in seated]:
+                await poker.퇴장.callback(_fakes.FakeInteraction(uid, channel))
+            await _fakes.seat_players(poker, channel, uids)
+            try:
+                await _fakes.play_hand(poker, channel, uids[0], policy,
+                                       on_action=lambda inter: stats.record(inter, table=True))
+            except Exception:
+                logging.exception("hand failed")
+                stats.errors += 1
+                await poker.강제종료.callback(_fakes.FakeInteraction(uids[0], channel, admin=True))
+            stats.hands += 1
+
+
+async def _register(uids, channel):
+    for uid in uids:
+        await poker.등록.callback(_fakes.FakeInteraction(uid, channel), f"U{uid}")
+
+
+async def _bulk_register(uids):
+    """관전 유저는 수천 명이라 /등록 대신 한 번에 INSERT (측정 대상 아님)"""
+    async with poker.db_connect("loadtest_register") as db:
+        await db.executemany("INSERT OR IGNORE INTO character (user_id,name,coin,in_game) VALUES (?,?,1000,0)",
+                             [(uid, f"U{uid}") for uid in uids])
+        await db.commit()
+
+
+async def run_step(n_users, tables, channels, args, rng):
+    stats = Stats()
+    lags = []
+    stop = asyncio.Event()
+    spectators = [SPECTATOR_UID_BASE + i for i in range(n_users)]
+    await _bulk_register(spectators)
+
+    gc.collect()
+    rss0 = _rss_kb()
+    heap0 = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    rest_calls0, rest_429_0 = args.rest.calls, args.rest.rate_limited
+
+    t0 = time.perf_counter()
+    tasks = [asyncio.create_task(_lag_probe(stop, lags)),
+             asyncio.create_task(_table_driver(tables, stats, stop, _fakes.random_policy(rng)))]
+    tasks += [asyncio.create_task(_spectator(uid, channels, stats, stop, random.Random(uid), args.think))
+              for uid in spectators]
+    await asyncio.sleep(args.duration)
+    stop.set()
+    stats.closed = True
+    elapsed = time.perf_counter() - t0
+    # 진행 중인 명령과 핸드는 끝까지 돌게 둠 (도중에 취소하면 DB 연결이 잠긴 채 남을 수 있음)
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    gc.collect()
+    lat = stats.latencies
+    return {
+        "users": n_users,
+        "offered_per_s": round(n_users / args.think, 1),
+        "seconds": round(elapsed, 2),
+        "actions": stats.actions,
+        "actions_per_s": round(stats.actions / elapsed, 1),
+        "table_actions_per_s": round(stats.table_actions / elapsed, 1),
+        "hands": stats.hands,
+        "p50_ms": round(_pct(lat, 0.50) * 1000, 1),
+        "p99_ms": round(_pct(lat, 0.99) * 1000, 1),
+        "max_ms": round(max(lat, default=0) * 1000, 1),
+        "over_deadline": sum(1 for x in lat if x > INTERACTION_DEADLINE),
+        "unanswered": stats.unanswered,
+        "errors": stats.errors,
+        "loop_lag_p99_ms": round(_pct(lags, 0.99) * 1000, 1),
+        "rest_calls": args.rest.calls - rest_calls0,
+        "rest_429": args.rest.rate_limited - rest_429_0,
+        "rss_growth_kb": _rss_kb() - rss0,
+        "heap_growth_kb": None if heap0 is None else (tracemalloc.get_traced_memory()[0] - heap0) // 1024,
+    }
+
+
+def find_limit(steps):
+    """p99가 응답 제한을 넘거나, 처리량이 요청량의 80%에 못 미치거나, 유저가 늘었는데 처리량이 5% 이상 늘지 않은 첫 단계"""
+    prev = None
+    for s in steps:
+        if s["p99_ms"] > INTERACTION_DEADLINE * 1000 or s["over_deadline"]:
+            return s["users"], f"p99 {s['p99_ms']:,.0f}ms > {INTERACTION_DEADLINE:.0f}s"
+        spectator_per_s = s["actions_per_s"] - s["table_actions_per_s"]
+        if spectator_per_s < s["offered_per_s"] * 0.8:
+            return s["users"], f"포화 (요청 {s['offered_per_s']}/s 중 {spectator_per_s:.1f}/s 처리)"
+        if prev and s["actions_per_s"] < prev["actions_per_s"] * 1.05:
+            return s["users"], f"처리량 정체 ({prev['actions_per_s']} -> {s['actions_per_s']} actions/s)"
+        prev = s
+    return None, "측정 범위 안에서는 한계에 도달하지 않음"
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    random.seed(args.seed) # Rest의 지연/429 추첨과 덱 셔플 재현용
+    channels = [_fakes.FakeChannel(rest=args.rest) for _ in range(args.tables)]
+    with tempfile.TemporaryDirectory() as tmp:
+        _fakes.install(poker, {c.id: c for c in channels},
+                       os.path.join(tmp, "loadtest.db"), os.path.join(tmp, "snap.json"))
+        await poker.init_db()
+        tables = []
+        uid = 1
+        for channel in channels:
+            tables.append((channel, list(range(uid, uid + args.seats))))
+            uid += args.seats
+        await _register([u for _, uids in tables for u in uids], channels[0])
+
+        if args.tracemalloc:
+            tracemalloc.start()
+        header = (f"{'users':>6}{'offer/s':>9}{'act/s':>9}{'table/s':>9}{'hands':>7}{'p50 ms':>9}{'p99 ms':>9}"
+                  f"{'>3s':>6}{'lag99':>8}{'REST':>8}{'429':>6}{'RSS+KB':>9}")
+        print(header)
+        steps = []
+        for n in args.users:
+            s = await run_step(n, tables, channels, args, rng)
+            steps.append(s)
+            print(f"{s['users']:>6}{s['offered_per_s']:>9}{s['actions_per_s']:>9}{s['table_actions_per_s']:>9}{s['hands']:>7}"
+                  f"{s['p50_ms']:>9}{s['p99_ms']:>9}{s['over_deadline']:>6}{s['loop_lag_p99_ms']:>8}"
+                  f"{s['rest_calls']:>8}{s['rest_429']:>6}{s['rss_growth_kb']:>9}")
+        limit, reason = find_limit(steps)
+        print(f"\n한계: {limit if limit else '-'}명 ({reason})")
+        return {"config": {k: v for k, v in vars(args).items() if k != "rest"},
+                "steps": steps, "limit": {"users": limit, "reason": reason}}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", default="50,100,200,400", help="단계별 동시 유저 수 (쉼표 구분)")
+    ap.add_argument("--tables", type=int, default=4)
+    ap.add_argument("--seats", type=int, default=6)
+    ap.add_argument("--duration", type=float, default=10.0, help="단계당 측정 시간(초)")
+    ap.add_argument("--think", type=float, default=2.0, help="유저 1명의 평균 명령 간격(초)")
+    ap.add_argument("--latency", type=float, default=0.05, help="Discord 호출 1회 지연(초)")
+    ap.add_argument("--jitter", type=float, default=0.02)
+    ap.add_argument("--rate-limit", type=float, default=0.0, help="429 확률")
+    ap.add_argument("--retry-after", type=float, default=0.5)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--tracemalloc", action="store_true", help="파이썬 힙 증가량도 측정 (느려짐)")
+    ap.add_argument("--json", help="결과 JSON 저장 경로")
+    args = ap.parse_args()
+    args.users = [int(x) for x in args.users.split(",")]
+    args.rest = _fakes.Rest(args.latency, args.jitter, args.rate_limit, args.retry_after)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    out = asyncio.run(main_async(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""마이크로 벤치마크 모음
+
+    python benchmarks/run_benchmarks.py                       # 전체 실행, 표 출력
+    python benchmarks/run_benchmarks.py --json out.json       # 결과를 JSON으로 저장
+    python benchmarks/run_benchmarks.py --compare base.json   # 이전 결과 대비 느려진 항목 표시 (느려지면 exit 1)
+    python benchmarks/run_benchmarks.py -k side_pots          # 이름에 문자열이 들어간 항목만
+
+각 항목은 warmup 후 repeat번 측정한 1회당 시간(us)의 중앙값/p90/최솟값을 낸다.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _fakes  # noqa: E402  (poker 경로 설정 포함)
+import poker  # noqa: E402
+
+BENCHMARKS = []
+
+
+def bench(name, number=1000, repeat=7):
+    """number회 실행을 repeat번 측정. fn(rng)는 매 측정마다 호출되는 준비 함수를 돌려줘도 됨"""
+    def deco(fn):
+        BENCHMARKS.append((name, fn, number, repeat))
+        return fn
+    return deco
+
+
+poker.CARDS_DIR = os.path.join(_fakes.ROOT, "cards") # 어느 디렉터리에서 실행해도 실제 이미지로 측정
+poker.PREFLOP_EQUITY_PATH = os.path.join(_fakes.ROOT, "preflop_equity.bin")
+FULL_DECK = poker.create_deck()
+
+
+def _random_hands(rng, n, k):
+    return [rng.sample(FULL_DECK, k) for _ in range(n)]
+
+
+@bench("hand_strength/7cards", number=200)
+def _(rng):
+    hands = _random_hands(rng, 200, 7)
+    it = iter(hands * 100)
+    return lambda: poker.hand_strength(next(it))
+
+
+@bench("score_5cards", number=5000)
+def _(rng):
+    hands = _random_hands(rng, 5000, 5)
+    it = iter(hands * 100)
+    return lambda: poker.score_5cards(next(it))
+
+
+def _side_pot_case(rng, n):
+    poker.players.clear()
+    contrib = {}
+    for uid in range(n):
+        p = poker.Player(name=f"p{uid}", coins=0)
+        p.folded = rng.random() < 0.2
+        poker.players[uid] = p
+        # 올인 금액을 다양하게 (레벨 수 1~n)
+        contrib[uid] = rng.choice((20, 40, 100, 250, 600, 1000, 1000, 1000))
+    return contrib
+
+
+for _n in (2, 4, 6, 10):
+    def _make(n):
+        @bench(f"build_side_pots/{n}p", number=5000)
+        def _(rng):
+            contrib = _side_pot_case(rng, n)
+            return lambda: poker.build_side_pots(contrib)
+    _make(_n)
+
+
+@bench("split_amount/3way", number=20000)
+def _(rng):
+    winners = [111, 222, 333]
+    return lambda: poker.split_amount(1001, winners)
+
+
+for _k in (2, 5):
+    def _make_compose(k):
+        @bench(f"compose/{k}cards/cold", number=1, repeat=5)
+        def _(rng):
+            cards = rng.sample(FULL_DECK, k)  # 매 측정마다 새 카드 조합, warmup 없이 첫 호출
+            return lambda: poker.compose(cards)
+
+        @bench(f"compose/{k}cards/warm", number=20)
+        def _(rng):
+            cards = rng.sample(FULL_DECK, k)
+            poker.compose(cards)
+            return lambda: poker.compose(cards)
+    _make_compose(_k)
+
+
+@bench("compose_rows/3x5cards/warm", number=20)
+def _(rng):
+    cards = rng.sample(FULL_DECK, 9)  # 런 잇 쓰리스: 플랍 공통 + 보드마다 2장
+    rows = [cards[:3] + cards[3 + 2 * r:5 + 2 * r] for r in range(3)]
+    poker.compose_rows(rows)
+    return lambda: poker.compose_rows(rows)
+
+
+@bench("compose_board/hand", number=5)
+def _(rng):
+    # 한 핸드 동안의 보드 요청: 스트리트 3번 + /상태 + 최종 보드 (같은 테이블 캔버스를 이어서 사용)
+    boards = [rng.sample(FULL_DECK, 5) for _ in range(5)]
+    it = iter(boards * 1000)
+
+    def hand():
+        board = next(it)
+        for n in (3, 4, 5, 5, 5):
+            poker.compose_board(1, board[:n])
+    return hand
+
+
+@bench("allin_equity/preflop_hu", number=5000)
+def _(rng):
+    hands = {1: tuple(rng.sample(FULL_DECK, 2))}
+    hands[2] = tuple(rng.sample([c for c in FULL_DECK if c not in hands[1]], 2))
+    return lambda: poker.allin_equity(hands, ())
+
+
+@bench("allin_equity/flop_hu", number=5)
+def _(rng):
+    cards = rng.sample(FULL_DECK, 7)
+    hands = {1: tuple(cards[:2]), 2: tuple(cards[2:4])}
+    return lambda: poker.allin_equity(hands, tuple(cards[4:]))
+
+
+@bench("save_snapshot/6p", number=200)
+def _(rng):
+    poker.players.clear()
+    poker.game.reset(channel_id=1, dealer_pos=0)
+    for uid in range(6):
+        poker.players[uid] = poker.Player(name=f"p{uid}", coins=1000)
+    poker.game.turn_order.extend(poker.players)
+    poker.game.game_started = True
+    poker.deal_hole()
+    return poker.save_snapshot
+
+
+@bench("simulate_hand/6bots", number=200)
+def _(rng):
+    poker.players.clear()
+    poker.game.reset(dealer_pos=-1)
+    seats = {}
+    for uid in range(1, 7):
+        poker.players[uid] = poker.Player(name=f"bot{uid}", coins=1000)
+        seats[uid] = "bot"
+
+    def one():
+        for p in poker.players.values():
+            if p.coins < 20: p.coins = 1000
+        poker.simulate_hand(seats, rng, 10, 20)
+    return one
+
+
+class _HandRunner:
+    """가짜 채널에서 실제 커맨드/버튼 콜백으로 핸드를 반복 진행 (DB는 임시 파일)"""
+
+    def __init__(self, tmp, seats=6):
+        self.loop = asyncio.new_event_loop()
+        self.channel = _fakes.FakeChannel()
+        _fakes.install(poker, {self.channel.id: self.channel},
+                       os.path.join(tmp, "bench.db"), os.path.join(tmp, "snap.json"))
+        self.uids = list(range(1, seats + 1))
+        self.policy = _fakes.random_policy(random.Random(7))
+        self.loop.run_until_complete(self._setup())
+
+    async def _setup(self):
+        poker.players.clear()
+        poker.game.reset(dealer_pos=-1)
+        await poker.init_db()
+        for uid in self.uids:
+            await poker.등록.callback(_fakes.FakeInteraction(uid, self.channel), f"P{uid}")
+            await poker.참가.callback(_fakes.FakeInteraction(uid, self.channel))
+
+    async def _hand(self):
+        # 코인이 바닥난 유저는 다시 채워서 인원 유지
+        await _fakes.seat_players(poker, self.channel, self.uids)
+        await _fakes.play_hand(poker, self.channel, self.uids[0], self.policy)
+        for t in asyncio.all_tasks():
+            if t is not asyncio.current_task() and not t.done():
+                t.cancel()
+
+    def run_one(self):
+        self.loop.run_until_complete(self._hand())
+
+
+@bench("engine/full_hand/6p", number=5, repeat=5)
+def _(rng):
+    runner = _HandRunner(_TMP.name)
+    return runner.run_one
+
+
+def run(names_filter=None):
+    results = {}
+    for name, setup, number, repeat in BENCHMARKS:
+        if names_filter and names_filter not in name:
+            continue
+        rng = random.Random(1234)
+        samples = []
+        for _ in range(repeat):
+            fn = setup(rng)
+            if "/cold" not in name:
+                fn()  # warmup
+            t0 = time.perf_counter()
+            for _ in range(number):
+                fn()
+            samples.append((time.perf_counter() - t0) / number * 1e6)
+        samples.sort()
+        results[name] = {
+            "median_us": round(statistics.median(samples), 3),
+            "p90_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.9))], 3),
+            "min_us": round(samples[0], 3),
+            "number": number,
+            "repeat": repeat,
+        }
+        r = results[name]
+        print(f"{name:<28}{r['median_us']:>14,.1f}{r['p90_us']:>14,.1f}{r['min_us']:>14,.1f}")
+    return results
+
+
+def _meta():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "machine": platform.machine(),
+            "time": int(time.time())}
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, encoding="utf-8") as f:
+        base = json.load(f)["results"]
+    regressed = []
+    print(f"\n{'benchmark':<28}{'base us':>14}{'now us':>14}{'ratio':>8}")
+    for name, r in results.items():
+        if name not in base:
+            continue
+        ratio = r["median_us"] / base[name]["median_us"] if base[name]["median_us"] else 1.0
+        flag = "  <-- 느려짐" if ratio > 1 + threshold else ""
+        if flag:
+            regressed.append(name)
+        print(f"{name:<28}{base[name]['median_us']:>14,.1f}{r['median_us']:>14,.1f}{ratio:>8.2f}{flag}")
+    return regressed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-k", dest="filter", help="이름에 이 문자열이 들어간 항목만 실행")
+    ap.add_argument("--json", help="결과 JSON 저장 경로")
+    ap.add_argument("--compare", help="비교할 이전 결과 JSON")
+    ap.add_argument("--threshold", type=float, default=0.15, help="느려짐 판정 비율 (기본 0.15 = 15%%)")
+    args = ap.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"{'benchmark':<28}{'median us':>14}{'p90 us':>14}{'min us':>14}")
+    results = run(args.filter)
+    out = {"meta": _meta(), "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        regressed = compare(results, args.compare, args.threshold)
+        if regressed:
+            print(f"\n느려진 항목 {len(regressed)}개: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+_TMP = tempfile.TemporaryDirectory()
+
+if __name__ == "__main__":
+    main()
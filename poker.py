@@ -1,12 +1,20 @@
+import time
+_BOOT_TS = time.perf_counter() # 콜드 스타트 시간 측정 기준 (아래 import 포함)
 import discord
 from discord import app_commands
 from discord.ext import commands
 import aiosqlite
-from PIL import Image
-import io, os, random, asyncio
+import aiohttp
+import io, os, random, asyncio, hashlib, types
+import contextlib, contextvars, functools, itertools, mmap, struct, sys, threading, traceback
+from concurrent.futures import ThreadPoolExecutor
 from itertools import combinations
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Optional
 import logging
 import math
+import json
 from datetime import datetime, timedelta
 
 
@@ -15,65 +23,1474 @@ logging.basicConfig(level=logging.INFO)
 
 # ====== 인텐트 최소 권한 권장 ======
 intents = discord.Intents.default()
-bot = commands.Bot(command_prefix="!", intents=intents)
+
+async def _on_http_request_end(session, ctx, params):
+    # 전역/버킷 429 모두 응답 단위로 셈 (재시도는 라이브러리가 내부에서 처리함)
+    if params.response.status == 429:
+        REST_429.inc()
+
+_http_trace = aiohttp.TraceConfig()
+_http_trace.on_request_end.append(_on_http_request_end)
+bot = commands.Bot(command_prefix="!", intents=intents, http_trace=_http_trace)
+
+# 백그라운드 태스크는 참조를 잡아둬야 GC로 사라지지 않음
+_background_tasks = set()
+def spawn(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
 
 # ====== 봇 준비 이벤트 ======
+_READY_TS = None # 첫 on_ready 시각 (핸드 복구까지 걸린 시간 측정용)
+
 @bot.event
 async def on_ready():
+    global _READY_TS
     logging.info(f"Logged in as {bot.user}")
+    if _READY_TS is None:
+        _READY_TS = time.perf_counter()
+        STARTUP_SECONDS.observe(_READY_TS - _BOOT_TS, "ready")
+        logging.info("콜드 스타트 → ready: %.2fs", _READY_TS - _BOOT_TS)
 
 @bot.event
 async def setup_hook():
     try:
-        await init_db()
-        synced = await bot.tree.sync()
-        logging.info("Slash commands synced: %s", [c.name for c in synced])
+        t0 = time.perf_counter()
+        with startup_phase("dynamic_items"):
+            bot.add_dynamic_items(*DYNAMIC_ITEMS)
+        with startup_phase("metrics"):
+            await start_metrics()
+        spawn(deck_pool.run())
+        spawn(_hud_flush_loop())
+        if ANOMALY_DETECTION:
+            spawn(_anomaly_loop())
+        _RENDER_POOL.submit(preload_sprites) # Pillow import + 카드 이미지 로드는 렌더 스레드에서 백그라운드로
+        with startup_phase("db"):
+            await init_db()
+        with startup_phase("settings"):
+            await settings.load()
+        with startup_phase("restore_lobby"):
+            restored = await restore_lobby()
+        with startup_phase("restore_hand"):
+            if load_tourney():
+                logging.info("토너먼트 복구: 참가 %d명, 생존 %d명, 테이블 %d개", len(tourney.names), len(tourney.stacks), len(tourney.tables))
+            snap = load_snapshot()
+            if snap:
+                logging.info("핸드 스냅샷 발견 (%s, %d명), 준비되면 이어서 진행", snap["phase"], len(snap["players"]))
+                spawn(resume_hand(snap))
+        # 커맨드 정의가 바뀐 배포에서만 sync (느린 전역 REST 호출이라 게이트웨이 접속을 막지 않게 백그라운드로)
+        spawn(sync_commands_if_changed())
+        logging.info("setup_hook %.3fs (로비 복구 %d명) — %s", time.perf_counter() - t0, restored,
+                     ", ".join(f"{name} {dt * 1000:.0f}ms" for name, dt in _startup_phases))
     except Exception as e:
         logging.exception("setup_hook failed: %s", e)
 
+# ====== 슬래시 커맨드 sync ======
+COMMAND_HASH_PATH = os.getenv("COMMAND_HASH_PATH", ".command_tree.sha256")
+
+def command_tree_hash():
+    """등록된 커맨드 정의(+ 애플리케이션 ID)의 해시. 바뀌었을 때만 Discord에 sync"""
+    payload = [cmd.to_dict(bot.tree) for cmd in bot.tree.get_commands()]
+    data = json.dumps([bot.application_id, payload], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+async def sync_commands_if_changed():
+    try:
+        with startup_phase("command_sync"):
+            digest = command_tree_hash()
+            try:
+                with open(COMMAND_HASH_PATH, encoding="utf-8") as f:
+                    if f.read().strip() == digest and os.getenv("FORCE_COMMAND_SYNC") != "1":
+                        logging.info("슬래시 커맨드 변경 없음, sync 생략")
+                        return
+            except FileNotFoundError:
+                pass
+            synced = await bot.tree.sync()
+            with open(COMMAND_HASH_PATH, "w", encoding="utf-8") as f:
+                f.write(digest)
+        logging.info("Slash commands synced: %s", [c.name for c in synced])
+    except Exception as e:
+        logging.exception("커맨드 sync 실패 (다음 시작 때 다시 시도): %s", e)
+
 # ====== 카드 이미지 경로/크기 ======
 CARDS_DIR = os.getenv("CARDS_DIR", "./cards")
 CARD_W, CARD_H = 67, 92
 SCALE = 0.9
 GAP = 6
 
+# ====== 메트릭 ======
+# 외부 라이브러리 없이 Prometheus 텍스트 포맷으로 노출.
+# METRICS_PORT가 있으면 http://METRICS_HOST:METRICS_PORT/metrics, METRICS_FILE이 있으면 15초마다 파일로 덤프
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_FILE = os.getenv("METRICS_FILE")
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS = []
+
+def _fmt_labels(label_name, label):
+    return f'{{{label_name}="{label}"}}' if label_name and label is not None else ""
+
+class Counter:
+    __slots__ = ("name", "help", "label_name", "_values")
+    def __init__(self, name, help, label_name=None):
+        self.name, self.help, self.label_name = name, help, label_name
+        self._values = {} if label_name else {None: 0}
+        METRICS.append(self)
+
+    def inc(self, label=None, n=1):
+        self._values[label] = self._values.get(label, 0) + n
+
+    def value(self, label=None):
+        return self._values.get(label, 0)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for label, v in self._values.items():
+            yield f"{self.name}{_fmt_labels(self.label_name, label)} {v}"
+
+class Gauge:
+    """값을 set()하거나, fn을 주면 수집 시점에 fn()으로 계산"""
+    __slots__ = ("name", "help", "fn", "_value")
+    def __init__(self, name, help, fn=None):
+        self.name, self.help, self.fn = name, help, fn
+        self._value = 0
+        METRICS.append(self)
+
+    def set(self, v):
+        self._value = v
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {self.fn() if self.fn else self._value}"
+
+class Histogram:
+    __slots__ = ("name", "help", "label_name", "buckets", "_series")
+    def __init__(self, name, help, label_name=None, buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_name, self.buckets = name, help, label_name, buckets
+        self._series = {} # label -> [bucket counts..., sum, count]
+        METRICS.append(self)
+
+    def observe(self, v, label=None):
+        s = self._series.get(label)
+        if s is None:
+            s = self._series[label] = [0] * (len(self.buckets) + 2)
+        for i, b in enumerate(self.buckets):
+            if v <= b:
+                s[i] += 1
+                break
+        s[-2] += v
+        s[-1] += 1
+
+    @contextlib.contextmanager
+    def time(self, label=None):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, label)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for label, s in self._series.items():
+            extra = f'{self.label_name}="{label}",' if self.label_name and label is not None else ""
+            acc = 0
+            for b, c in zip(self.buckets, s):
+                acc += c
+                yield f'{self.name}_bucket{{{extra}le="{b}"}} {acc}'
+            yield f'{self.name}_bucket{{{extra}le="+Inf"}} {s[-1]}'
+            yield f"{self.name}_sum{_fmt_labels(self.label_name, label)} {s[-2]}"
+            yield f"{self.name}_count{_fmt_labels(self.label_name, label)} {s[-1]}"
+
+HANDLER_SECONDS = Histogram("poker_handler_seconds", "게임 핸들러 처리 시간 (하위 호출/Discord 전송 포함)", "handler")
+COMPOSE_SECONDS = Histogram("poker_compose_seconds", "compose 단계별 시간", "phase")
+COMPOSE_BYTES = Histogram("poker_compose_bytes", "compose 결과 PNG 크기", buckets=(1024, 4096, 16384, 32768, 65536, 131072, 262144))
+DB_SECONDS = Histogram("poker_db_seconds", "DB 작업 시간", "op")
+REST_CALLS = Counter("poker_discord_rest_calls_total", "Discord REST 호출 수")
+REST_429 = Counter("poker_discord_rate_limited_total", "Discord 429 응답 수")
+REST_PER_HAND = Histogram("poker_discord_rest_calls_per_hand", "핸드당 Discord REST 호출 수", buckets=(5, 10, 20, 40, 60, 80, 120, 200))
+LOOP_LAG = Histogram("poker_event_loop_lag_seconds", "이벤트 루프 지연")
+LOOP_STALLS = Counter("poker_event_loop_stalls_total", "워치독이 감지한 이벤트 루프 정지 횟수", "handler")
+STARTUP_SECONDS = Histogram("poker_startup_seconds", "콜드 스타트 단계별 시간", "phase")
+_TIMED_NAMES = set() # 워치독이 스택에서 핸들러 이름을 찾을 때 사용
+_startup_phases = [] # [(단계, 초)] — setup_hook 로그용
+
+@contextlib.contextmanager
+def startup_phase(name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        STARTUP_SECONDS.observe(dt, name)
+        _startup_phases.append((name, dt))
+
+def timed(name):
+    """async 핸들러의 처리 시간을 HANDLER_SECONDS{handler=name}에 기록 (+ 트레이스 span)"""
+    def deco(fn):
+        _TIMED_NAMES.add(fn.__name__)
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                with tracer.span(name, round=game.round):
+                    return await fn(*args, **kwargs)
+            finally:
+                HANDLER_SECONDS.observe(time.perf_counter() - t0, name)
+        return wrapper
+    return deco
+
+def render_metrics():
+    return "\n".join(line for m in METRICS for line in m.render()) + "\n"
+
+def install_rest_metrics():
+    """bot.http.request를 감싸 REST 호출 수를 셈. 핸드별 수는 game.rest_calls에 누적"""
+    orig_request = bot.http.request
+
+    async def request(route, **kwargs):
+        REST_CALLS.inc()
+        if game.game_started:
+            game.rest_calls += 1
+        with tracer.span("discord", route=f"{route.method} {route.path}"):
+            return await orig_request(route, **kwargs)
+
+    bot.http.request = request
+
+# ====== Interaction 응답 (3초 제한) ======
+# Discord는 Interaction 생성 후 3초 안에 첫 응답(ACK)이 없으면 실패 처리한다.
+# 커맨드/버튼 콜백은 @interaction_handler로 감싸고 응답은 respond()/respond_edit()/defer()로 보낸다 → ACK까지 걸린 시간 기록.
+# 렌더링·DB가 무거운 경로는 먼저 defer()하고, 작업(compose는 compose_async로 렌더 스레드에서) 후 respond()가 followup으로 보냄
+INTERACTION_DEADLINE = 3.0
+ACK_SECONDS = Histogram("poker_interaction_ack_seconds", "Interaction 생성 ~ 첫 응답(ACK) 시간", "handler",
+                        buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 5.0))
+ACK_LATE = Counter("poker_interaction_ack_late_total", "3초 안에 ACK하지 못한 Interaction 수", "handler")
+_interaction_ctx = contextvars.ContextVar("poker_interaction", default=None) # [핸들러 이름, 기준 시각, ACK 여부]
+
+def interaction_handler(name):
+    """커맨드/컴포넌트 콜백용. 기준 시각은 Interaction 생성 시각(스노플레이크), 없으면 핸들러 시작 시각"""
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            inter = next((a for a in args if hasattr(a, "response") and hasattr(a, "followup")), None)
+            created = getattr(inter, "created_at", None)
+            base = created.timestamp() if isinstance(created, datetime) else time.time()
+            token = _interaction_ctx.set([name, base, False])
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                _interaction_ctx.reset(token)
+        return wrapper
+    return deco
+
+def _mark_ack():
+    st = _interaction_ctx.get()
+    if st is None or st[2]:
+        return
+    st[2] = True
+    waited = time.time() - st[1]
+    ACK_SECONDS.observe(waited, st[0])
+    if waited > INTERACTION_DEADLINE:
+        ACK_LATE.inc(st[0])
+
+async def respond(inter, content=None, **kwargs):
+    """아직 응답 전이면 send_message, defer했으면 followup"""
+    if inter.response.is_done():
+        return await inter.followup.send(content, **kwargs)
+    await inter.response.send_message(content, **kwargs)
+    _mark_ack()
+
+async def respond_edit(inter, **kwargs):
+    """컴포넌트 메시지 수정으로 응답 (에페메럴 액션 버튼 등)"""
+    await inter.response.edit_message(**kwargs)
+    _mark_ack()
+
+async def defer(inter, ephemeral=False):
+    """무거운 작업 전에 먼저 ACK ('생각 중...' 표시). 이후 respond()는 followup으로 나감"""
+    if inter.response.is_done():
+        return
+    await inter.response.defer(ephemeral=ephemeral, thinking=True)
+    _mark_ack()
+
+# ====== 이벤트 루프 워치독 ======
+class LoopWatchdog:
+    """
+    루프 쪽 heartbeat 태스크가 interval마다 깨어나며 지연(LOOP_LAG)을 기록하고,
+    별도 감시 스레드는 heartbeat가 threshold 이상 밀리면 그 순간 루프 스레드의 스택을 떠서 로그로 남김.
+    (루프가 동기 작업에 막혀 있으면 루프 안에서는 아무것도 관찰할 수 없으므로 스레드에서 샘플링)
+    감시 스레드는 /워치독 으로 켜고 끌 수 있고, heartbeat(지연 메트릭)는 항상 동작
+    """
+    def __init__(self, threshold: float = 0.25, interval: float = 0.05):
+        self.threshold = threshold
+        self.interval = interval
+        self.loop_thread_id = None
+        self._beat = time.monotonic()
+        self._reported_beat = None # 같은 정지를 두 번 보고하지 않도록
+        self._stop = None
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    async def heartbeat(self):
+        self.loop_thread_id = threading.get_ident()
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            LOOP_LAG.observe(max(0.0, loop.time() - t0 - self.interval))
+
+    def enable(self, threshold=None):
+        if threshold is not None:
+            self.threshold = threshold
+        if self.enabled:
+            return
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, args=(self._stop,), name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        if self._stop:
+            self._stop.set()
+        self._thread = None
+
+    def _watch(self, stop: threading.Event):
+        while not stop.wait(self.interval):
+            beat = self._beat
+            stalled = time.monotonic() - beat
+            if stalled < self.threshold or beat == self._reported_beat or self.loop_thread_id is None:
+                continue
+            self._reported_beat = beat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            handler = None
+            f = frame
+            while f is not None:
+                if f.f_code.co_name in _TIMED_NAMES:
+                    handler = f.f_code.co_name; break
+                f = f.f_back
+            LOOP_STALLS.inc(handler or "unknown")
+            stack = "".join(traceback.format_stack(frame, limit=25))
+            logging.warning(
+                "이벤트 루프 %.0fms 이상 정지 (테이블 %s, 핸들러 %s, 라운드 %s)\n%s",
+                stalled * 1000, game.channel_id, handler or "알 수 없음", game.round, stack,
+            )
+
+watchdog = LoopWatchdog(threshold=float(os.getenv("LOOP_STALL_MS", "250")) / 1000)
+
+async def _serve_metrics_http():
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, METRICS_HOST, int(METRICS_PORT)).start()
+    logging.info("메트릭 엔드포인트: http://%s:%s/metrics", METRICS_HOST, METRICS_PORT)
+
+async def _dump_metrics_file(interval: float = 15.0):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            tmp = METRICS_FILE + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(render_metrics())
+            os.replace(tmp, METRICS_FILE)
+        except Exception as e:
+            logging.debug(f"메트릭 파일 덤프 실패: {e}")
+
+async def start_metrics():
+    install_rest_metrics()
+    spawn(watchdog.heartbeat())
+    if os.getenv("LOOP_WATCHDOG", "1") != "0":
+        watchdog.enable()
+    if METRICS_PORT:
+        await _serve_metrics_http()
+    if METRICS_FILE:
+        spawn(_dump_metrics_file())
+
+# ====== 트레이싱 ======
+# 핸드 1개 = trace 1개. /시작에서 루트 span을 열고 end_game에서 닫음.
+# 스트리트/액션 핸들러(@timed), compose, DB(db_connect), Discord REST 호출이 자식 span.
+# TRACE_FILE이 있을 때만 JSON lines로 기록 (없으면 아무것도 하지 않음)
+TRACE_FILE = os.getenv("TRACE_FILE")
+_current_span = contextvars.ContextVar("poker_current_span", default=None)
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "attrs")
+    def __init__(self, trace_id, span_id, parent_id, name, start, attrs):
+        self.trace_id, self.span_id, self.parent_id = trace_id, span_id, parent_id
+        self.name, self.start, self.attrs = name, start, attrs
+
+class Tracer:
+    def __init__(self, path):
+        self.path = path
+        self.hand = None # 현재 핸드의 루트 span
+        self.turn_started = None # 플레이어 고민 시간(think) 측정용
+        self._ids = itertools.count(1)
+        self._buf = []
+        self._lock = threading.Lock() # compose span은 렌더 스레드에서도 끝남
+
+    def _new(self, name, parent, attrs):
+        return Span(parent.trace_id, next(self._ids), parent.span_id, name, time.time(), attrs)
+
+    def _finish(self, span, **attrs):
+        end = time.time()
+        rec = {"trace": span.trace_id, "span": span.span_id, "parent": span.parent_id, "name": span.name,
+               "start": round(span.start, 6), "dur_ms": round((end - span.start) * 1000, 3)}
+        rec.update(span.attrs)
+        rec.update(attrs)
+        with self._lock:
+            self._buf.append(rec)
+            full = len(self._buf) >= 256
+        if full:
+            self.flush()
+
+    def start_hand(self, **attrs):
+        if not self.path: return
+        if self.hand: self.end_hand(aborted=True)
+        self.hand = Span(os.urandom(8).hex(), next(self._ids), None, "hand", time.time(), attrs)
+
+    def end_hand(self, **attrs):
+        if not self.hand: return
+        self._finish(self.hand, **attrs)
+        self.hand = None
+        self.turn_started = None
+        self.flush()
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        """핸드 진행 중일 때만 기록. 부모는 현재 컨텍스트의 span, 없으면 핸드 루트"""
+        parent = _current_span.get() or self.hand
+        if parent is None or not self.path:
+            yield None
+            return
+        span = self._new(name, parent, attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def detach(self):
+        """새 태스크에서 호출: 만든 쪽 span을 부모로 물려받지 않고 핸드 루트에 붙도록"""
+        _current_span.set(None)
+
+    def mark_turn(self):
+        self.turn_started = time.time()
+
+    def think(self, uid):
+        """턴 프롬프트 ~ 액션 선택까지를 'think' span으로 기록"""
+        if not self.hand or self.turn_started is None: return
+        span = Span(self.hand.trace_id, next(self._ids), self.hand.span_id, "think", self.turn_started, {"uid": uid})
+        self.turn_started = None
+        self._finish(span)
+
+    def flush(self):
+        if not self._buf or not self.path: return
+        with self._lock:
+            buf, self._buf = self._buf, []
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in buf))
+        except Exception as e:
+            logging.debug(f"트레이스 기록 실패: {e}")
+
+tracer = Tracer(TRACE_FILE)
+
+# ====== 서버/테이블 설정 ======
+# 길드 기본값(channel_id=0) 위에 채널(테이블)별 값을 덮어씀. guild_settings 테이블은 시작할 때 한 번 통째로 읽어 두고
+# /설정에서 쓸 때 같이 갱신 → 조회는 DB를 안 거침. 핸드 시작 때 game.cfg로 고정해서 진행 중인 핸드는 바뀌지 않음
+SETTINGS = {
+    # 키: (기본값, 최소, 최대, 설명)
+    "sb": (10, 1, 1_000_000, "스몰 블라인드"),
+    "bb": (20, 2, 2_000_000, "빅 블라인드"),
+    "turn_seconds": (120, 15, 600, "턴 제한 시간(초)"),
+    "winner_seconds": (10, 5, 60, "단독 승리 시 공개/래빗 헌팅 선택 시간(초)"),
+    "fold_show_seconds": (10, 5, 60, "폴드 후 핸드 공개 선택 시간(초)"),
+    "card_scale": (SCALE, 0.3, 1.5, "카드 이미지 배율"),
+    "start_coins": (1000, 100, 1_000_000, "등록 시 시작 코인"),
+    "max_players": (10, 2, 10, "테이블 최대 인원"),
+    "live_table": (0, 0, 1, "라이브 테이블 모드 (1 = 켜기)"),
+}
+DEFAULT_SETTINGS = {k: v[0] for k, v in SETTINGS.items()}
+
+class SettingsStore:
+    """guild_settings 앞단의 write-through 캐시 {(guild_id, channel_id): {키: 값}}"""
+    __slots__ = ("_rows", "_resolved")
+
+    def __init__(self):
+        self._rows = {}
+        self._resolved = {} # (guild_id, channel_id) -> 합쳐 둔 dict. 값이 바뀌면 통째로 비움
+
+    async def load(self):
+        async with db_connect("settings_load") as db:
+            cur = await db.execute("SELECT guild_id, channel_id, key, value FROM guild_settings")
+            rows = await cur.fetchall()
+        self._rows.clear()
+        self._resolved.clear()
+        for guild_id, channel_id, key, value in rows:
+            if key in SETTINGS:
+                self._rows.setdefault((guild_id, channel_id), {})[key] = type(SETTINGS[key][0])(value)
+        return len(rows)
+
+    def resolve(self, guild_id, channel_id=0):
+        """기본값 < 길드 < 채널 순으로 합친 설정 (캐시를 공유하므로 읽기 전용 뷰로 반환)"""
+        key = (guild_id or 0, channel_id or 0)
+        cfg = self._resolved.get(key)
+        if cfg is None:
+            cfg = dict(DEFAULT_SETTINGS)
+            cfg.update(self._rows.get((key[0], 0), ()))
+            if key[1]:
+                cfg.update(self._rows.get(key, ()))
+            cfg = self._resolved[key] = types.MappingProxyType(cfg)
+        return cfg
+
+    def source(self, guild_id, channel_id, key):
+        if key in self._rows.get((guild_id or 0, channel_id or 0), ()): return "테이블"
+        if key in self._rows.get((guild_id or 0, 0), ()): return "서버"
+        return "기본"
+
+    async def set(self, guild_id, channel_id, key, value):
+        """value가 None이면 해당 범위의 값을 지워 상위(서버/기본값)를 따르게 함"""
+        scope = (guild_id or 0, channel_id or 0)
+        async with db_connect("settings_set") as db:
+            if value is None:
+                await db.execute("DELETE FROM guild_settings WHERE guild_id=? AND channel_id=? AND key=?", (*scope, key))
+            else:
+                await db.execute("INSERT OR REPLACE INTO guild_settings (guild_id, channel_id, key, value) VALUES (?,?,?,?)",
+                                 (*scope, key, value))
+            await db.commit()
+        if value is None:
+            self._rows.get(scope, {}).pop(key, None)
+        else:
+            self._rows.setdefault(scope, {})[key] = value
+        self._resolved.clear()
+
+settings = SettingsStore()
+
+def channel_guild_id(channel):
+    guild = getattr(channel, "guild", None)
+    return guild.id if guild is not None else 0
+
 # ====== 게임 캐시 ======
-# players: {uid: {name, coins, bet, contrib, cards, folded, all_in, afk_kicked}}
+@dataclass(slots=True)
+class Player:
+    """참가자 한 명의 상태 (dict 대신 __slots__ 로 메모리/속성 접근 비용 절감)"""
+    name: str
+    coins: int
+    bet: int = 0
+    contrib: int = 0
+    cards: list = field(default_factory=list)
+    folded: bool = False
+    all_in: bool = False
+    afk_kicked: bool = False
+
+    def reset_for_hand(self, cards):
+        """새 핸드 시작 시 상태 초기화 (cards 리스트는 재사용)"""
+        self.cards[:] = cards
+        self.bet = 0
+        self.contrib = 0
+        self.folded = False
+        self.all_in = False
+        self.afk_kicked = False
+
+@dataclass(slots=True)
+class GameState:
+    """테이블 진행 상태. 핸드 사이에는 reset()으로 컨테이너를 재사용해 초기화"""
+    deck: list = field(default_factory=list)
+    community: list = field(default_factory=list)
+    pot: int = 0
+    round: Optional[str] = None
+    turn_order: list = field(default_factory=list)
+    idx: int = 0
+    current_bet: int = 0
+    acted: set = field(default_factory=set)
+    game_started: bool = False
+    last_prompt_msg_id: Optional[int] = None
+    channel_id: Optional[int] = None
+    dealer_pos: int = -1
+    sb: int = DEFAULT_SETTINGS["sb"]
+    bb: int = DEFAULT_SETTINGS["bb"]
+    timer_task: Optional[asyncio.Task] = None
+    deadline_ts: Optional[int] = None
+    deck_seed: Optional[int] = None # 이번 핸드 덱의 셔플 시드 (deck_from_seed로 재현)
+    runout_shown: bool = False # 올인 런아웃 승률을 이미 보여줬는지
+    cfg: dict = field(default_factory=lambda: dict(DEFAULT_SETTINGS)) # 이번 핸드에 적용 중인 설정 (start_hand에서 고정)
+    rest_calls: int = 0 # 이번 핸드의 Discord REST 호출 수 (메트릭)
+    turn_started: Optional[float] = None # 사람 차례 프롬프트 시각 (time.monotonic, 이상 행동 감지의 행동 시간용)
+
+    def reset(self, channel_id=None, dealer_pos=None):
+        """게임 종료/강제종료 후 초기화. channel_id, dealer_pos는 넘기면 그 값으로 설정"""
+        self.deck.clear()
+        self.community.clear()
+        self.turn_order.clear()
+        self.acted.clear()
+        self.pot = 0
+        self.round = None
+        self.idx = 0
+        self.current_bet = 0
+        self.game_started = False
+        self.last_prompt_msg_id = None
+        if channel_id is not None: self.channel_id = channel_id
+        if dealer_pos is not None: self.dealer_pos = dealer_pos
+        self.sb, self.bb = self.cfg["sb"], self.cfg["bb"] # 다음 start_hand가 새 설정으로 다시 정함
+        self.timer_task = None
+        self.deadline_ts = None
+        self.deck_seed = None
+        self.runout_shown = False
+        self.rest_calls = 0
+        self.turn_started = None
+
+# players: {uid: Player}
 players = {}
-game = {
-    "deck": [],
-    "community": [],
-    "pot": 0,
-    "round": None,
-    "turn_order": [],
-    "idx": 0,
-    "current_bet": 0,
-    "acted": set(),
-    "game_started": False,
-    "last_prompt_msg_id": None,
-    "channel_id": None,
-    "dealer_pos": -1,
-    "sb": 10,
-    "bb": 20,
-    "timer_task": None,
-    "deadline_ts": None,
-}
+game = GameState()
+
+Gauge("poker_active_tables", "핸드 진행 중인 테이블 수", fn=lambda: int(game.game_started))
+Gauge("poker_lobby_players", "로비/게임 참가자 수", fn=lambda: len(players))
 
 # ====== DB 초기화 ======
+DB_PATH = os.getenv("DB_PATH", "test.db")
+
+@contextlib.asynccontextmanager
+async def db_connect(op: str):
+    """aiosqlite 연결 (연결~종료까지 걸린 시간을 DB_SECONDS{op=...}에 기록)"""
+    t0 = time.perf_counter()
+    try:
+        with tracer.span("db", op=op):
+            async with aiosqlite.connect(DB_PATH) as db:
+                yield db
+    finally:
+        DB_SECONDS.observe(time.perf_counter() - t0, op)
+
+async def _drop_dead_columns(db):
+    """character.bet / character.all_in 은 쓰지 않는 컬럼 (DROP COLUMN은 SQLite 3.35+)"""
+    if tuple(map(int, aiosqlite.sqlite_version.split("."))) < (3, 35, 0):
+        logging.info("SQLite %s: DROP COLUMN 미지원, bet/all_in 컬럼 유지", aiosqlite.sqlite_version)
+        return
+    cur = await db.execute("PRAGMA table_info(character)")
+    cols = {row[1] for row in await cur.fetchall()}
+    for col in ("bet", "all_in"):
+        if col in cols:
+            await db.execute(f"ALTER TABLE character DROP COLUMN {col}")
+
+# 순서대로 한 번씩만 적용됨 (PRAGMA user_version = 적용된 개수). 기존 항목은 수정하지 말고 뒤에 추가할 것
+MIGRATIONS = [
+    # 1: 기본 테이블
+    ['''
+        CREATE TABLE IF NOT EXISTS character (
+            user_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            coin INTEGER DEFAULT 1000,
+            in_game INTEGER DEFAULT 0,
+            bet INTEGER DEFAULT 0,
+            all_in INTEGER DEFAULT 0
+        )
+    '''],
+    # 2: 조회용 인덱스 (user_id가 PK가 아닌 예전 DB 포함), 참가 중 유저, 코인 랭킹(커버링)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_character_user_id ON character(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_character_in_game ON character(in_game)",
+        "CREATE INDEX IF NOT EXISTS idx_character_coin ON character(coin DESC, name, user_id)",
+    ],
+    # 3: 유저별 누적 통계
+    ['''
+        CREATE TABLE IF NOT EXISTS character_stats (
+            user_id INTEGER PRIMARY KEY,
+            hands_played INTEGER NOT NULL DEFAULT 0,
+            hands_won INTEGER NOT NULL DEFAULT 0,
+            biggest_pot INTEGER NOT NULL DEFAULT 0
+        )
+    '''],
+    # 4: 안 쓰는 컬럼 정리
+    _drop_dead_columns,
+    # 5: 서버/테이블 설정 (channel_id 0 = 서버 전체)
+    ['''
+        CREATE TABLE IF NOT EXISTS guild_settings (
+            guild_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL DEFAULT 0,
+            key TEXT NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (guild_id, channel_id, key)
+        )
+    '''],
+    # 6: HUD 통계 (hud_flush가 증가분을 더함)
+    ['''
+        CREATE TABLE IF NOT EXISTS hud_stats (
+            user_id INTEGER PRIMARY KEY,
+            hands INTEGER NOT NULL DEFAULT 0,
+            vpip INTEGER NOT NULL DEFAULT 0,
+            pfr INTEGER NOT NULL DEFAULT 0,
+            aggr INTEGER NOT NULL DEFAULT 0,
+            calls INTEGER NOT NULL DEFAULT 0,
+            showdowns INTEGER NOT NULL DEFAULT 0,
+            sd_wins INTEGER NOT NULL DEFAULT 0
+        )
+    ''', '''
+        CREATE TABLE IF NOT EXISTS hud_classes (
+            user_id INTEGER NOT NULL,
+            class INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, class)
+        )
+    '''],
+]
+
+async def migrate(db):
+    cur = await db.execute("PRAGMA user_version")
+    (version,) = await cur.fetchone()
+    for i in range(version, len(MIGRATIONS)):
+        step = MIGRATIONS[i]
+        if callable(step):
+            await step(db)
+        else:
+            for sql in step:
+                await db.execute(sql)
+        await db.execute(f"PRAGMA user_version={i + 1}")
+        await db.commit()
+        logging.info("DB 마이그레이션 %d 적용", i + 1)
+
 async def init_db():
-    async with aiosqlite.connect("test.db") as db:
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS character (
-                user_id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                coin INTEGER DEFAULT 1000,
-                in_game INTEGER DEFAULT 0,
-                bet INTEGER DEFAULT 0,
-                all_in INTEGER DEFAULT 0
-            )
-        ''')
-        # 자동 참가를 위해 봇 재시작 시 DB를 초기화하지 않음
+    # 자동 참가를 위해 봇 재시작 시 DB를 초기화하지 않음
+    async with db_connect("init_db") as db:
+        await migrate(db)
+
+# ====== 캐릭터 캐시 ======
+class CharacterCache:
+    """
+    character 테이블 앞단의 write-through LRU 캐시 (user_id -> (name, coin, in_game))
+    DB에 쓰는 곳(등록/참가/퇴장/end_game/강제종료)은 반드시 put()으로 같은 값을 반영해야 함
+    """
+    __slots__ = ("maxsize", "_rows", "hits", "misses")
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._rows = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, uid):
+        row = self._rows.get(uid)
+        if row is None:
+            self.misses += 1
+            return None
+        self._rows.move_to_end(uid)
+        self.hits += 1
+        return row
+
+    def put(self, uid, name, coin, in_game):
+        self._rows[uid] = (name, coin, in_game)
+        self._rows.move_to_end(uid)
+        if len(self._rows) > self.maxsize:
+            self._rows.popitem(last=False)
+
+    def invalidate(self, uid=None):
+        if uid is None: self._rows.clear()
+        else: self._rows.pop(uid, None)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        return len(self._rows)
+
+char_cache = CharacterCache()
+Gauge("poker_character_cache_hits", "캐릭터 캐시 적중 수", fn=lambda: char_cache.hits)
+Gauge("poker_character_cache_misses", "캐릭터 캐시 미스 수", fn=lambda: char_cache.misses)
+
+async def get_character(uid):
+    """(name, coin, in_game) 또는 None. 캐시에 없을 때만 DB 조회"""
+    row = char_cache.get(uid)
+    if row is not None:
+        return row
+    async with db_connect("get_character") as db:
+        cur = await db.execute("SELECT name, coin, in_game FROM character WHERE user_id=?", (uid,))
+        row = await cur.fetchone()
+    if row:
+        char_cache.put(uid, *row)
+        logging.debug("character cache miss: uid=%s (hit rate %.1f%%, size %d)", uid, char_cache.hit_rate() * 100, len(char_cache))
+    return row
+
+# ====== HUD 통계 ======
+# VPIP/PFR/공격성(AF)/쇼다운 승률/쇼다운 족보 분포. 액션이 일어날 때 카운터만 올리고(봇 제외),
+# 쌓인 증가분은 HUD_FLUSH_SECONDS마다 한 트랜잭션으로 DB에 더함. /통계는 메모리 값으로 바로 계산 (유저당 첫 조회만 DB)
+HUD_FLUSH_SECONDS = float(os.getenv("HUD_FLUSH_SECONDS", "30"))
+HUD_CLASSES = 9 # hand_name 등급 0(하이카드) ~ 8(스트레이트 플러시)
+
+@dataclass(slots=True)
+class HudStats:
+    hands: int = 0 # 카드를 받은 핸드
+    vpip: int = 0 # 프리플랍에 스스로 칩을 넣은(콜/레이즈) 핸드
+    pfr: int = 0 # 프리플랍에 레이즈한 핸드
+    aggr: int = 0 # 벳/레이즈 횟수 (전 스트리트)
+    calls: int = 0 # 콜 횟수 (전 스트리트)
+    showdowns: int = 0
+    sd_wins: int = 0 # 쇼다운에서 팟을 (일부라도) 가져간 횟수
+    classes: list = field(default_factory=lambda: [0] * HUD_CLASSES) # 쇼다운 족보 등급별 횟수
+
+    def add(self, other):
+        for f in _HUD_FIELDS:
+            setattr(self, f, getattr(self, f) + getattr(other, f))
+        for c, n in enumerate(other.classes):
+            self.classes[c] += n
+
+_HUD_FIELDS = ("hands", "vpip", "pfr", "aggr", "calls", "showdowns", "sd_wins")
+hud_totals = {} # uid -> HudStats (DB 값 + 아직 안 쓴 증가분). /통계에서 처음 볼 때 읽어 옴
+hud_pending = {} # uid -> HudStats (마지막 flush 이후 증가분)
+_hud_lock = asyncio.Lock() # flush와 첫 조회가 겹쳐 증가분이 빠지거나 두 번 더해지지 않게
+_hand_vpip = set() # 이번 핸드에 이미 VPIP/PFR로 센 유저
+_hand_pfr = set()
+
+def _hud_targets(uid):
+    if is_bot(uid): return ()
+    pending = hud_pending.get(uid)
+    if pending is None:
+        pending = hud_pending[uid] = HudStats()
+    total = hud_totals.get(uid)
+    return (pending,) if total is None else (pending, total)
+
+def hud_new_hand(uids):
+    _hand_vpip.clear()
+    _hand_pfr.clear()
+    for uid in uids:
+        for st in _hud_targets(uid):
+            st.hands += 1
+
+def hud_action(uid, action):
+    """실제로 칩을 넣은 콜("call")/벳·레이즈("raise") 뒤에 호출"""
+    preflop = game.round == "preflop"
+    for st in _hud_targets(uid):
+        if action == "raise": st.aggr += 1
+        else: st.calls += 1
+        if preflop and uid not in _hand_vpip: st.vpip += 1
+        if preflop and action == "raise" and uid not in _hand_pfr: st.pfr += 1
+    if preflop:
+        _hand_vpip.add(uid)
+        if action == "raise": _hand_pfr.add(uid)
+
+def hud_showdown(results):
+    """results: [(uid, 족보 등급, 팟을 가져갔는지)]"""
+    for uid, cls, won in results:
+        for st in _hud_targets(uid):
+            st.showdowns += 1
+            st.sd_wins += 1 if won else 0
+            st.classes[cls] += 1
+
+async def hud_get(uid):
+    """누적 HUD 통계 (처음 한 번만 DB에서 읽고, 이후로는 메모리에서 바로)"""
+    st = hud_totals.get(uid)
+    if st is not None:
+        return st
+    async with _hud_lock:
+        if uid in hud_totals:
+            return hud_totals[uid]
+        async with db_connect("hud_get") as db:
+            cur = await db.execute(f"SELECT {', '.join(_HUD_FIELDS)} FROM hud_stats WHERE user_id=?", (uid,))
+            row = await cur.fetchone()
+            cur = await db.execute("SELECT class, count FROM hud_classes WHERE user_id=?", (uid,))
+            classes = await cur.fetchall()
+        st = HudStats(*(row or ()))
+        for c, n in classes:
+            if 0 <= c < HUD_CLASSES: st.classes[c] = n
+        if uid in hud_pending: # 아직 DB에 안 쓴 증가분
+            st.add(hud_pending[uid])
+        hud_totals[uid] = st
+        return st
+
+async def hud_flush():
+    """쌓인 증가분을 한 트랜잭션으로 DB에 더함. 쓴 유저 수 반환 (실패하면 다음 flush 때 다시)"""
+    async with _hud_lock:
+        if not hud_pending:
+            return 0
+        batch = dict(hud_pending)
+        hud_pending.clear()
+        cols = ", ".join(_HUD_FIELDS)
+        try:
+            async with db_connect("hud_flush") as db:
+                await db.executemany(
+                    f"INSERT INTO hud_stats (user_id, {cols}) VALUES (?{',?' * len(_HUD_FIELDS)}) "
+                    "ON CONFLICT(user_id) DO UPDATE SET " + ", ".join(f"{f}={f}+excluded.{f}" for f in _HUD_FIELDS),
+                    [(uid, *(getattr(st, f) for f in _HUD_FIELDS)) for uid, st in batch.items()],
+                )
+                await db.executemany(
+                    "INSERT INTO hud_classes (user_id, class, count) VALUES (?,?,?) "
+                    "ON CONFLICT(user_id, class) DO UPDATE SET count=count+excluded.count",
+                    [(uid, c, n) for uid, st in batch.items() for c, n in enumerate(st.classes) if n],
+                )
+                await db.commit()
+        except Exception:
+            for uid, st in batch.items():
+                hud_pending.setdefault(uid, HudStats()).add(st)
+            raise
+        return len(batch)
+
+async def _hud_flush_loop():
+    while True:
+        await asyncio.sleep(HUD_FLUSH_SECONDS)
+        try:
+            await hud_flush()
+        except Exception as e:
+            logging.error(f"HUD 통계 저장 실패 (다음에 다시 시도): {e}")
+
+# ====== 이상 행동 감지 ======
+# 칩 밀어주기/봇 플레이 감시. 게임 루프는 anomaly_event()로 이벤트를 큐에 넣기만 하고(가득 차면 버림),
+# 별도 태스크가 유저 쌍별 슬라이딩 윈도 집계(칩 이동, 같은 상대에게 폴드, 행동 시간 편차)를 갱신해 규칙에 걸리면
+# ANOMALY_CHANNEL_ID 채널로 알림 (없으면 로그만). 봇 좌석은 집계하지 않음
+ANOMALY_DETECTION = os.getenv("ANOMALY_DETECTION", "1") != "0"
+ANOMALY_CHANNEL_ID = int(os.getenv("ANOMALY_CHANNEL_ID", "0")) or None
+ANOMALY_WINDOW_SECONDS = float(os.getenv("ANOMALY_WINDOW_SECONDS", str(6 * 3600)))
+ANOMALY_COOLDOWN_SECONDS = float(os.getenv("ANOMALY_COOLDOWN_SECONDS", "3600")) # 같은 규칙/대상 알림 간격
+ANOMALY_QUEUE_MAX = 10000
+ANOMALY_MAX_PAIRS = 5000 # 넘으면 가장 오래 안 쓴 쌍부터 버림 (유저도 같은 방식)
+ANOMALY_MAX_PLAYERS = 2000
+ANOMALY_MAX_EVENTS = 500 # 쌍/유저 하나의 윈도에 남기는 최대 이벤트 수
+ANOMALY_FLOW_BB = float(os.getenv("ANOMALY_FLOW_BB", "150")) # A→B 순이동이 이 BB 이상이면
+ANOMALY_FLOW_HANDS = 3 # ...그리고 이만큼의 핸드에 걸쳐 있으면
+ANOMALY_FOLD_MIN = 8 # 같은 상대의 베팅을 이만큼 마주쳤고
+ANOMALY_FOLD_RATIO = 0.9 # 그중 이 비율 이상 폴드했는데
+ANOMALY_FOLD_OTHERS = 0.5 # 다른 상대에게는 이 비율 이하로만 폴드하면
+ANOMALY_TIMING_SAMPLES = 30 # 최근 행동 시간 샘플 수
+ANOMALY_TIMING_STDEV = float(os.getenv("ANOMALY_TIMING_STDEV", "0.15")) # 표준편차(초)가 이보다 작으면
+ANOMALY_AFK_LIMIT = 3 # 윈도 안의 AFK 자동 폴드 횟수
+
+ANOMALY_EVENTS = Counter("poker_anomaly_events_total", "이상 행동 감지로 넘긴 이벤트 수", "kind")
+ANOMALY_DROPPED = Counter("poker_anomaly_dropped_total", "큐가 가득 차서 버린 이상 행동 감지 이벤트 수")
+ANOMALY_ALERTS = Counter("poker_anomaly_alerts_total", "이상 행동 알림 수", "rule")
+
+class _Window:
+    """최근 이벤트 (ts, 값)의 합. 오래된 것은 prune()에서, 넘치는 것은 추가할 때 버림"""
+    __slots__ = ("items", "total")
+    def __init__(self):
+        self.items = deque(maxlen=ANOMALY_MAX_EVENTS)
+        self.total = 0.0
+
+    def add(self, ts, v=1.0):
+        if len(self.items) == self.items.maxlen:
+            self.total -= self.items[0][1]
+        self.items.append((ts, v))
+        self.total += v
+
+    def prune(self, now):
+        cutoff = now - ANOMALY_WINDOW_SECONDS
+        while self.items and self.items[0][0] < cutoff:
+            self.total -= self.items.popleft()[1]
+        if not self.items: self.total = 0.0 # 부동소수 오차 누적 방지
+        return self.total
+
+class _PairStats:
+    """(a, b): a가 b에게 잃은 칩(BB), a가 b의 베팅을 마주친/폴드한 횟수"""
+    __slots__ = ("flow", "faced", "folded")
+    def __init__(self):
+        self.flow, self.faced, self.folded = _Window(), _Window(), _Window()
+
+class _PlayerStats:
+    __slots__ = ("faced", "folded", "afk", "think", "think_sum", "think_sq")
+    def __init__(self):
+        self.faced, self.folded, self.afk = _Window(), _Window(), _Window()
+        self.think = deque(maxlen=ANOMALY_TIMING_SAMPLES)
+        self.think_sum = self.think_sq = 0.0
+
+class AnomalyDetector:
+    """이벤트를 받아 집계를 갱신하고 새 알림 [(규칙, 대상 uid들, 내용)]을 반환 (Discord 호출 없음)"""
+    def __init__(self, namer=str):
+        self.namer = namer
+        self.pairs = OrderedDict() # (a, b) -> _PairStats (LRU)
+        self.people = OrderedDict() # uid -> _PlayerStats (LRU)
+        self.alerted = OrderedDict() # (규칙, 대상) -> 마지막 알림 시각
+        self.aggressor = None # 이번 스트리트에서 마지막으로 벳/레이즈한 사람
+
+    @staticmethod
+    def _lru(table, key, cls, cap):
+        st = table.get(key)
+        if st is None:
+            st = table[key] = cls()
+            if len(table) > cap: table.popitem(last=False)
+        else:
+            table.move_to_end(key)
+        return st
+
+    def _pair(self, a, b):
+        return self._lru(self.pairs, (a, b), _PairStats, ANOMALY_MAX_PAIRS)
+
+    def _player(self, uid):
+        return self._lru(self.people, uid, _PlayerStats, ANOMALY_MAX_PLAYERS)
+
+    def feed(self, ts, kind, args):
+        alerts = getattr(self, "_on_" + kind)(ts, *args) or ()
+        return [a for a in alerts if self._fresh(ts, a[0], a[1])]
+
+    def _fresh(self, ts, rule, key):
+        last = self.alerted.get((rule, key))
+        if last is not None and ts - last < ANOMALY_COOLDOWN_SECONDS:
+            return False
+        self.alerted[(rule, key)] = ts
+        self.alerted.move_to_end((rule, key))
+        if len(self.alerted) > ANOMALY_MAX_PAIRS: self.alerted.popitem(last=False)
+        return True
+
+    def _on_hand(self, ts):
+        self.aggressor = None
+
+    _on_street = _on_hand
+
+    def _on_act(self, ts, uid, action):
+        agg, alerts = self.aggressor, []
+        if agg is not None and agg != uid and not is_bot(uid) and not is_bot(agg):
+            ps, pl = self._pair(uid, agg), self._player(uid)
+            ps.faced.add(ts); pl.faced.add(ts)
+            if action == "fold":
+                ps.folded.add(ts); pl.folded.add(ts)
+                faced, folded = ps.faced.prune(ts), ps.folded.prune(ts)
+                if faced >= ANOMALY_FOLD_MIN and folded >= faced * ANOMALY_FOLD_RATIO:
+                    others = pl.faced.prune(ts) - faced
+                    others_folded = pl.folded.prune(ts) - folded
+                    if others >= ANOMALY_FOLD_MIN and others_folded <= others * ANOMALY_FOLD_OTHERS:
+                        alerts.append(("fold_to", (uid, agg),
+                            f"{self.namer(uid)} → {self.namer(agg)}: 베팅에 {folded:.0f}/{faced:.0f}번 폴드 "
+                            f"(다른 상대에게는 {others_folded / others:.0%})"))
+        if action == "raise":
+            self.aggressor = uid
+        return alerts
+
+    def _on_afk(self, ts, uid):
+        alerts = self._on_act(ts, uid, "fold")
+        if is_bot(uid): return alerts
+        pl = self._player(uid)
+        pl.afk.add(ts)
+        n = pl.afk.prune(ts)
+        if n >= ANOMALY_AFK_LIMIT:
+            alerts.append(("afk", (uid,), f"{self.namer(uid)}: 시간 초과 자동 폴드 {n:.0f}번"))
+        return alerts
+
+    def _on_think(self, ts, uid, seconds):
+        if is_bot(uid): return
+        pl = self._player(uid)
+        if len(pl.think) == pl.think.maxlen:
+            old = pl.think[0]
+            pl.think_sum -= old; pl.think_sq -= old * old
+        pl.think.append(seconds)
+        pl.think_sum += seconds; pl.think_sq += seconds * seconds
+        n = len(pl.think)
+        if n < ANOMALY_TIMING_SAMPLES: return
+        mean = pl.think_sum / n
+        sd = max(0.0, pl.think_sq / n - mean * mean) ** 0.5
+        if sd < ANOMALY_TIMING_STDEV:
+            return [("timing", (uid,), f"{self.namer(uid)}: 최근 {n}번 행동 시간이 평균 {mean:.2f}초, 표준편차 {sd:.3f}초로 일정")]
+
+    def _on_result(self, ts, contrib, winnings, bb):
+        """핸드 정산: 순손실자 → 순이익자 칩 이동을 이익 비율대로 나눠 쌍별로 누적 (BB 단위)"""
+        net = {uid: winnings.get(uid, 0) - contrib.get(uid, 0) for uid in contrib.keys() | winnings.keys()}
+        gained = sum(v for v in net.values() if v > 0)
+        if gained <= 0: return
+        alerts = []
+        for a, lost in net.items():
+            if lost >= 0 or is_bot(a): continue
+            for b, won in net.items():
+                if won <= 0 or is_bot(b): continue
+                ps = self._pair(a, b)
+                ps.flow.add(ts, -lost * won / gained / max(1, bb))
+                back = self.pairs.get((b, a))
+                flow = ps.flow.prune(ts) - (back.flow.prune(ts) if back else 0)
+                if flow >= ANOMALY_FLOW_BB and len(ps.flow.items) >= ANOMALY_FLOW_HANDS:
+                    alerts.append(("chip_flow", (a, b),
+                        f"{self.namer(a)} → {self.namer(b)}: 최근 {ANOMALY_WINDOW_SECONDS / 3600:g}시간 "
+                        f"{len(ps.flow.items)}핸드에 걸쳐 순 {flow:.0f}BB 이동"))
+        return alerts
+
+def _anomaly_name(uid):
+    p = players.get(uid)
+    if p: return f"**{p.name}** ({uid})"
+    row = char_cache.get(uid)
+    return f"**{row[0]}** ({uid})" if row else str(uid)
+
+anomaly = AnomalyDetector(_anomaly_name)
+_anomaly_queue = None # 감시 태스크가 돌고 있을 때만 생김 (시뮬레이션/벤치마크에서는 이벤트를 안 쌓음)
+
+def anomaly_event(kind, *args):
+    """게임 루프에서 호출. 큐에 넣기만 하고 바로 반환 (가득 차면 버림)"""
+    if _anomaly_queue is None: return
+    try:
+        _anomaly_queue.put_nowait((time.monotonic(), kind, args))
+    except asyncio.QueueFull:
+        ANOMALY_DROPPED.inc()
+
+async def _anomaly_loop():
+    global _anomaly_queue
+    _anomaly_queue = asyncio.Queue(maxsize=ANOMALY_QUEUE_MAX)
+    while True:
+        ts, kind, args = await _anomaly_queue.get()
+        ANOMALY_EVENTS.inc(kind)
+        try:
+            alerts = anomaly.feed(ts, kind, args)
+        except Exception as e:
+            logging.exception(f"이상 행동 집계 에러: {e}")
+            continue
+        for rule, _, text in alerts:
+            ANOMALY_ALERTS.inc(rule)
+            logging.warning("이상 행동 감지 [%s] %s", rule, text)
+            channel = bot.get_channel(ANOMALY_CHANNEL_ID) if ANOMALY_CHANNEL_ID else None
+            if channel is None: continue
+            try:
+                await channel.send(f"🚨 **이상 행동 감지** `{rule}`\n{text}", allowed_mentions=discord.AllowedMentions.none())
+            except Exception as e:
+                logging.error(f"이상 행동 알림 전송 실패: {e}")
+
+# ====== 로비 복구 ======
+async def restore_lobby():
+    """
+    봇 재시작 시 in_game=1 유저를 한 번에 읽어 로비(players)를 재구성.
+    코인이 없는 유저는 in_game=0으로 정리. 복구한 인원 수를 반환
+    """
+    async with db_connect("restore_lobby") as db:
+        cur = await db.execute("SELECT user_id, name, coin FROM character WHERE in_game=1")
+        rows = await cur.fetchall()
+        broke = [(uid,) for uid, _, coin in rows if coin <= 0]
+        if broke:
+            await db.executemany("UPDATE character SET in_game=0 WHERE user_id=?", broke)
+            await db.commit()
+
+    restored = 0
+    for uid, name, coin in rows:
+        if coin <= 0:
+            char_cache.put(uid, name, coin, 0)
+            continue
+        char_cache.put(uid, name, coin, 1)
+        if uid not in players:
+            players[uid] = Player(name=name, coins=coin)
+            restored += 1
+    if restored:
+        logging.info("봇 재시작 복구: 로비 %d명 복원 (%s)", restored, ", ".join(p.name for p in players.values()))
+    return restored
+
+# ====== 핸드 스냅샷 ======
+# 진행 중인 핸드를 턴/스트리트마다 파일로 저장 → 재시작 시 이어서 진행
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "hand_snapshot.json")
+_SNAPSHOT_GAME_FIELDS = tuple(f for f in GameState.__slots__ if f not in ("timer_task", "turn_started"))
+
+def snapshot_state(phase="turn", **extra):
+    """phase: "turn"(행동 대기) / "winner"(단독 승리, 팟 미지급). extra는 phase별 추가 정보"""
+    g = {f: getattr(game, f) for f in _SNAPSHOT_GAME_FIELDS}
+    g["acted"] = list(game.acted)
+    g["cfg"] = dict(game.cfg) # settings.resolve가 준 읽기 전용 뷰는 JSON으로 못 씀
+    return {
+        "v": 1, "phase": phase, "game": g,
+        # Player 필드 순서 그대로 [uid, name, coins, bet, ...]
+        "players": [[uid, *(getattr(p, f) for f in Player.__slots__)] for uid, p in players.items()],
+        **extra,
+    }
+
+def _write_json_atomic(path, obj):
+    """임시 파일에 쓴 뒤 os.replace로 교체 (중간에 죽어도 이전 파일은 온전)"""
+    data = json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def save_snapshot(phase="turn", **extra):
+    try:
+        _write_json_atomic(SNAPSHOT_PATH, snapshot_state(phase, **extra))
+    except Exception as e:
+        logging.error(f"스냅샷 저장 실패: {e}")
+
+def clear_snapshot():
+    try:
+        os.remove(SNAPSHOT_PATH)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.error(f"스냅샷 삭제 실패: {e}")
+
+def load_snapshot():
+    """스냅샷을 game/players에 적용하고 스냅샷 dict를 반환 (없거나 깨졌으면 None)"""
+    try:
+        with open(SNAPSHOT_PATH, encoding="utf-8") as f:
+            snap = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.error(f"스냅샷 읽기 실패, 무시: {e}")
+        return None
+    if snap.get("v") != 1 or not snap["game"].get("game_started"):
+        return None
+
+    for f, val in snap["game"].items():
+        setattr(game, f, val)
+    game.acted = set(game.acted)
+    game.cfg = {**DEFAULT_SETTINGS, **game.cfg} # 스냅샷 이후에 추가된 설정 키는 기본값
+    for uid, *row in snap["players"]:
+        players[uid] = Player(*row)
+    return snap
+
+async def resume_hand(snap):
+    """load_snapshot() 이후 호출. 게이트웨이 준비를 기다렸다가 현재 턴 프롬프트를 다시 띄움"""
+    await bot.wait_until_ready()
+    channel = bot.get_channel(game.channel_id)
+    if not channel:
+        logging.error(f"핸드 복구: 채널 {game.channel_id}를 찾을 수 없음, 복구 취소")
+        return
+
+    if snap["phase"] == "winner":
+        # 단독 승리 후 팟 지급 전에 재시작됨 → 숨기기와 동일하게 처리
+        winner_uid, pot = snap["winner_uid"], snap["pot"]
+        p = players.get(winner_uid)
+        if p:
+            p.coins += pot
+            await channel.send(f"♻️ 봇 재시작 복구: **{p.name}**님이 팟 {pot} 코인을 획득했습니다!")
+        await end_game({winner_uid: pot} if p else None)
+        return
+
+    await channel.send("♻️ 봇이 재시작되어 진행 중이던 핸드를 이어서 진행합니다.")
+    if game.cfg["live_table"]: # 이전 테이블 메시지는 버튼이 낡았으니 새로 띄움
+        live_tables[channel.id] = LiveTable(channel, [(uid, p.name) for uid, p in players.items() if not is_bot(uid)])
+    # prompt_action이 재시작 전 프롬프트(last_prompt_msg_id)의 버튼도 정리함
+    await prompt_action(channel, resume_deadline_ts=game.deadline_ts)
+    if _READY_TS is not None:
+        STARTUP_SECONDS.observe(time.perf_counter() - _READY_TS, "resume_hand")
+        logging.info("ready → 핸드 복구 완료: %.3fs", time.perf_counter() - _READY_TS)
+
+# ====== 토너먼트 ======
+# 게임 상태(GameState)는 하나뿐이라 토너먼트 테이블들은 토너먼트 채널에서 한 핸드씩 돌아가며 진행한다.
+# /시작 때 다음 차례 테이블 인원을 players에 앉히고(Player.coins = 토너먼트 칩), end_game에서 칩을 돌려받아
+# 탈락 → 테이블 깨기/밸런싱을 처리한다. 칩은 캐릭터 코인과 별개 (바이인은 코인에서 차감, 상금은 코인으로 지급)
+# 테이블이 많을수록 각 테이블이 다른 테이블 핸드를 기다리는 시간이 길어지므로 테이블 수를 TOURNEY_MAX_TABLES로 제한
+TOURNEY_PATH = os.getenv("TOURNEY_PATH", "tournament.json")
+TOURNEY_MAX_TABLES = int(os.getenv("TOURNEY_MAX_TABLES", "3"))
+BLIND_LEVELS = ((10, 20), (15, 30), (25, 50), (50, 100), (75, 150), (100, 200), (150, 300),
+                (200, 400), (300, 600), (400, 800), (600, 1200), (1000, 2000), (1500, 3000), (2000, 4000))
+PAYOUTS = (0.5, 0.3, 0.2) # 1등부터 상금 비율
+
+@dataclass(slots=True)
+class Tournament:
+    channel_id: int
+    buy_in: int = 100
+    start_stack: int = 1500
+    table_size: int = 9
+    level_minutes: int = 0 # 0이면 핸드 수 기준 (level_hands마다), 아니면 이 시간(분)마다 레벨업
+    level_hands: int = 10 # 핸드 수 기준일 때: 모든 테이블이 한 핸드씩 도는 바퀴(오빗) 수
+    started: bool = False
+    level: int = 0
+    hands_in_level: int = 0
+    level_ts: float = 0.0 # 현재 레벨 시작 시각 (time.time, 재시작해도 이어짐)
+    names: dict = field(default_factory=dict) # uid -> 이름 (참가자 전체)
+    stacks: dict = field(default_factory=dict) # uid -> 칩 (생존자만)
+    tables: list = field(default_factory=list) # 테이블별 좌석 순서 [[uid, ...], ...]
+    buttons: list = field(default_factory=list) # 테이블별 dealer_pos
+    seat_of: dict = field(default_factory=dict) # uid -> 테이블 번호
+    next_table: int = 0
+    live_table: Optional[int] = None # 지금 핸드 중인 테이블
+    busted: list = field(default_factory=list) # 탈락 순서 (먼저 떨어진 사람이 앞)
+
+    def capacity(self):
+        """최대 참가 인원 (테이블 TOURNEY_MAX_TABLES개를 꽉 채운 수)"""
+        return self.table_size * TOURNEY_MAX_TABLES
+
+    def blinds(self):
+        """현재 레벨의 (SB, BB). 스케줄을 넘어가면 마지막 레벨에서 두 배씩"""
+        last = len(BLIND_LEVELS) - 1
+        sb, bb = BLIND_LEVELS[min(self.level, last)]
+        mul = 2 ** max(0, self.level - last)
+        return sb * mul, bb * mul
+
+    def maybe_level_up(self):
+        """레벨이 올랐으면 True"""
+        before = self.level
+        if self.level_minutes:
+            step = self.level_minutes * 60
+            while time.time() - self.level_ts >= step:
+                self.level += 1
+                self.level_ts += step
+        elif self.hands_in_level >= self.level_hands:
+            self.level += 1
+            self.hands_in_level = 0
+        return self.level != before
+
+    def seat_all(self):
+        """시작 시 무작위 착석. 테이블 수는 최소로, 인원은 고르게"""
+        uids = list(self.stacks)
+        random.shuffle(uids)
+        n_tables = -(-len(uids) // self.table_size)
+        self.tables = [uids[i::n_tables] for i in range(n_tables)]
+        self.buttons = [-1] * n_tables
+        self.seat_of = {uid: t for t, seats in enumerate(self.tables) for uid in seats}
+
+    def upcoming_table(self):
+        """다음 차례 테이블 번호 (상태는 바꾸지 않음)"""
+        return self.next_table % len(self.tables)
+
+    def load_table(self, t):
+        """테이블 t를 players에 앉히고 다음 차례로 넘김. start_hand에서 시작 조건을 확인한 뒤에만 호출"""
+        self.next_table = t + 1
+        self.live_table = t
+        players.clear()
+        for uid in self.tables[t]:
+            players[uid] = Player(name=self.names[uid], coins=self.stacks[uid])
+        return t
+
+    def finish_hand(self):
+        """end_game에서 호출. 칩 반영, 탈락/밸런싱, 레벨 진행. 채널에 보낼 안내 문구 목록 반환"""
+        t, self.live_table = self.live_table, None
+        self.buttons[t] = game.dealer_pos
+        for uid, p in players.items():
+            if uid in self.stacks:
+                self.stacks[uid] = p.coins
+        # 같은 핸드에서 여러 명이 떨어지면 시작 칩(=이번 핸드 총 베팅)이 적은 사람이 먼저 탈락한 것으로
+        out = sorted((uid for uid in self.tables[t] if self.stacks[uid] <= 0), key=lambda u: players[u].contrib)
+        players.clear()
+        msgs = []
+        for uid in out:
+            msgs.append(f"💀 **{self.names[uid]}** 탈락 ({len(self.stacks)}위)")
+            msgs += self.eliminate(uid)
+        # 테이블들이 한 GameState를 돌아가며 쓰므로, 마지막 테이블까지 한 바퀴 돌았을 때만 센다
+        # (테이블마다 세면 테이블이 N개일 때 각 테이블 블라인드가 자기 핸드 level_hands/N마다 오름)
+        if self.upcoming_table() == 0:
+            self.hands_in_level += 1
+        if self.maybe_level_up():
+            sb, bb = self.blinds()
+            msgs.append(f"⏫ 블라인드 레벨 {self.level + 1}: SB {sb} / BB {bb}")
+        return msgs
+
+    def _unseat(self, t, uid):
+        seats = self.tables[t]
+        i = seats.index(uid)
+        del seats[i]
+        if i <= self.buttons[t]: # 버튼이 같은 사람(또는 바로 앞 좌석)에 머물도록
+            self.buttons[t] -= 1
+        del self.seat_of[uid]
+
+    def _seat(self, t, uid):
+        self.tables[t].append(uid)
+        self.seat_of[uid] = t
+
+    def _smallest(self, exclude=None):
+        return min((i for i in range(len(self.tables)) if i != exclude), key=lambda i: len(self.tables[i]))
+
+    def eliminate(self, uid):
+        """탈락 처리 후 테이블 깨기/밸런싱. 탈락 1명당 O(테이블 수) (+ 깨지는 테이블 인원만큼)"""
+        self._unseat(self.seat_of[uid], uid)
+        del self.stacks[uid]
+        self.busted.append(uid)
+        if len(self.stacks) <= 1:
+            return []
+        msgs = []
+        # 테이블 하나를 줄여도 모두 앉을 수 있으면 가장 작은 테이블을 깸 → 마지막엔 파이널 테이블로 합쳐짐
+        while len(self.tables) > 1 and len(self.stacks) <= self.table_size * (len(self.tables) - 1):
+            msgs += self._break_table(self._smallest())
+            if len(self.tables) == 1:
+                msgs.append(f"🏆 **파이널 테이블!** ({len(self.stacks)}명)")
+        # 남은 테이블끼리 인원 차이가 2 이상이면 큰 쪽에서 한 명 이동 (탈락 1명으로 생기는 차이는 최대 1명분)
+        if len(self.tables) > 1:
+            big = max(range(len(self.tables)), key=lambda i: len(self.tables[i]))
+            small = self._smallest()
+            if len(self.tables[big]) - len(self.tables[small]) > 1:
+                seats = self.tables[big]
+                mover = seats[(self.buttons[big] + 2) % len(seats)] # 다음 빅 블라인드 차례인 사람
+                self._unseat(big, mover)
+                self._seat(small, mover)
+                msgs.append(f"🔀 **{self.names[mover]}**: 테이블 {big + 1} → 테이블 {small + 1}")
+        return msgs
+
+    def _break_table(self, t):
+        movers = list(self.tables[t])
+        # 마지막 테이블을 t 자리로 옮겨 번호를 메움 (옮겨진 테이블 인원의 seat_of만 갱신)
+        last = len(self.tables) - 1
+        self.tables[t], self.buttons[t] = self.tables[last], self.buttons[last]
+        self.tables.pop(); self.buttons.pop()
+        if t != last:
+            for uid in self.tables[t]:
+                self.seat_of[uid] = t
+        msgs = [f"🧹 테이블 {t + 1} 해체 → {len(movers)}명 재배치"]
+        for uid in movers:
+            del self.seat_of[uid]
+            self._seat(self._smallest(), uid)
+        return msgs
+
+    def payouts(self):
+        """[(uid, 상금), ...] 1등부터. 나누고 남는 코인은 1등에게"""
+        order = list(self.stacks) + self.busted[::-1]
+        pool = self.buy_in * len(self.names)
+        ratios = PAYOUTS[:len(order)]
+        total = sum(ratios)
+        prizes = [int(pool * r / total) for r in ratios]
+        if prizes:
+            prizes[0] += pool - sum(prizes)
+        return list(zip(order, prizes))
+
+    def to_json(self):
+        return {f: getattr(self, f) for f in Tournament.__slots__}
+
+    @classmethod
+    def from_json(cls, d):
+        t = cls(**d)
+        # JSON은 dict 키를 문자열로 저장하므로 uid 키를 int로 되돌림
+        t.names = {int(k): v for k, v in t.names.items()}
+        t.stacks = {int(k): v for k, v in t.stacks.items()}
+        t.seat_of = {int(k): v for k, v in t.seat_of.items()}
+        return t
+
+tourney: Optional[Tournament] = None
+
+def save_tourney():
+    try:
+        if tourney is None:
+            os.remove(TOURNEY_PATH)
+        else:
+            _write_json_atomic(TOURNEY_PATH, tourney.to_json())
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.error(f"토너먼트 저장 실패: {e}")
+
+def load_tourney():
+    global tourney
+    try:
+        with open(TOURNEY_PATH, encoding="utf-8") as f:
+            tourney = Tournament.from_json(json.load(f))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.error(f"토너먼트 읽기 실패, 무시: {e}")
+        return None
+    return tourney
+
+def tourney_hand_live():
+    return tourney is not None and tourney.live_table is not None
+
+async def _credit_coins(amounts, op):
+    """[(uid, 코인), ...]만큼 캐릭터 코인 지급 (음수면 차감)"""
+    async with db_connect(op) as db:
+        await db.executemany("UPDATE character SET coin=coin+? WHERE user_id=?", [(amt, uid) for uid, amt in amounts])
         await db.commit()
+    for uid, _ in amounts:
+        char_cache.invalidate(uid)
+
+async def tourney_after_hand(channel):
+    """토너먼트 핸드가 끝난 뒤: 탈락/밸런싱/레벨 안내, 우승자가 나오면 상금 지급 후 종료"""
+    global tourney
+    msgs = tourney.finish_hand()
+    if len(tourney.stacks) == 1:
+        prizes = tourney.payouts()
+        await _credit_coins([(uid, amt) for uid, amt in prizes if amt > 0], "tourney_payout")
+        msgs.append(f"🥇 **{tourney.names[prizes[0][0]]}** 우승!")
+        msgs += [f"{i}위 **{tourney.names[uid]}** — {amt:,} 코인" for i, (uid, amt) in enumerate(prizes, 1) if amt > 0]
+        tourney = None
+    else:
+        t = tourney.upcoming_table()
+        sb, bb = tourney.blinds()
+        msgs.append(f"다음: 테이블 {t + 1} ({len(tourney.tables[t])}명), 블라인드 {sb}/{bb} — `/시작`")
+    save_tourney()
+    if channel:
+        await channel.send("\n".join(msgs))
 
 # ====== 카드 유틸 ======
 def create_deck():
@@ -81,78 +1498,260 @@ def create_deck():
     ranks = ['2','3','4','5','6','7','8','9','10','J','Q','K','A']
     return [f"{r}{s}" for s in suits for r in ranks]
 
-def deal_hole():
+# 셔플은 응답 경로 밖에서 미리: 백그라운드 태스크가 덱 풀을 채워 두고 /시작은 꺼내 쓰기만 함.
+# 덱마다 os.urandom 128비트 시드로 셔플하고 시드는 game.deck_seed(스냅샷/트레이스)에 남김 → deck_from_seed로 재현
+DECK_POOL_SIZE = int(os.getenv("DECK_POOL_SIZE", "4"))
+PRERENDER_HOLE_CARDS = os.getenv("PRERENDER_HOLE_CARDS", "1") != "0"
+
+def deck_from_seed(seed: int):
     deck = create_deck()
-    random.shuffle(deck)
-    game["deck"] = deck
-    for uid in players:
+    random.Random(seed).shuffle(deck)
+    return deck
+
+class DeckPool:
+    __slots__ = ("size", "_decks", "_wake", "misses")
+
+    def __init__(self, size: int):
+        self.size = size
+        self._decks = deque()
+        self._wake = None
+        self.misses = 0
+
+    @staticmethod
+    def _make():
+        seed = int.from_bytes(os.urandom(16), "big")
+        return seed, deck_from_seed(seed)
+
+    def take(self):
+        """(seed, 셔플된 덱). 풀이 비었으면 그 자리에서 만듦 (misses 증가)"""
+        if self._wake: self._wake.set()
+        if self._decks:
+            return self._decks.popleft()
+        self.misses += 1
+        return self._make()
+
+    async def run(self):
+        """setup_hook에서 spawn. 꺼내 갈 때마다 깨어나 size개까지 채움 (덱은 한 번 쓰면 버림)"""
+        self._wake = asyncio.Event()
+        while True:
+            while len(self._decks) < self.size:
+                self._decks.append(self._make())
+                await asyncio.sleep(0)
+            self._wake.clear()
+            await self._wake.wait()
+
+    def __len__(self):
+        return len(self._decks)
+
+deck_pool = DeckPool(DECK_POOL_SIZE)
+Gauge("poker_deck_pool_size", "미리 셔플해 둔 덱 수", fn=lambda: len(deck_pool))
+Gauge("poker_deck_pool_misses", "풀이 비어 /시작에서 직접 셔플한 횟수", fn=lambda: deck_pool.misses)
+
+def deal_hole(seed=None):
+    """seed를 주면 그 시드의 덱으로 (시뮬레이션 재현용), 없으면 deck_pool에서"""
+    if seed is None:
+        seed, shuffled = deck_pool.take()
+    else:
+        shuffled = deck_from_seed(seed)
+    game.deck_seed = seed
+    deck = game.deck
+    deck[:] = shuffled
+    for p in players.values():
         # 게임 시작 시 플레이어 상태 초기화
-        players[uid]["cards"] = [deck.pop(), deck.pop()]
-        players[uid]["bet"] = 0
-        players[uid]["contrib"] = 0
-        players[uid]["folded"] = False
-        players[uid]["all_in"] = False
-        # [수정] AFK 퇴장 플래그 초기화 (게임이 시작되어야 초기화됨)
-        players[uid]["afk_kicked"] = False
+        # [수정] AFK 퇴장 플래그도 여기서 초기화 (게임이 시작되어야 초기화됨)
+        p.reset_for_hand((deck.pop(), deck.pop()))
+    _hole_images.clear()
+
+# 딜 직후 백그라운드에서 미리 만들어 두는 핸드 이미지 {uid: (cards, png bytes)}
+_hole_images = {}
+
+async def prerender_hole_cards():
+    """응답을 보낸 뒤 호출. 합성은 렌더 스레드에서"""
+    for uid, p in list(players.items()):
+        if is_bot(uid): continue
+        cards = tuple(p.cards)
+        buf = await compose_async(cards)
+        if buf and tuple(p.cards) == cards:
+            _hole_images[uid] = (cards, buf.getvalue())
+
+def cached_hole_image(uid, p):
+    """미리 만든 핸드 이미지 (없거나 카드가 바뀌었으면 None)"""
+    cached = _hole_images.get(uid)
+    if cached and cached[0] == tuple(p.cards):
+        return io.BytesIO(cached[1])
+    return None
+
+async def send_hole_image(inter, uid, p):
+    """'내 핸드 보기'/내핸드 공용: 캐시가 없으면 먼저 defer하고 렌더 스레드에서 합성"""
+    buf = cached_hole_image(uid, p)
+    if buf is None:
+        await defer(inter, ephemeral=True)
+        buf = await compose_async(p.cards)
+    if buf:
+        # [수정] "홀카드" -> "핸드"
+        await respond(inter, "🎴 당신의 핸드:", file=discord.File(buf, filename="my_cards.png"), ephemeral=True)
+    else:
+        await respond(inter, "카드 이미지를 생성할 수 없습니다.", ephemeral=True)
+
+# (카드 코드, 크기) -> 축소해 둔 RGBA 이미지. 렌더 스레드에서만 접근 (compose/preload_sprites)
+# 테이블마다 card_scale이 다를 수 있어 크기별로 따로 둠
+_sprites = {}
+
+def _sprite(code, size):
+    from PIL import Image # Pillow는 첫 렌더(또는 시작 후 preload_sprites) 때 import
+    img = _sprites.get((code, size))
+    if img is None:
+        path = os.path.join(CARDS_DIR, f"{code}.png")
+        if not os.path.exists(path):
+            logging.warning(f"카드 이미지 없음: {path}")
+            img = Image.new("RGBA", size, (200, 200, 200, 255))
+        else:
+            img = Image.open(path).convert("RGBA").resize(size, Image.LANCZOS)
+        _sprites[(code, size)] = img
+    return img
+
+def _sprite_size():
+    scale = game.cfg["card_scale"]
+    return max(1, int(CARD_W * scale)), max(1, int(CARD_H * scale))
+
+def preload_sprites():
+    """setup_hook에서 렌더 스레드로 제출: 게이트웨이 접속과 겹쳐서 카드 52장을 미리 읽어 둠"""
+    t0 = time.perf_counter()
+    try:
+        size = _sprite_size()
+        for code in create_deck():
+            _sprite(code, size)
+    except Exception as e:
+        logging.error(f"카드 이미지 미리 읽기 실패: {e}")
+    STARTUP_SECONDS.observe(time.perf_counter() - t0, "sprites")
 
 def compose(card_codes):
     if not card_codes:
         return None
-    try:
-        w_scaled = max(1, int(CARD_W * SCALE))
-        h_scaled = max(1, int(CARD_H * SCALE))
-        imgs = []
-        for code in card_codes:
-            path = os.path.join(CARDS_DIR, f"{code}.png")
-            if not os.path.exists(path):
-                logging.warning(f"카드 이미지 없음: {path}")
-                img = Image.new("RGBA", (w_scaled, h_scaled), (200, 200, 200, 255))
-            else:
-                img = Image.open(path).convert("RGBA").resize((w_scaled, h_scaled), Image.LANCZOS)
-            imgs.append(img)
-        total_w = w_scaled * len(imgs) + GAP * (len(imgs) - 1)
-        if total_w <= 0: total_w = 1
-        canvas = Image.new("RGBA", (total_w, h_scaled), (0,0,0,0))
-        x = 0
-        for im in imgs:
-            canvas.paste(im, (x, 0), im)
-            x += w_scaled + GAP
-        buf = io.BytesIO()
-        canvas.save(buf, "PNG")
-        buf.seek(0)
-        return buf
-    except Exception as e:
-        logging.error(f"이미지 합성 오류: {e}")
+    return compose_rows([card_codes])
+
+def compose_rows(rows):
+    """카드 줄 여러 개를 위아래로 쌓아 PNG 한 장으로 (런 잇 트와이스 보드, 래빗 헌팅 보드+핸드)"""
+    rows = [r for r in rows if r]
+    if not rows:
+        return None
+    with tracer.span("compose", cards=sum(map(len, rows)), rows=len(rows)):
+        try:
+            from PIL import Image
+            w_scaled, h_scaled = _sprite_size()
+            t0 = time.perf_counter()
+            width = max(len(r) for r in rows)
+            total_w = w_scaled * width + GAP * (width - 1)
+            total_h = h_scaled * len(rows) + GAP * (len(rows) - 1)
+            canvas = Image.new("RGBA", (max(1, total_w), max(1, total_h)), (0,0,0,0))
+            y = 0
+            for row in rows:
+                x = 0
+                for code in row:
+                    im = _sprite(code, (w_scaled, h_scaled))
+                    canvas.paste(im, (x, y), im)
+                    x += w_scaled + GAP
+                y += h_scaled + GAP
+            t1 = time.perf_counter()
+            buf = io.BytesIO()
+            canvas.save(buf, "PNG")
+            buf.seek(0)
+            t2 = time.perf_counter()
+            COMPOSE_SECONDS.observe(t1 - t0, "render")
+            COMPOSE_SECONDS.observe(t2 - t1, "encode")
+            COMPOSE_BYTES.observe(buf.getbuffer().nbytes)
+            return buf
+        except Exception as e:
+            logging.error(f"이미지 합성 오류: {e}")
+            return None
+
+# 테이블별 보드 캔버스 (카드 5장 폭). 턴/리버에는 새 카드만 붙이고 현재 장수만큼 잘라 인코딩,
+# 보드가 그대로면 인코딩해 둔 PNG를 다시 씀 (/상태, 쇼다운, 라이브 테이블). 렌더 스레드에서만 접근
+_boards = {} # table_id -> [크기, 카드 tuple, 캔버스, PNG bytes]
+BOARD_RENDERS = Counter("poker_board_renders_total", "보드 이미지 요청 (cached=PNG 재사용, incremental=새 카드만, full=새 캔버스)", "kind")
+
+def compose_board(table_id, cards):
+    if not cards:
         return None
+    cards = tuple(cards)
+    with tracer.span("compose_board", cards=len(cards)):
+        try:
+            from PIL import Image
+            size = _sprite_size()
+            w, h = size
+            entry = _boards.get(table_id)
+            if entry and entry[0] == size and entry[1] == cards:
+                BOARD_RENDERS.inc("cached")
+                return io.BytesIO(entry[3])
+            t0 = time.perf_counter()
+            if entry and entry[0] == size and cards[:len(entry[1])] == entry[1]:
+                canvas, start, kind = entry[2], len(entry[1]), "incremental"
+            else:
+                canvas, start, kind = Image.new("RGBA", (w * 5 + GAP * 4, h), (0,0,0,0)), 0, "full"
+            for i in range(start, len(cards)):
+                im = _sprite(cards[i], size)
+                canvas.paste(im, (i * (w + GAP), 0), im)
+            n = len(cards)
+            out = canvas if n == 5 else canvas.crop((0, 0, w * n + GAP * (n - 1), h))
+            t1 = time.perf_counter()
+            buf = io.BytesIO()
+            out.save(buf, "PNG")
+            t2 = time.perf_counter()
+            _boards[table_id] = [size, cards, canvas, buf.getvalue()]
+            BOARD_RENDERS.inc(kind)
+            COMPOSE_SECONDS.observe(t1 - t0, "render")
+            COMPOSE_SECONDS.observe(t2 - t1, "encode")
+            COMPOSE_BYTES.observe(buf.getbuffer().nbytes)
+            buf.seek(0)
+            return buf
+        except Exception as e:
+            logging.error(f"보드 이미지 합성 오류: {e}")
+            return None
+
+# compose는 PIL 렌더링/PNG 인코딩이라 CPU를 씀 → 응답 경로에서는 전용 스레드 1개에서 실행
+# (스레드가 하나라 COMPOSE_* 메트릭이나 PIL을 동시에 건드리지 않음)
+_RENDER_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+
+async def compose_async(card_codes):
+    ctx = contextvars.copy_context() # 트레이스 부모 span 유지
+    return await asyncio.get_running_loop().run_in_executor(_RENDER_POOL, ctx.run, compose, card_codes)
+
+async def compose_board_async(table_id, cards):
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_RENDER_POOL, ctx.run, compose_board, table_id, cards)
+
+async def compose_rows_async(rows):
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_RENDER_POOL, ctx.run, compose_rows, rows)
 
 def active_players():
     """폴드/파산(올인 제외)하지 않은 플레이어"""
-    return [uid for uid, p in players.items() if not p["folded"] and (p["coins"] > 0 or p["all_in"])]
+    return [uid for uid, p in players.items() if not p.folded and (p.coins > 0 or p.all_in)]
 
 def can_act(uid):
     """현재 턴에 행동(체크/콜/레이즈/폴드)이 가능한 플레이어"""
     p = players.get(uid)
-    return bool(p) and (not p["folded"]) and (not p["all_in"]) and p["coins"] > 0
+    return bool(p) and (not p.folded) and (not p.all_in) and p.coins > 0
 
 def ready_to_advance():
     """모든 유효 플레이어가 이번 스트리트에서 최소 1회 행동했고, bet == current_bet"""
     for uid, p in players.items():
-        if p["folded"] or p["all_in"]:
+        if p.folded or p.all_in:
             continue
-        if uid not in game["acted"]:
+        if uid not in game.acted:
             return False
-        if p["bet"] != game["current_bet"]:
+        if p.bet != game.current_bet:
             return False
     return True
 
 def next_actor_index(start_from=None):
     """start_from (포함) 부터 시작해서, 행동 가능한 다음 플레이어의 인덱스를 반환"""
-    i = game["idx"] if start_from is None else start_from
-    n = len(game["turn_order"])
+    i = game.idx if start_from is None else start_from
+    n = len(game.turn_order)
     if n == 0: return None
     for k in range(n):
         j = (i + k) % n
-        uid = game["turn_order"][j]
+        uid = game.turn_order[j]
         if can_act(uid):
             return j
     return None # 행동 가능한 플레이어 없음
@@ -207,10 +1806,130 @@ def score_5cards(cards5):
         p1 = pairs[0]; kick = sorted([v for v in vals if v!=p1], reverse=True)[:3]
         return (1, p1, *kick)
     return (0, *vals)
+
+# 런아웃 열거/샘플링용 비트마스크 평가기 (hand_strength와 승패 판정이 같고 ~20배 빠름)
+# 카드 = 랭크(0=2 .. 12=A)*4 + 무늬, 결과는 비교만 가능한 정수
+CARD_INDEX = {f"{r}{s}": i * 4 + j for i, r in enumerate(RANK_ORDER) for j, s in enumerate("shdc")}
+_STRAIGHT_WINDOWS = [(hi + 1, 0b11111 << (hi - 4)) for hi in range(12, 3, -1)] + [(4, 0b1000000001111)] # A-5
+
+def _straight_high(mask):
+    for hi, w in _STRAIGHT_WINDOWS:
+        if mask & w == w: return hi
+    return 0
+
+def _top_ranks(mask, k):
+    out = 0
+    for r in range(12, -1, -1):
+        if mask >> r & 1:
+            out = out * 16 + r
+            k -= 1
+            if k == 0: break
+    return out
+
+def rank7(cards):
+    """CARD_INDEX 정수 7장 → 강도 (클수록 강함)"""
+    counts = [0] * 13
+    suit_masks = [0, 0, 0, 0]
+    suit_counts = [0, 0, 0, 0]
+    rmask = 0
+    for c in cards:
+        r = c >> 2; s = c & 3
+        counts[r] += 1
+        suit_masks[s] |= 1 << r
+        suit_counts[s] += 1
+        rmask |= 1 << r
+    for s in range(4):
+        if suit_counts[s] >= 5: # 7장에서 플러시면 포카드/풀하우스는 불가능
+            sf = _straight_high(suit_masks[s])
+            if sf: return (8 << 20) | sf
+            return (5 << 20) | _top_ranks(suit_masks[s], 5)
+    quads = trips = pair1 = pair2 = -1
+    for r in range(12, -1, -1):
+        n = counts[r]
+        if n == 4: quads = r
+        elif n == 3:
+            if trips < 0: trips = r
+            elif pair1 < 0: pair1 = r # 두 번째 트리플은 풀하우스의 페어로
+        elif n == 2:
+            if pair1 < 0: pair1 = r
+            elif pair2 < 0: pair2 = r
+    if quads >= 0:
+        return (7 << 20) | quads << 4 | _top_ranks(rmask & ~(1 << quads), 1)
+    if trips >= 0 and pair1 >= 0:
+        return (6 << 20) | trips << 4 | pair1
+    st = _straight_high(rmask)
+    if st: return (4 << 20) | st
+    if trips >= 0:
+        return (3 << 20) | trips << 8 | _top_ranks(rmask & ~(1 << trips), 2)
+    if pair2 >= 0:
+        return (2 << 20) | pair1 << 8 | pair2 << 4 | _top_ranks(rmask & ~(1 << pair1) & ~(1 << pair2), 1)
+    if pair1 >= 0:
+        return (1 << 20) | pair1 << 12 | _top_ranks(rmask & ~(1 << pair1), 3)
+    return _top_ranks(rmask, 5)
+
 def hand_name(tup):
     names = {8:"스트레이트 플러시",7:"포카드",6:"풀하우스",5:"플러시",4:"스트레이트",3:"트리플",2:"투페어",1:"원페어",0:"하이카드"}
     return names.get(tup[0], "알 수 없음") if tup else "알 수 없음"
 
+# ====== 올인 승률 ======
+# 헤즈업 프리플랍 올인은 미리 계산한 169x169 표(tools/gen_preflop_equity.py → preflop_equity.bin)에서 바로 찾고,
+# 멀티웨이/포스트플랍은 남은 카드가 2장 이하면 전부 열거, 아니면 샘플링. 표는 처음 쓸 때 mmap으로 열어 시작 시간과 무관
+PREFLOP_EQUITY_PATH = os.getenv("PREFLOP_EQUITY_PATH", "./preflop_equity.bin")
+ALLIN_SAMPLES = int(os.getenv("ALLIN_SAMPLES", "3000"))
+_preflop_table = None # mmap, 파일이 없거나 깨졌으면 False
+
+def hand_class(hole):
+    """169개 시작 핸드 클래스의 13x13 격자 인덱스 (행/열 A..2, 대각선 = 페어, 위쪽 = 수티드, 아래쪽 = 오프수트)"""
+    (r1, s1), (r2, s2) = parse_card(hole[0]), parse_card(hole[1])
+    i, j = sorted((14 - RANK_ORDER[r1], 14 - RANK_ORDER[r2])) # i = 높은 카드 쪽 행
+    if s1 != s2: i, j = j, i
+    return i * 13 + j
+
+def _load_preflop_table():
+    global _preflop_table
+    try:
+        with open(PREFLOP_EQUITY_PATH, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:4] != b"PFEQ" or struct.unpack_from("<HH", mm, 4) != (1, 169) or len(mm) != 8 + 169 * 169 * 2:
+            raise ValueError("형식이 맞지 않음")
+        _preflop_table = mm
+    except Exception as e:
+        logging.warning(f"프리플랍 승률표를 쓸 수 없어 샘플링으로 계산합니다: {e}")
+        _preflop_table = False
+    return _preflop_table
+
+def preflop_matchup(hole_a, hole_b):
+    """헤즈업 프리플랍 올인에서 hole_a의 승률 (무승부는 절반). 표가 없으면 None"""
+    table = _preflop_table if _preflop_table is not None else _load_preflop_table()
+    if not table: return None
+    i = hand_class(hole_a) * 169 + hand_class(hole_b)
+    return struct.unpack_from("<H", table, 8 + 2 * i)[0] / 10000
+
+def allin_equity(hands, board, samples=ALLIN_SAMPLES, rng=random):
+    """hands {uid: 홀카드} → {uid: 승률 (무승부는 나눠 가짐)}. 표 조회가 아니면 CPU 작업이라 스레드에서 호출"""
+    uids = list(hands)
+    if len(uids) == 2 and not board:
+        eq = preflop_matchup(hands[uids[0]], hands[uids[1]])
+        if eq is not None:
+            return {uids[0]: eq, uids[1]: 1 - eq}
+    holes = [[CARD_INDEX[c] for c in hands[u]] for u in uids]
+    board = [CARD_INDEX[c] for c in board]
+    used = set(board).union(*holes)
+    rest = [c for c in range(52) if c not in used]
+    k = 5 - len(board)
+    runouts = combinations(rest, k) if k <= 2 else (rng.sample(rest, k) for _ in range(samples))
+    wins = [0.0] * len(uids)
+    n = 0
+    for extra in runouts:
+        full = board + list(extra)
+        scores = [rank7(h + full) for h in holes]
+        best = max(scores)
+        winners = [i for i, sc in enumerate(scores) if sc == best]
+        for i in winners:
+            wins[i] += 1 / len(winners)
+        n += 1
+    return {u: w / n for u, w in zip(uids, wins)}
+
 # ====== 사이드팟 (생략) ======
 def build_side_pots(contrib_map):
     levels = sorted(set([v for v in contrib_map.values() if v > 0]))
@@ -219,7 +1938,7 @@ def build_side_pots(contrib_map):
     for cap in levels:
         members_all = [uid for uid,v in contrib_map.items() if v >= cap]
         amount = (cap - prev) * len(members_all)
-        eligible = [uid for uid in members_all if not players[uid]["folded"]]
+        eligible = [uid for uid in members_all if not players[uid].folded]
         pots.append({"cap":cap, "members_all":members_all, "amount":amount, "eligible":eligible})
         prev = cap
     return pots
@@ -233,69 +1952,249 @@ def split_amount(amount, winners):
         dist[order[i]] += 1
     return dist
 
+# ====== 라이브 테이블 ======
+# live_table 설정을 켠 테이블은 진행 메시지(블라인드/스트리트/보드/차례/행동)를 따로 보내지 않고
+# 메시지 하나(보드 이미지 + 팟/스택/차례 + 최근 기록 + 핸드 보기/행동하기 버튼)를 제자리에서 고침.
+# 상태가 바뀌면 dirty만 표시하고, 편집은 LIVE_EDIT_INTERVAL마다 최대 1번으로 합쳐서 보냄.
+# 쇼다운/정산 결과는 핸드가 끝날 때 메시지 1개로 모아서 보냄
+LIVE_EDIT_INTERVAL = float(os.getenv("LIVE_EDIT_INTERVAL", "1.5"))
+LIVE_LOG_LINES = 6
+LIVE_UPDATES = Counter("poker_live_table_updates_total", "라이브 테이블 갱신 요청 수 (편집으로 합쳐지기 전)")
+LIVE_EDITS = Counter("poker_live_table_edits_total", "라이브 테이블 메시지 전송/편집 수", "op")
+_ROUND_NAMES = {"preflop": "프리플랍", "flop": "플랍", "turn": "턴", "river": "리버"}
+
+live_tables = {} # channel_id -> LiveTable (핸드 진행 중인 라이브 테이블만)
+
+class LiveTable:
+    __slots__ = ("channel", "peek", "message", "log", "results", "board", "boards", "dirty", "closed", "sleeping", "task", "last_edit")
+
+    def __init__(self, channel, uid_name_pairs):
+        self.channel = channel
+        self.peek = uid_name_pairs # '핸드 보기' 버튼 (uid, 이름)
+        self.message = None
+        self.log = []
+        self.results = []
+        self.board = () # 마지막으로 첨부한 보드
+        self.boards = None # 런 잇 멀티 보드 (있으면 보드당 한 줄 이미지로 표시)
+        self.dirty = False
+        self.closed = False
+        self.sleeping = False
+        self.task = None
+        self.last_edit = 0.0
+
+    def touch(self):
+        """다음 편집 때 현재 상태를 반영하도록 표시 (편집 태스크가 없으면 시작)"""
+        LIVE_UPDATES.inc()
+        self.dirty = True
+        if not self.closed and (self.task is None or self.task.done()):
+            self.task = spawn(self._run())
+
+    def note(self, line):
+        self.log.append(line)
+        del self.log[:-LIVE_LOG_LINES]
+        self.touch()
+
+    async def _run(self):
+        tracer.detach()
+        loop = asyncio.get_running_loop()
+        while self.dirty and not self.closed:
+            wait = self.last_edit + LIVE_EDIT_INTERVAL - loop.time()
+            if wait > 0:
+                self.sleeping = True
+                try:
+                    await asyncio.sleep(wait)
+                finally:
+                    self.sleeping = False
+            self.dirty = False
+            await self._push()
+
+    def _actor(self):
+        if self.closed or not game.game_started or game.idx >= len(game.turn_order): return None
+        uid = game.turn_order[game.idx]
+        return uid if can_act(uid) else None
+
+    def render(self):
+        pot = game.pot + sum(p.bet for p in players.values())
+        stage = "핸드 종료" if self.closed else _ROUND_NAMES.get(game.round, "-")
+        lines = [f"🃏 **라이브 테이블** — {stage} / 팟 **{pot}** / 현재 베팅 **{game.current_bet}** (SB {game.sb} / BB {game.bb})"]
+        if self.boards:
+            lines.extend(f"{r}번 보드: " + " ".join(f"`{c}`" for c in b) for r, b in enumerate(self.boards, 1))
+        elif game.community:
+            lines.append("보드: " + " ".join(f"`{c}`" for c in game.community))
+        actor = self._actor()
+        dealer = game.turn_order[game.dealer_pos] if 0 <= game.dealer_pos < len(game.turn_order) else None
+        for uid in game.turn_order:
+            p = players.get(uid)
+            if p is None: continue
+            mark = "▶️" if uid == actor else ("🔘" if uid == dealer else "▫️")
+            name = f"~~{p.name}~~" if p.folded else f"**{p.name}**"
+            bet = f" · 베팅 {p.bet}" if p.bet else ""
+            state = " (폴드)" if p.folded else (" (올인)" if p.all_in else "")
+            lines.append(f"{mark} {name} {p.coins}{bet}{state}")
+        if actor is not None:
+            lines.append(f"🎯 **{players[actor].name}** 차례" + (f" — 마감 <t:{game.deadline_ts}:R>" if game.deadline_ts else ""))
+        if self.log:
+            lines.append("")
+            lines.extend(self.log)
+        return "\n".join(lines)
+
+    def _view(self):
+        if self.closed: return None
+        view = discord.ui.View(timeout=None)
+        for i, (uid, name) in enumerate(self.peek):
+            view.add_item(PeekButton(uid, name, row=i // 5))
+        actor = self._actor()
+        if actor is not None and not is_bot(actor) and game.deadline_ts:
+            view.add_item(PromptButton(game.channel_id, game.idx, game.deadline_ts, row=2))
+        return view
+
+    async def _push(self):
+        kwargs = {"content": self.render(), "view": self._view()}
+        if self.boards:
+            board = tuple(map(tuple, self.boards))
+        else:
+            board = tuple(game.community)
+        if board != self.board:
+            if self.boards: buf = await compose_rows_async(self.boards)
+            else: buf = await compose_board_async(game.channel_id, board) if board else None
+            if buf:
+                file = discord.File(buf, filename="board.png")
+                if self.message is None: kwargs["file"] = file
+                else: kwargs["attachments"] = [file] # 보드가 바뀔 때만 이미지 교체
+            self.board = board
+        try:
+            if self.message is None:
+                self.message = await self.channel.send(**kwargs)
+                LIVE_EDITS.inc("send")
+            else:
+                await self.message.edit(**kwargs)
+                LIVE_EDITS.inc("edit")
+        except Exception as e:
+            LIVE_EDITS.inc("error")
+            logging.debug(f"라이브 테이블 갱신 실패: {e}")
+        self.last_edit = asyncio.get_running_loop().time()
+
+    async def close(self):
+        """핸드 종료: 대기 중인 편집은 버리고 최종 상태로 한 번 고친 뒤, 모아 둔 결과를 메시지 1개로 보냄"""
+        self.closed = True
+        task = self.task
+        if task and not task.done() and task is not asyncio.current_task():
+            if self.sleeping:
+                task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError: pass
+        await self._push()
+        if self.results:
+            await self.channel.send("\n".join(self.results))
+
+async def table_say(channel, content, result=False):
+    """진행 안내 메시지. 라이브 테이블이면 기록에 붙이고(result=True면 종료 시 결과 메시지로), 아니면 그대로 전송"""
+    live = live_tables.get(channel.id)
+    if live is None:
+        await channel.send(content)
+    elif result:
+        live.results.append(content)
+    else:
+        live.note(content)
+
+def live_note(channel, line):
+    """라이브 테이블에만 남기는 기록 (평소에는 에페메럴 응답뿐인 유저 행동 등)"""
+    live = live_tables.get(channel.id) if channel else None
+    if live is not None:
+        live.note(line)
+
+async def close_live_table(channel_id):
+    live = live_tables.pop(channel_id, None)
+    if live is not None:
+        await live.close()
+
 # ====== 라운드/턴 진행 ======
 async def disable_prev_prompt(channel: discord.abc.Messageable):
-    task = game.get("timer_task")
+    task = game.timer_task
     if task and not task.done():
         try:
             task.cancel()
             await task
         except asyncio.CancelledError: pass
         except Exception as e: logging.debug(f"timer_task await error: {e}")
-    game["timer_task"] = None
-    game["deadline_ts"] = None
-    msg_id = game.get("last_prompt_msg_id")
+    game.timer_task = None
+    game.deadline_ts = None
+    msg_id = game.last_prompt_msg_id
     if msg_id:
         try:
             msg = await channel.fetch_message(msg_id)
             await msg.edit(view=None)
         except Exception as e:
             logging.debug(f"disable_prev_prompt failed: {e}")
-    game["last_prompt_msg_id"] = None
+    game.last_prompt_msg_id = None
 
-async def prompt_action(channel):
-    if not game["turn_order"] or game["idx"] >= len(game["turn_order"]):
+async def prompt_action(channel, resume_deadline_ts=None):
+    """resume_deadline_ts: 스냅샷 복구 시 남은 마감 시간을 이어서 사용 (최소 10초 보장)"""
+    if not game.turn_order or game.idx >= len(game.turn_order):
         logging.error("잘못된 턴 상태 (prompt_action)"); return
     
-    # [수정] 현재 인덱스(game["idx"])부터 행동 가능한 사람을 찾음
-    next_idx = next_actor_index(game["idx"])
+    # [수정] 현재 인덱스(game.idx)부터 행동 가능한 사람을 찾음
+    next_idx = next_actor_index(game.idx)
     if next_idx is None:
         # 행동할 플레이어가 아무도 없음 (예: 모두 올인/폴드)
         logging.info("행동할 플레이어 없음, 다음 스트리트로 강제 진행")
         await go_next_street(channel)
         return
 
-    game["idx"] = next_idx # 실제 턴 인덱스 업데이트
-    uid = game["turn_order"][game["idx"]]
+    game.idx = next_idx # 실제 턴 인덱스 업데이트
+    uid = game.turn_order[game.idx]
     
-    # [버그 수정] 이 로직이 120초 타이머가 시작되는 것을 막아줌
-    alive = [u for u in active_players() if not players[u]["folded"]]
+    # [버그 수정] 이 로직이 턴 타이머가 시작되는 것을 막아줌
+    alive = [u for u in active_players() if not players[u].folded]
     if len(alive) <= 1:
         await handle_single_winner(channel, alive); return
 
-    p = players[uid]; cur_bet = game["current_bet"]
-    need_to_call = max(0, cur_bet - p["bet"])
+    p = players[uid]; cur_bet = game.current_bet
+    need_to_call = max(0, cur_bet - p.bet)
 
     await disable_prev_prompt(channel)
 
-    # 턴이 돌아올 때마다 120초 타이머 리셋
-    deadline = datetime.utcnow() + timedelta(seconds=120)
-    game["deadline_ts"] = int(deadline.timestamp()) # [버그 수정] 턴마다 고유한 마감 시간 생성
+    live = live_tables.get(channel.id)
+    if is_bot(uid):
+        # 봇은 View 없이 잠시 뒤 스스로 행동 (새 태스크라 봇끼리 연달아 행동해도 호출이 깊어지지 않음)
+        if live: live.touch()
+        save_snapshot()
+        game.timer_task = asyncio.create_task(_bot_turn(channel, uid))
+        return
+
+    # 턴이 돌아올 때마다 타이머 리셋 (turn_seconds 설정, 기본 120초)
+    deadline = datetime.utcnow() + timedelta(seconds=game.cfg["turn_seconds"])
+    game.deadline_ts = int(deadline.timestamp()) # [버그 수정] 턴마다 고유한 마감 시간 생성
+    if resume_deadline_ts is not None:
+        game.deadline_ts = max(resume_deadline_ts, int(datetime.utcnow().timestamp()) + 10)
 
     base_text = (
-        f"🎯 **{p['name']}**의 차례!\n"
-        f"라운드: **{game['round'] or 'preflop'}** / 팟: **{game['pot']}** / "
-        f"콜 필요: **{need_to_call}** / 보유: **{p['coins']}**"
+        f"🎯 **{p.name}**의 차례!\n"
+        f"라운드: **{game.round or 'preflop'}** / 팟: **{game.pot}** / "
+        f"콜 필요: **{need_to_call}** / 보유: **{p.coins}**"
     )
-    # [버그 수정] 고유한 마감 시간을 뷰에도 전달
-    view = ActionPromptView(actor_id=uid, deadline_ts=game["deadline_ts"])
+    if live:
+        # 행동하기 버튼은 라이브 테이블 메시지에 달림 (진행바 편집 없이 마감만 기다림)
+        live.touch()
+        tracer.mark_turn()
+        game.turn_started = time.monotonic()
+        save_snapshot()
+        game.timer_task = asyncio.create_task(_run_countdown(None, base_text, game.deadline_ts, uid))
+        return
+
+    # [버그 수정] 고유한 마감 시간을 버튼 custom_id(nonce)에도 전달
+    view = ActionPromptView(game.channel_id, game.idx, game.deadline_ts)
     msg = await channel.send(
-        base_text + f"\n⏳ 마감: <t:{game['deadline_ts']}:R> (<t:{game['deadline_ts']}:T>)",
+        base_text + f"\n⏳ 마감: <t:{game.deadline_ts}:R> (<t:{game.deadline_ts}:T>)",
         view=view
     )
-    game["last_prompt_msg_id"] = msg.id
-    # 타이머 갱신 작업 시작
-    game["timer_task"] = asyncio.create_task(_run_countdown(msg, base_text, game["deadline_ts"]))
+    game.last_prompt_msg_id = msg.id
+    tracer.mark_turn()
+    game.turn_started = time.monotonic()
+    save_snapshot()
+    # 타이머 갱신 + 마감 시 자동 폴드 작업 시작
+    game.timer_task = asyncio.create_task(_run_countdown(msg, base_text, game.deadline_ts, uid))
 
 async def advance_or_next_round(channel):
     """
@@ -305,7 +2204,7 @@ async def advance_or_next_round(channel):
     """
     
     # [버그 수정] advance_or_next_round가 호출되기 직전에 이미 승자가 결정됐는지 확인
-    alive = [u for u in active_players() if not players[u]["folded"]]
+    alive = [u for u in active_players() if not players[u].folded]
     if len(alive) <= 1:
         await handle_single_winner(channel, alive); return
 
@@ -313,90 +2212,113 @@ async def advance_or_next_round(channel):
         await go_next_street(channel)
     else:
         # 다음 턴 (현재 턴 + 1)
-        next_idx = next_actor_index(game["idx"] + 1)
+        next_idx = next_actor_index(game.idx + 1)
         if next_idx is not None:
-            game["idx"] = next_idx
+            game.idx = next_idx
             await prompt_action(channel)
         else:
             # 다음 사람이 없으면 (예: 현재 턴이 마지막이었음)
             # 하지만 ready_to_advance()가 False (예: A 100벳, B 200벳)
             # -> 다시 처음(SB)부터 돌아서 행동해야 함
-            first_actor_i = (game["dealer_pos"] + 1) % len(game["turn_order"])
+            first_actor_i = (game.dealer_pos + 1) % len(game.turn_order)
             next_idx_from_start = next_actor_index(first_actor_i)
             
             if next_idx_from_start is not None:
-                 game["idx"] = next_idx_from_start
+                 game.idx = next_idx_from_start
                  await prompt_action(channel)
             else:
                  # 그래도 없으면 (모두 행동했는데 ready_to_advance가 False? -> 오류 상황이거나, 모두 올인/폴드)
                  await go_next_street(channel)
 
 # end_game 함수: 플레이어를 유지하고 상태만 초기화
-async def end_game():
-    global game, players # 'players' 딕셔너리를 유지합니다.
+async def end_game(winnings=None):
+    """winnings: {uid: 이번 핸드에서 가져간 코인} (통계용, 팟 없이 끝나면 None)"""
+    # 'players'는 유지하고 'game'만 초기화합니다.
 
     # 1. 타이머 정리
-    task = game.get("timer_task")
+    task = game.timer_task
     if task and not task.done():
         try:
             task.cancel()
             await task
         except asyncio.CancelledError: pass
-    game["timer_task"] = None
-    game["deadline_ts"] = None
+    game.timer_task = None
+    game.deadline_ts = None
+    await close_live_table(game.channel_id) # 최종 상태로 고치고 모아 둔 결과를 보냄
+    if game.game_started and winnings: # 파산/AFK로 players에서 빠지기 전에 기여분을 넘김
+        anomaly_event("result", {uid: p.contrib for uid, p in players.items() if p.contrib},
+                      {uid: won for uid, won in winnings.items() if won}, game.bb)
 
     # 2. 다음 게임에서 제외할 플레이어 확인 (AFK 또는 파산)
-    channel = bot.get_channel(game["channel_id"])
+    channel = bot.get_channel(game.channel_id)
     if not channel:
         logging.error("end_game: Channel not found, cannot send messages.")
 
     uids_to_remove = []
     uids_to_keep = []
-    
+    in_tourney = tourney_hand_live() # 토너먼트 칩은 tourney_after_hand에서 처리 (코인/in_game은 그대로)
+
     # .items() 대신 list(players)로 순회 (딕셔너리 변경 중 에러 방지)
-    for uid in list(players.keys()):
+    for uid in ([] if in_tourney else list(players.keys())):
         p = players[uid]
-        if p.get("afk_kicked", False):
+        if p.afk_kicked:
             uids_to_remove.append((uid, "AFK(시간 초과)로 인해 퇴장합니다."))
-        elif p["coins"] <= 0:
+        elif p.coins <= 0:
             uids_to_remove.append((uid, "코인을 모두 잃어 퇴장합니다. (파산)"))
         else:
             uids_to_keep.append(uid)
 
+    if channel:
+        for uid, reason in uids_to_remove:
+            # 플레이어 객체가 아직 남아있을 때 메시지 전송
+            await channel.send(f"🚪 **{players[uid].name}**님: {reason}")
+
     # 3. DB 업데이트 및 로컬 캐시(players) 정리
-    async with aiosqlite.connect("test.db") as db:
+    async with db_connect("end_game") as db:
         for uid, reason in uids_to_remove:
-            if channel:
-                # 플레이어 객체가 아직 남아있을 때 메시지 전송
-                if uid in players:
-                    await channel.send(f"🚪 **{players[uid]['name']}**님: {reason}")
             # DB: in_game=0 (퇴장), 코인 저장
-            await db.execute("UPDATE character SET in_game=0, coin=? WHERE user_id=?", (players[uid]['coins'], uid))
-            if uid in players:
-                players.pop(uid) # 로컬 캐시에서 제거
+            p = players.pop(uid) # 로컬 캐시에서 제거
+            if is_bot(uid): continue # 봇은 DB에 없음
+            await db.execute("UPDATE character SET in_game=0, coin=? WHERE user_id=?", (p.coins, uid))
+            char_cache.put(uid, p.name, p.coins, 0)
         
         for uid in uids_to_keep:
             # DB: in_game=1 (유지), 코인 저장
-            await db.execute("UPDATE character SET in_game=1, coin=? WHERE user_id=?", (players[uid]['coins'], uid))
+            p = players[uid]
+            if is_bot(uid): continue
+            await db.execute("UPDATE character SET in_game=1, coin=? WHERE user_id=?", (p.coins, uid))
+            char_cache.put(uid, p.name, p.coins, 1)
             # [추가] 로비에 남는 유저의 AFK 플래그를 즉시 초기화
-            if uid in players:
-                players[uid]["afk_kicked"] = False
+            p.afk_kicked = False
+
+        # 누적 통계 (이번 핸드에 카드를 받은 유저만)
+        if game.game_started:
+            winnings = winnings or {}
+            await db.executemany(
+                "INSERT INTO character_stats (user_id, hands_played, hands_won, biggest_pot) VALUES (?,1,?,?) "
+                "ON CONFLICT(user_id) DO UPDATE SET hands_played=hands_played+1, "
+                "hands_won=hands_won+excluded.hands_won, biggest_pot=MAX(biggest_pot, excluded.biggest_pot)",
+                [(uid, 1 if winnings.get(uid, 0) > 0 else 0, winnings.get(uid, 0)) for uid in game.turn_order if not is_bot(uid)],
+            )
+        await db.commit()
+
+    if game.game_started:
+        REST_PER_HAND.observe(game.rest_calls)
+        tracer.end_hand(rest_calls=game.rest_calls, pot=game.pot)
 
     # 4. 'game' 상태만 초기화 ('players'는 유지)
-    game = {
-        "deck": [], "community": [], "pot": 0, "round": None,
-        "turn_order": [], "idx": 0, "current_bet": 0, "acted": set(),
-        "game_started": False, # <-- 게임 종료 상태
-        "last_prompt_msg_id": None, "channel_id": game.get("channel_id"), # 채널 ID 유지
-        "dealer_pos": game.get("dealer_pos", -1), # 딜러 위치 유지
-        "sb": 10, "bb": 20,
-        "timer_task": None, "deadline_ts": None,
-    }
+    game.reset() # 채널 ID, 딜러 위치는 유지
+    clear_snapshot()
+
+    if in_tourney:
+        await tourney_after_hand(channel)
+        schedule_auto_deal(channel)
+        return
 
     # 5. 다음 게임 로비 안내
     if channel:
         if players: # 남아있는 플레이어가 있다면
-            names = ", ".join([p['name'] for p in players.values()])
+            names = ", ".join([p.name for p in players.values()])
             await channel.send(
                 f"✅ 게임 종료! 다음 게임을 준비합니다.\n"
                 f"현재 참가자 ({len(players)}명): {names}\n\n"
@@ -405,70 +2327,85 @@ async def end_game():
             )
         else:
             await channel.send("✅ 게임 종료! 모든 플레이어가 퇴장했습니다.")
+    schedule_auto_deal(channel)
 
-async def go_next_street(channel):
+_NEXT_STREET = {"preflop": "flop", "flop": "turn", "turn": "river"}
+_STREET_MESSAGES = {"flop": "🔥 **플랍 공개!**", "turn": "🌪️ **턴 공개!**", "river": "🌊 **리버 공개!**"}
+
+def deal_next_street():
+    """
+    이번 스트리트 베팅을 팟으로 옮기고 다음 스트리트 카드를 깔고 첫 액터를 정함 (Discord 호출 없음)
+    반환: 새 라운드 이름, 리버 다음이면 "showdown", 덱이 부족하면 None
+    """
     # 1) 이번 스트리트 베팅을 팟으로 이동
     for uid, p in players.items():
-        game["pot"] += p["bet"]
-        p["contrib"] = p.get("contrib", 0) + p["bet"]
-        p["bet"] = 0
-    game["current_bet"] = 0
-    game["acted"].clear()
+        game.pot += p.bet
+        p.contrib += p.bet
+        p.bet = 0
+    game.current_bet = 0
+    game.acted.clear()
+
+    street = _NEXT_STREET.get(game.round, "showdown")
+    if street == "showdown":
+        return street
+    game.round = street
+    k = 3 if street == "flop" else 1
+    if len(game.deck) < k:
+        return None
+    if street == "flop":
+        game.community = [game.deck.pop() for _ in range(k)]
+    else:
+        game.community.append(game.deck.pop())
+    n = len(game.turn_order)
+    if n > 0:
+        first_postflop_i = (game.dealer_pos + 1) % n
+        maybe = next_actor_index(first_postflop_i)
+        if maybe is not None: game.idx = maybe
+    return street
+
+async def show_allin_equity(channel, uids):
+    """올인 런아웃 시작 시 남은 플레이어의 핸드와 승률 공개"""
+    hands = {u: tuple(players[u].cards) for u in uids}
+    eq = await asyncio.to_thread(allin_equity, hands, tuple(game.community))
+    lines = [f"**{players[u].name}** `{hands[u][0]}` `{hands[u][1]}` — **{eq[u]:.1%}**"
+             for u in sorted(uids, key=eq.get, reverse=True)]
+    await table_say(channel, "📊 **올인! 승률**\n" + "\n".join(lines))
+
+@timed("go_next_street")
+async def go_next_street(channel):
+    # 더 이상 베팅할 사람이 없으면 (올인 런아웃) 남은 카드를 깔기 전에 승률을 한 번 보여줌
+    if not game.runout_shown and len(game.community) < 5:
+        alive = [uid for uid, p in players.items() if not p.folded]
+        if len(alive) >= 2 and sum(1 for uid in alive if can_act(uid)) <= 1:
+            game.runout_shown = True
+            try:
+                await show_allin_equity(channel, alive)
+            except Exception as e:
+                logging.exception(f"올인 승률 계산 실패: {e}")
+            if run_it.get(channel.id, 1) > 1 and await resolve_run_it(channel, run_it[channel.id]):
+                return
 
-    current_round = game.get("round", "preflop")
-    
-    if current_round == "preflop":
-        game["round"] = "flop"
-        if len(game["deck"]) >= 3:
-            game["community"] = [game["deck"].pop(), game["deck"].pop(), game["deck"].pop()]
-            await channel.send("🔥 **플랍 공개!**")
-        else:
-            logging.error("덱 카드 부족"); await end_game(); return
-        n = len(game["turn_order"])
-        if n > 0:
-            first_postflop_i = (game["dealer_pos"] + 1) % n
-            maybe = next_actor_index(first_postflop_i)
-            if maybe is not None: game["idx"] = maybe
-
-    elif current_round == "flop":
-        game["round"] = "turn"
-        if len(game["deck"]) >= 1:
-            game["community"].append(game["deck"].pop())
-            await channel.send("🌪️ **턴 공개!**")
-        else:
-            logging.error("덱 카드 부족"); await end_game(); return
-        n = len(game["turn_order"])
-        if n > 0:
-            first_postflop_i = (game["dealer_pos"] + 1) % n
-            maybe = next_actor_index(first_postflop_i)
-            if maybe is not None: game["idx"] = maybe
-
-    elif current_round == "turn":
-        game["round"] = "river"
-        if len(game["deck"]) >= 1:
-            game["community"].append(game["deck"].pop())
-            await channel.send("🌊 **리버 공개!**")
-        else:
-            logging.error("덱 카드 부족"); await end_game(); return
-        n = len(game["turn_order"])
-        if n > 0:
-            first_postflop_i = (game["dealer_pos"] + 1) % n
-            maybe = next_actor_index(first_postflop_i)
-            if maybe is not None: game["idx"] = maybe
-    else: # river
+    street = deal_next_street()
+    if street is None:
+        logging.error("덱 카드 부족"); await end_game(); return
+    if street == "showdown":
         await resolve_showdown(channel)
         return
+    anomaly_event("street")
+    await table_say(channel, _STREET_MESSAGES[street])
 
-    buf = compose(game["community"])
-    if buf:
-        await channel.send(file=discord.File(buf, filename=f"board_{game['round']}.png"))
+    save_snapshot()
+    if channel.id not in live_tables: # 라이브 테이블은 테이블 메시지의 보드 이미지를 교체
+        buf = await compose_board_async(channel.id, game.community)
+        if buf:
+            await channel.send(file=discord.File(buf, filename=f"board_{game.round}.png"))
 
     # 4) 다음 액터 프롬프트 (행동 가능한 사람이 2명 이상인지 확인)
-    remaining_to_act = [uid for uid in game["turn_order"] if can_act(uid)]
-    if len(remaining_to_act) < 2 and game["round"] != "river":
+    remaining_to_act = [uid for uid in game.turn_order if can_act(uid)]
+    if len(remaining_to_act) < 2 and game.round != "river":
          # 행동할 사람이 1명 이하거나, 모두 올인 상태면
          # 다음 스트리트로 바로 진행 (베팅 라운드 스킵)
-         await channel.send("남은 플레이어가 1명 이하이거나 모두 올인 상태입니다. 다음 카드를 즉시 공개합니다.")
+         await table_say(channel, "남은 플레이어가 1명 이하이거나 모두 올인 상태입니다. 다음 카드를 즉시 공개합니다.")
          await asyncio.sleep(1) # 잠시 대기
          await go_next_street(channel)
     else:
@@ -484,32 +2421,40 @@ async def go_next_street(channel):
 async def handle_single_winner(channel, alive):
     # 1. 팟 정산
     for p in players.values():
-        game["pot"] += p["bet"]
-        p["contrib"] = p.get("contrib", 0) + p["bet"]
-        p["bet"] = 0
+        game.pot += p.bet
+        p.contrib += p.bet
+        p.bet = 0
     
-    current_pot = game["pot"]
+    current_pot = game.pot
 
     # 2. 승자가 없는 경우 (모두 폴드?)
     if not alive:
-        await channel.send("모두 폴드하여 팟이 증발했습니다...")
+        await table_say(channel, "모두 폴드하여 팟이 증발했습니다...", result=True)
         await end_game() # 게임 종료
         return
     
-    # 3. 승자가 있는 경우 (10초 뷰 표시)
+    # 3. 승자가 있는 경우 (winner_seconds 동안 뷰 표시)
     winner_uid = alive[0]
     p = players.get(winner_uid)
     if not p:
         logging.error(f"handle_single_winner: 승리자 {winner_uid} 정보를 찾을 수 없음")
         await end_game()
         return
+    save_snapshot(phase="winner", winner_uid=winner_uid, pot=current_pot)
         
-    winner_name = p["name"]
+    winner_name = p.name
+
+    if is_bot(winner_uid):
+        # 봇은 공개/래빗 헌팅을 고르지 않음 → 숨기기와 동일하게 바로 지급
+        p.coins += current_pot
+        await table_say(channel, f"💰 **{winner_name}**님이 팟 {current_pot} 코인을 획득했습니다!", result=True)
+        await end_game({winner_uid: current_pot})
+        return
     
     # [수정] WinnerOptionsView (래빗 헌팅 포함)
     view = WinnerOptionsView(winner_uid=winner_uid, winner_name=winner_name, pot=current_pot)
     await channel.send(
-        f"🏆 **{winner_name}** 단독 승리! 래빗 헌팅 또는 핸드 공개를 선택하세요. (10초)",
+        f"🏆 **{winner_name}** 단독 승리! 래빗 헌팅 또는 핸드 공개를 선택하세요. ({game.cfg['winner_seconds']}초)",
         view=view
     )
     
@@ -517,93 +2462,209 @@ async def handle_single_winner(channel, alive):
 
 
 # ====== 쇼다운/정산 ======
+def settle_showdown():
+    """
+    폴드하지 않은 플레이어 핸드를 평가해 메인/사이드팟을 나누고 코인까지 지급 (Discord 호출 없음)
+    반환: (strength_cache {uid: 족보}, [(팟 번호, 금액, 승자 uid들, 족보)], winnings {uid: 획득},
+          pot_winners {다른 사람과 다툰 팟을 (일부라도) 가져간 uid} — 혼자 남은 팟의 반환분은 제외)
+    """
+    contrib = {uid: players[uid].contrib for uid in players}
+    pots = build_side_pots(contrib)
+
+    board = game.community
+    winnings = {uid: 0 for uid in players}
+    strength_cache = {}
+    for uid, p in players.items():
+        if p.folded: continue
+        strength_cache[uid] = hand_strength(p.cards + board)
+
+    pot_results = []
+    pot_winners = set()
+    for i, pot in enumerate(pots, 1):
+        amount = pot["amount"]; eligible = pot["eligible"]
+        if not eligible or amount <= 0: continue
+        best, winners = None, []
+        for uid in eligible:
+            st = strength_cache.get(uid)
+            if st is None: continue
+            if (best is None) or (st > best):
+                best = st; winners = [uid]
+            elif st == best:
+                winners.append(uid)
+
+        dist = split_amount(amount, winners)
+        for uid, val in dist.items():
+            winnings[uid] += val
+        pot_results.append((i, amount, winners, best))
+        if sum(1 for uid in eligible if uid in strength_cache) > 1:
+            pot_winners.update(winners)
+
+    for uid, won in winnings.items():
+        players[uid].coins += won
+    return strength_cache, pot_results, winnings, pot_winners
+
+# 런 잇 트와이스/쓰리스: 올인 런아웃에서 남은 카드를 여러 번 깔고 팟을 보드 수만큼 나눠 보드마다 승자를 가림
+RUN_IT_MAX = 3
+RUN_IT_NAMES = {2: "트와이스", 3: "쓰리스"}
+run_it = {} # channel_id -> 보드를 깔 횟수 (2~RUN_IT_MAX). /런잇으로 켠 채널만
+
+def settle_runs(boards):
+    """
+    보드 여러 개로 메인/사이드팟을 나눠 정산하고 코인까지 지급 (Discord 호출 없음)
+    홀카드는 한 번만 CARD_INDEX로 바꾸고 보드마다 rank7만 돌림 → 보드가 늘어도 비용은 거의 그대로
+    겨룰 상대가 없는 팟(콜 받지 못한 초과분)은 나누지 않고 그대로 돌려줌
+    반환: ([(보드 번호, [(팟 번호, 몫, 승자 uid들, 족보 이름)])], [(팟 번호, 금액, uid)] 반환분, winnings {uid: 획득})
+    """
+    contrib = {uid: players[uid].contrib for uid in players}
+    pots = []
+    refunds = []
+    for i, pot in enumerate(build_side_pots(contrib), 1):
+        if pot["amount"] <= 0 or not pot["eligible"]: continue
+        if len(pot["eligible"]) == 1:
+            refunds.append((i, pot["amount"], pot["eligible"][0]))
+        else:
+            pots.append((i, pot))
+    holes = {uid: [CARD_INDEX[c] for c in p.cards] for uid, p in players.items() if not p.folded}
+    winnings = {uid: 0 for uid in players}
+    for _, amount, uid in refunds:
+        winnings[uid] += amount
+    n = len(boards)
+    runs = []
+    for r, board in enumerate(boards):
+        b = [CARD_INDEX[c] for c in board]
+        scores = {uid: rank7(h + b) for uid, h in holes.items()}
+        results = []
+        for i, pot in pots:
+            amount = pot["amount"]; eligible = pot["eligible"]
+            share = amount // n + (1 if r < amount % n else 0) # 나누어떨어지지 않는 칩은 앞 보드부터
+            best = max(scores[uid] for uid in eligible)
+            winners = [uid for uid in eligible if scores[uid] == best]
+            for uid, val in split_amount(share, winners).items():
+                winnings[uid] += val
+            results.append((i, share, winners, hand_name((best >> 20,)))) # rank7 상위 비트 = 족보 등급
+        runs.append((r + 1, results))
+
+    for uid, won in winnings.items():
+        players[uid].coins += won
+    return runs, refunds, winnings
+
+async def resolve_run_it(channel, times):
+    """
+    남은 덱에서 보드를 times번 따로 깔아 정산하고 모든 보드를 이미지 한 장(보드당 한 줄)으로 보냄.
+    덱이 모자라 2번도 못 깔면 False (평소처럼 한 번만 진행)
+    """
+    need = 5 - len(game.community)
+    times = min(times, len(game.deck) // need) if need > 0 else 1
+    if times < 2:
+        return False
+    for p in players.values():
+        game.pot += p.bet
+        p.contrib += p.bet
+        p.bet = 0
+    boards = [game.community + [game.deck.pop() for _ in range(need)] for _ in range(times)]
+    game.community = boards[0]
+    runs, refunds, winnings = settle_runs(boards)
+    first = [CARD_INDEX[c] for c in boards[0]] # 족보 분포는 첫 번째 보드 기준
+    pot_winners = {uid for _, results in runs for _, _, winners, _ in results for uid in winners} # 반환분(refunds)은 제외
+    hud_showdown([(uid, rank7([CARD_INDEX[c] for c in p.cards] + first) >> 20, uid in pot_winners)
+                  for uid, p in players.items() if not p.folded])
+
+    title = f"🃏 **런 잇 {RUN_IT_NAMES.get(times, f'{times}번')}!** (위에서부터 1~{times}번 보드)"
+    live = live_tables.get(channel.id)
+    if live is not None: # 라이브 테이블은 테이블 메시지의 보드 이미지를 보드당 한 줄로 교체
+        live.boards = boards
+        await table_say(channel, title)
+    else:
+        buf = await compose_rows_async(boards)
+        if buf:
+            await channel.send(title, file=discord.File(buf, filename="run_it_boards.png"))
+        else:
+            await channel.send(title + "\n" + "\n".join(" ".join(f"`{c}`" for c in b) for b in boards))
+
+    lines = []
+    for r, results in runs:
+        for i, share, winners, name in results:
+            pot_label = "메인팟" if i == 1 else f"사이드팟 #{i}"
+            lines.append(f"**{r}번 보드** {pot_label} {share} → {', '.join(players[u].name for u in winners)} ({name})")
+    for i, amount, uid in refunds:
+        lines.append(f"사이드팟 #{i} {amount} → {players[uid].name} (반환)")
+    await table_say(channel, "🎯 **보드별 결과:**\n" + "\n".join(lines), result=True)
+
+    result_lines = [f"**{p.name}**: +{winnings[uid]} 코인 (현재: {p.coins})" for uid, p in players.items() if winnings.get(uid, 0) > 0]
+    await table_say(channel, f"💰 **총 {sum(winnings.values())} 코인 분배 완료!**\n" + "\n".join(result_lines), result=True)
+    await end_game(winnings)
+    return True
+
+@timed("resolve_showdown")
 async def resolve_showdown(channel):
     # 1. 마지막 베팅 이동
     for uid, p in players.items():
-        game["pot"] += p["bet"]
-        p["contrib"] = p.get("contrib", 0) + p["bet"]
-        p["bet"] = 0
+        game.pot += p.bet
+        p.contrib += p.bet
+        p.bet = 0
 
     # 2. 쇼다운 대상자 확인
-    remaining = [uid for uid, p in players.items() if not p["folded"]]
+    remaining = [uid for uid, p in players.items() if not p.folded]
     if len(remaining) <= 1:
         await handle_single_winner(channel, remaining)
         return
 
-    # 3. 사이드팟 빌드
-    contrib = {uid: players[uid].get("contrib", 0) for uid in players}
-    pots = build_side_pots(contrib)
-
-    # 4. 핸드 평가
-    board = game["community"]
-    winnings = {uid: 0 for uid in players}
-    strength_cache = {}
-    for uid, p in players.items():
-        if p["folded"]: continue
-        strength_cache[uid] = hand_strength(p["cards"] + board)
+    # 3~4. 사이드팟 빌드, 핸드 평가, 분배 (코인 지급까지)
+    strength_cache, pot_results, winnings, pot_winners = settle_showdown()
+    hud_showdown([(uid, st[0], uid in pot_winners) for uid, st in strength_cache.items()])
 
-    if board:
-        buf = compose(board)
+    # 라이브 테이블은 보드를 테이블 메시지에 보여주고, 핸드는 이미지 대신 요약에 카드로 적음
+    live = channel.id in live_tables
+    board = game.community
+    if board and not live:
+        buf = await compose_board_async(channel.id, board)
         if buf: await channel.send("🃏 **최종 보드:**", file=discord.File(buf, filename="final_board.png"))
 
     # 5. 핸드 공개
     desc_lines = []
-    sorted_showdown = sorted(strength_cache.keys(), key=lambda u: players[u]["name"])
+    sorted_showdown = sorted(strength_cache.keys(), key=lambda u: players[u].name)
 
     for uid in sorted_showdown:
         st = strength_cache[uid]
-        desc_lines.append(f"**{players[uid]['name']}**: {hand_name(st)}")
-        buf = compose(players[uid]["cards"])
+        if live:
+            desc_lines.append(f"**{players[uid].name}** `{players[uid].cards[0]}` `{players[uid].cards[1]}`: {hand_name(st)}")
+            continue
+        desc_lines.append(f"**{players[uid].name}**: {hand_name(st)}")
+        buf = await compose_async(players[uid].cards)
         if buf:
-            await channel.send(f"{players[uid]['name']}의 핸드: `{players[uid]['cards'][0]}`, `{players[uid]['cards'][1]}`", file=discord.File(buf, filename=f"hand_{players[uid]['name']}.png"))
+            await channel.send(f"{players[uid].name}의 핸드: `{players[uid].cards[0]}`, `{players[uid].cards[1]}`", file=discord.File(buf, filename=f"hand_{players[uid].name}.png"))
     
     if desc_lines:
-        await channel.send("🎯 **쇼다운 요약:**\n" + "\n".join(desc_lines))
+        await table_say(channel, "🎯 **쇼다운 요약:**\n" + "\n".join(desc_lines), result=True)
 
-    # 6. 팟 분배
-    for i, pot in enumerate(pots, 1):
-        amount = pot["amount"]; eligible = pot["eligible"]
-        if not eligible or amount <= 0: continue
-        best, winners = None, []
-        for uid in eligible:
-            st = strength_cache.get(uid)
-            if st is None: continue
-            if (best is None) or (st > best):
-                best = st; winners = [uid]
-            elif st == best:
-                winners.append(uid)
-        
-        dist = split_amount(amount, winners)
-        for uid, val in dist.items():
-            winnings[uid] += val
-        
-        winner_names = [players[u]['name'] for u in winners]
+    # 6. 팟 분배 결과
+    for i, amount, winners, best in pot_results:
+        winner_names = [players[u].name for u in winners]
         if winners:
-            await channel.send(f"🫙 **{'메인팟' if i == 1 else f'사이드팟 #{i}'}** (총 {amount}) → 승자: {', '.join(winner_names)} ({hand_name(best)})")
+            await table_say(channel, f"🫙 **{'메인팟' if i == 1 else f'사이드팟 #{i}'}** (총 {amount}) → 승자: {', '.join(winner_names)} ({hand_name(best)})", result=True)
         else:
-            await channel.send(f"🫙 **{'메인팟' if i == 1 else f'사이드팟 #{i}'}** (총 {amount}) → 승자 없음 (해당 팟에 폴드하지 않은 유저가 없음)")
+            await table_say(channel, f"🫙 **{'메인팟' if i == 1 else f'사이드팟 #{i}'}** (총 {amount}) → 승자 없음 (해당 팟에 폴드하지 않은 유저가 없음)", result=True)
 
-    # 7. 최종 정산
+    # 7. 최종 정산 (코인은 settle_showdown에서 지급됨)
     total_distributed = 0
     result_lines = []
     for uid, p in players.items():
         won = winnings.get(uid, 0)
-        p["coins"] += won
         total_distributed += won
         if won > 0:
-            result_lines.append(f"**{p['name']}**: +{won} 코인 (현재: {p['coins']})")
+            result_lines.append(f"**{p.name}**: +{won} 코인 (현재: {p.coins})")
         
-    await channel.send(f"💰 **총 {total_distributed} 코인 분배 완료!**\n" + "\n".join(result_lines))
+    await table_say(channel, f"💰 **총 {total_distributed} 코인 분배 완료!**\n" + "\n".join(result_lines), result=True)
 
     # 8. 게임 종료 (end_game이 DB 업데이트 및 캐시 정리)
-    await end_game()
+    await end_game(winnings)
 
 # ====== UI ======
 
-# [추가] 단독 승리 시 10초간 옵션(공개/숨기기/래빗)을 묻는 공개 뷰
+# [추가] 단독 승리 시 잠시(winner_seconds) 옵션(공개/숨기기/래빗)을 묻는 공개 뷰
 class WinnerOptionsView(discord.ui.View):
     def __init__(self, winner_uid: int, winner_name: str, pot: int):
-        super().__init__(timeout=10.0)
+        super().__init__(timeout=float(game.cfg["winner_seconds"]))
         self.winner_uid = winner_uid
         self.winner_name = winner_name
         self.pot = pot
@@ -611,13 +2672,14 @@ class WinnerOptionsView(discord.ui.View):
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.winner_uid:
-            await interaction.response.send_message("승리자만 결정할 수 있습니다.", ephemeral=True)
+            await respond(interaction, "승리자만 결정할 수 있습니다.", ephemeral=True)
             return False
         if self.already_acted:
-            await interaction.response.send_message("이미 결정했습니다.", ephemeral=True)
+            await respond(interaction, "이미 결정했습니다.", ephemeral=True)
             return False
         return True
 
+    @interaction_handler("winner_options")
     async def _finish_game(self, interaction: discord.Interaction, show_hand: bool = False, rabbit_hunt: bool = False):
         if self.already_acted:
             await interaction.response.defer() # 이미 처리 중이면 무시
@@ -627,46 +2689,41 @@ class WinnerOptionsView(discord.ui.View):
         p = players.get(self.winner_uid)
         if not p:
              logging.error(f"WinnerOptionsView: 승리자 {self.winner_uid} 정보를 찾을 수 없음")
-             await interaction.response.edit_message(content="오류: 승리자 정보를 찾을 수 없습니다.", view=None)
+             await respond_edit(interaction, content="오류: 승리자 정보를 찾을 수 없습니다.", view=None)
              await end_game() # 그냥 게임 종료
              return
 
         # 1. 래빗 헌팅 처리
         if rabbit_hunt:
-            await interaction.response.edit_message(content=f"🐇 **{self.winner_name}**님이 래빗 헌팅을 선택!", view=None)
+            await respond_edit(interaction, content=f"🐇 **{self.winner_name}**님이 래빗 헌팅을 선택!", view=None)
             
             # 덱에서 남은 카드 팝
-            needed = 5 - len(game["community"])
-            if needed > 0 and len(game["deck"]) >= needed:
-                game["community"].extend([game["deck"].pop() for _ in range(needed)])
-            
-            # 보드 공개
-            board_buf = compose(game["community"])
-            if board_buf:
-                await interaction.channel.send("🃏 **전체 보드 (래빗 헌팅):**", file=discord.File(board_buf, "rabbit_board.png"))
+            needed = 5 - len(game.community)
+            if needed > 0 and len(game.deck) >= needed:
+                game.community.extend([game.deck.pop() for _ in range(needed)])
             
-            # 핸드도 즉시 공개
-            hand_buf = compose(p.get("cards", []))
-            if hand_buf:
-                await interaction.channel.send(f"🎴 **{p['name']}**님의 핸드:", file=discord.File(hand_buf, "shown_hand.png"))
+            # 보드(윗줄)와 핸드(아랫줄)를 이미지 한 장으로 공개
+            buf = await compose_rows_async([game.community, p.cards])
+            if buf:
+                await interaction.channel.send(f"🃏 **전체 보드 (래빗 헌팅)** / 🎴 **{p.name}**님의 핸드:", file=discord.File(buf, "rabbit_board.png"))
 
         # 2. 핸드 공개 처리 (래빗 헌팅 안 했을 때)
         elif show_hand:
-            await interaction.response.edit_message(content=f"🏆 **{self.winner_name}** (승리)", view=None)
-            cards = p.get("cards", [])
-            buf = compose(cards)
+            await respond_edit(interaction, content=f"🏆 **{self.winner_name}** (승리)", view=None)
+            cards = p.cards
+            buf = await compose_async(cards)
             if buf:
-                await interaction.channel.send(f"🎴 **{p['name']}**님이 승리 핸드를 공개합니다:", file=discord.File(buf, "shown_hand.png"))
+                await interaction.channel.send(f"🎴 **{p.name}**님이 승리 핸드를 공개합니다:", file=discord.File(buf, "shown_hand.png"))
         
         # 3. 숨기기 처리
         else: # (show_hand=False and rabbit_hunt=False)
-            await interaction.response.edit_message(content=f"🏆 **{self.winner_name}** (승리)", view=None)
+            await respond_edit(interaction, content=f"🏆 **{self.winner_name}** (승리)", view=None)
 
         # 4. 팟 지급 및 게임 종료
-        p["coins"] += self.pot
-        await interaction.channel.send(f"💰 **{self.winner_name}**님이 팟 {self.pot} 코인을 획득했습니다!")
+        p.coins += self.pot
+        await table_say(interaction.channel, f"💰 **{self.winner_name}**님이 팟 {self.pot} 코인을 획득했습니다!", result=True)
         
-        await end_game()
+        await end_game({self.winner_uid: self.pot})
 
     @discord.ui.button(label="핸드 공개", style=discord.ButtonStyle.success, row=0)
     async def _show(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -686,7 +2743,7 @@ class WinnerOptionsView(discord.ui.View):
         self.already_acted = True
         logging.info(f"WinnerOptionsView timed out for {self.winner_uid}")
         
-        channel = bot.get_channel(game["channel_id"])
+        channel = bot.get_channel(game.channel_id)
         if not channel:
             logging.error("WinnerOptionsView timeout: 채널을 찾을 수 없음")
             await end_game()
@@ -699,29 +2756,30 @@ class WinnerOptionsView(discord.ui.View):
              return
 
         # 타임아웃 = 숨기기
-        p["coins"] += self.pot
-        await channel.send(f"💰 (시간 초과) **{self.winner_name}**님이 팟 {self.pot} 코인을 획득했습니다!")
+        p.coins += self.pot
+        await table_say(channel, f"💰 (시간 초과) **{self.winner_name}**님이 팟 {self.pot} 코인을 획득했습니다!", result=True)
         
-        await end_game()
+        await end_game({self.winner_uid: self.pot})
 
 
-# 폴드 시 10초간 핸드 공개 여부를 묻는 에페메럴 뷰
+# 폴드 시 잠시(fold_show_seconds) 핸드 공개 여부를 묻는 에페메럴 뷰
 class ShowHandOnFoldView(discord.ui.View):
     def __init__(self, actor_id: int, channel: discord.abc.Messageable):
-        super().__init__(timeout=10.0)
+        super().__init__(timeout=float(game.cfg["fold_show_seconds"]))
         self.actor_id = actor_id
         self.channel = channel
         self.already_acted = False
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.actor_id:
-            await interaction.response.send_message("당신이 결정할 수 없습니다.", ephemeral=True)
+            await respond(interaction, "당신이 결정할 수 없습니다.", ephemeral=True)
             return False
         if self.already_acted:
-            await interaction.response.send_message("이미 결정했습니다.", ephemeral=True)
+            await respond(interaction, "이미 결정했습니다.", ephemeral=True)
             return False
         return True
 
+    @interaction_handler("fold_show")
     async def _finish(self, interaction: discord.Interaction, show: bool):
         if self.already_acted:
             await interaction.response.defer()
@@ -730,18 +2788,19 @@ class ShowHandOnFoldView(discord.ui.View):
         
         p = players.get(self.actor_id)
         if not p:
-            await interaction.response.edit_message(content="플레이어 정보를 찾을 수 없습니다.", view=None)
+            await respond_edit(interaction, content="플레이어 정보를 찾을 수 없습니다.", view=None)
             return
 
+        # 먼저 응답하고 (3초 제한) 이미지 합성/공개는 그 뒤에
+        await respond_edit(interaction, content="🚫 폴드 확인.", view=None)
+
         if show:
-            cards = p.get("cards", [])
-            buf = compose(cards)
+            cards = p.cards
+            buf = await compose_async(cards)
             if buf:
-                await self.channel.send(f"🎴 **{p['name']}**님이 폴드하며 핸드를 공개합니다:", file=discord.File(buf, "shown_hand.png"))
+                await self.channel.send(f"🎴 **{p.name}**님이 폴드하며 핸드를 공개합니다:", file=discord.File(buf, "shown_hand.png"))
             else:
-                await self.channel.send(f"🎴 **{p['name']}**님이 핸드를 공개하려 했으나 이미지 생성에 실패했습니다.")
-
-        await interaction.response.edit_message(content="🚫 폴드 확인.", view=None)
+                await self.channel.send(f"🎴 **{p.name}**님이 핸드를 공개하려 했으나 이미지 생성에 실패했습니다.")
         
         # 다음 턴 진행
         await advance_or_next_round(self.channel)
@@ -769,17 +2828,18 @@ class RaiseModal(discord.ui.Modal, title="레이즈 금액 입력"):
         super().__init__()
         self.actor_id = actor_id
         p = players.get(actor_id)
-        cur_bet = game.get("current_bet", 0)
-        min_raise = game.get("bb", 20) # 최소 레이즈는 BB
-        call_need = max(0, cur_bet - p.get("bet", 0))
+        cur_bet = game.current_bet
+        min_raise = game.bb # 최소 레이즈는 BB
+        call_need = max(0, cur_bet - p.bet)
         
         placeholder = f"최소 {min_raise} 이상 입력 (콜 {call_need} + {min_raise})"
-        if p and p["coins"] <= call_need + min_raise:
-             placeholder = f"올인만 가능 (최대 {p['coins']})"
+        if p and p.coins <= call_need + min_raise:
+             placeholder = f"올인만 가능 (최대 {p.coins})"
 
         self.amount = discord.ui.TextInput(label=f"레이즈 금액 (현재 베팅: {cur_bet})", placeholder=placeholder, required=True, max_length=10)
         self.add_item(self.amount)
 
+    @interaction_handler("raise_modal")
     async def on_submit(self, interaction: discord.Interaction):
         try:
             val_str = str(self.amount.value).strip()
@@ -789,205 +2849,211 @@ class RaiseModal(discord.ui.Modal, title="레이즈 금액 입력"):
             if val <= 0: raise ValueError("0보다 커야 합니다.")
         except Exception as e:
             logging.debug(f"레이즈 금액 오류: {e}")
-            await interaction.response.send_message("1 이상의 정수를 입력해 주세요!", ephemeral=True); return
+            await respond(interaction, "1 이상의 정수를 입력해 주세요!", ephemeral=True); return
         await handle_raise(interaction, self.actor_id, val)
 
-class ActionPromptView(discord.ui.View):
-    """공개 '행동하기' 버튼 → 현재 차례인 유저만 누를 수 있음(검증 후 에페메럴 버튼 제공)"""
-    # [버그 수정] 턴마다 고유한 deadline_ts를 받도록 수정
-    def __init__(self, actor_id: int, deadline_ts: int, timeout=120):
-        super().__init__(timeout=timeout)
-        self.actor_id = actor_id
-        self.deadline_ts = deadline_ts # 이 뷰가 생성된 시점의 마감 시간
-    
-    async def on_timeout(self):
-        """
-        뷰 자체가 타임아웃 (플레이어가 '행동하기' 버튼조차 누르지 않음)
-        """
-        logging.info(f"ActionPromptView timed out for {self.actor_id} (ts={self.deadline_ts})")
-        
-        # [버그 수정] 이 타임아웃이 현재 게임 턴의 타임아웃인지 확인
-        if self.deadline_ts != game.get("deadline_ts"):
-            logging.warning(f"유령 타임아웃(PromptView) 무시: {self.actor_id} (뷰: {self.deadline_ts}, 게임: {game.get('deadline_ts')})")
-            return
-            
-        # 타임아웃 시 자동으로 폴드 처리
-        await handle_afk_fold(self.actor_id)
-
-    async def interaction_check(self, interaction: discord.Interaction) -> bool:
-        if interaction.user.id != self.actor_id:
-            await interaction.response.send_message("아직 네 차례가 아니야!", ephemeral=True); return False
-        if not game["game_started"]:
-            await interaction.response.send_message("게임이 시작되지 않았어요!", ephemeral=True); return False
-        
-        # [버그 수정] game["idx"]가 턴 순서를 벗어났는지 먼저 확인
-        if game["idx"] >= len(game["turn_order"]):
-             await interaction.response.send_message("턴 정보가 잘못되었습니다.", ephemeral=True); return False
-             
-        current_actor = game["turn_order"][game["idx"]]
-        if current_actor != self.actor_id:
-            await interaction.response.send_message(f"이미 턴이 지나갔어요! (현재: {players.get(current_actor, {}).get('name', '알수없음')})", ephemeral=True); return False
-        
-        # [버그 수정] 이 뷰가 현재 턴의 뷰인지 확인
-        if self.deadline_ts != game.get("deadline_ts"):
-            await interaction.response.send_message("이전 턴의 버튼입니다. 새로고침/채팅방을 확인하세요.", ephemeral=True); return False
+# ====== 턴 버튼 (custom_id 라우팅) ======
+# 버튼 상태는 전부 custom_id에 담고, setup_hook에서 bot.add_dynamic_items로 한 번만 등록한다.
+# 메시지마다 View 객체/타임아웃 태스크를 들고 있지 않으므로 재시작 후에도 버튼이 동작하고,
+# 턴 타임아웃은 테이블당 하나인 _run_countdown 태스크가 처리한다.
+#   poker:prompt:<table>:<seat>:<nonce>          공개 '행동하기' 버튼
+#   poker:act:<table>:<seat>:<nonce>:<action>    에페메럴 체크/콜/레이즈/폴드
+#   poker:peek:<uid>                             '내 핸드 보기'
+# table = 채널 ID, seat = turn_order 인덱스, nonce = 턴 마감 시간(deadline_ts, 턴마다 고유)
+
+async def _check_turn(interaction: discord.Interaction, table_id: int, seat: int, nonce: int, prompt: bool):
+    """버튼이 현재 턴의 것인지 검증. 맞으면 행동할 uid, 아니면 에페메럴로 안내 후 None"""
+    async def deny(msg):
+        await respond(interaction, msg, ephemeral=True)
+        return None
 
-        return True
-    
-    @discord.ui.button(label="🎰 행동하기", style=discord.ButtonStyle.primary)
-    async def _open_actions(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # [버그 수정] ActionView에도 고유한 deadline_ts 전달
-        await interaction.response.send_message("액션을 선택하세요:", view=ActionView(self.actor_id, self.deadline_ts), ephemeral=True)
+    if not game.game_started:
+        return await deny("게임이 시작되지 않았어요!" if prompt else "게임이 종료되었습니다.")
+    if table_id != game.channel_id or seat >= len(game.turn_order):
+        return await deny("턴 정보가 잘못되었습니다." if prompt else "턴 정보가 없습니다.")
+    actor_id = game.turn_order[seat]
+    if interaction.user.id != actor_id:
+        return await deny("아직 네 차례가 아니야!" if prompt else "당신의 턴이 아니거나 턴이 지났습니다.")
+    if game.idx != seat:
+        current_actor = game.turn_order[game.idx] if game.idx < len(game.turn_order) else None
+        name = players[current_actor].name if current_actor in players else '알수없음'
+        return await deny(f"이미 턴이 지나갔어요! (현재: {name})")
+    # [버그 수정] 이 버튼이 현재 턴의 버튼인지 확인
+    if nonce != game.deadline_ts:
+        return await deny("이전 턴의 버튼입니다. 새로고침/채팅방을 확인하세요.")
+    return actor_id
+
+class PromptButton(discord.ui.DynamicItem[discord.ui.Button], template=r"poker:prompt:(?P<table>\d+):(?P<seat>\d+):(?P<nonce>\d+)"):
+    """공개 '행동하기' 버튼 → 현재 차례인 유저만 누를 수 있음(검증 후 에페메럴 버튼 제공)"""
+    def __init__(self, table_id: int, seat: int, nonce: int, row=None):
+        super().__init__(discord.ui.Button(
+            label="🎰 행동하기", style=discord.ButtonStyle.primary, row=row,
+            custom_id=f"poker:prompt:{table_id}:{seat}:{nonce}",
+        ))
+        self.table_id = table_id
+        self.seat = seat
+        self.nonce = nonce
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["table"]), int(match["seat"]), int(match["nonce"]))
+
+    @interaction_handler("prompt")
+    async def callback(self, interaction: discord.Interaction):
+        actor_id = await _check_turn(interaction, self.table_id, self.seat, self.nonce, prompt=True)
+        if actor_id is None: return
+        await respond(interaction, "액션을 선택하세요:", view=ActionView(actor_id, self.table_id, self.seat, self.nonce), ephemeral=True)
+
+_ACTION_BUTTONS = {
+    "check": ("체크", discord.ButtonStyle.secondary),
+    "call": ("콜", discord.ButtonStyle.primary),
+    "raise": ("레이즈", discord.ButtonStyle.success),
+    "fold": ("폴드", discord.ButtonStyle.danger),
+}
 
-class ActionView(discord.ui.View):
+class ActionButton(discord.ui.DynamicItem[discord.ui.Button], template=r"poker:act:(?P<table>\d+):(?P<seat>\d+):(?P<nonce>\d+):(?P<action>check|call|raise|fold)"):
     """에페메럴: 체크/콜/레이즈/폴드"""
-    # [버그 수정] 턴마다 고유한 deadline_ts를 받도록 수정
-    def __init__(self, actor_id: int, deadline_ts: int, timeout=120):
-        super().__init__(timeout=timeout)
-        self.actor_id = actor_id
-        self.deadline_ts = deadline_ts # 이 뷰가 생성된 시점의 마감 시간
+    def __init__(self, table_id: int, seat: int, nonce: int, action: str, disabled: bool = False):
+        label, style = _ACTION_BUTTONS[action]
+        super().__init__(discord.ui.Button(
+            label=label, style=style, disabled=disabled,
+            custom_id=f"poker:act:{table_id}:{seat}:{nonce}:{action}",
+        ))
+        self.table_id = table_id
+        self.seat = seat
+        self.nonce = nonce
+        self.action = action
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["table"]), int(match["seat"]), int(match["nonce"]), match["action"])
+
+    @interaction_handler("action")
+    async def callback(self, interaction: discord.Interaction):
+        actor_id = await _check_turn(interaction, self.table_id, self.seat, self.nonce, prompt=False)
+        if actor_id is None: return
+        if game.turn_started is not None: # 턴당 한 번만 (레이즈 창을 닫고 다시 눌러도 샘플이 늘지 않게)
+            anomaly_event("think", actor_id, time.monotonic() - game.turn_started)
+            game.turn_started = None
+        tracer.think(actor_id)
+        if self.action == "check":
+            await handle_check(interaction, actor_id)
+        elif self.action == "call":
+            await handle_call(interaction, actor_id)
+        elif self.action == "raise":
+            await interaction.response.send_modal(RaiseModal(actor_id))
+            _mark_ack()
+        else:
+            await handle_fold(interaction, actor_id)
+
+class PeekButton(discord.ui.DynamicItem[discord.ui.Button], template=r"poker:peek:(?P<uid>\d+)"):
+    """'내 핸드 보기' (본인만 클릭 가능)"""
+    def __init__(self, uid: int, name: str, row=None):
+        super().__init__(discord.ui.Button(
+            label=name, style=discord.ButtonStyle.secondary, row=row,
+            custom_id=f"poker:peek:{uid}",
+        ))
+        self.uid = uid
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["uid"]), item.label)
+
+    @interaction_handler("peek")
+    async def callback(self, interaction: discord.Interaction):
+        if interaction.user.id != self.uid:
+            await respond(interaction, "이 버튼은 해당 플레이어만 사용할 수 있어요!", ephemeral=True); return
         
-        # 버튼 활성화/비활성화 로직
-        p = players.get(actor_id)
-        can_check = False
-        if p:
-            need = game["current_bet"] - p["bet"]
-            if need == 0:
-                can_check = True
-
-        # 체크가 불가능하면(콜해야 하면) 체크 버튼 비활성화
-        self._check.disabled = not can_check
-        # 콜이 0이면 (체크 상황) 콜 버튼 비활성화
-        self._call.disabled = can_check
+        p = players.get(self.uid)
+        if not p:
+            await respond(interaction, "게임이 시작되지 않았거나 참가자가 아닙니다!", ephemeral=True); return
 
-    async def on_timeout(self):
-        """
-        에페메럴 뷰 타임아웃 ('행동하기'는 눌렀으나 최종 선택을 안 함)
-        """
-        logging.info(f"ActionView timed out for {self.actor_id} (ts={self.deadline_ts})")
-
-        # [버그 수정] 이 타임아웃이 현재 게임 턴의 타임아웃인지 확인
-        if self.deadline_ts != game.get("deadline_ts"):
-            logging.warning(f"유령 타임아웃(ActionView) 무시: {self.actor_id} (뷰: {self.deadline_ts}, 게임: {game.get('deadline_ts')})")
-            return
+        cards = p.cards
+        if not cards:
+            await respond(interaction, "아직 카드가 배분되지 않았어요!", ephemeral=True); return
+        
+        await send_hole_image(interaction, self.uid, p)
 
-        # 타임아웃 시 자동으로 폴드 처리
-        await handle_afk_fold(self.actor_id)
+DYNAMIC_ITEMS = (PromptButton, ActionButton, PeekButton)
 
-    async def interaction_check(self, interaction: discord.Interaction) -> bool:
-        if not game["game_started"]:
-            await interaction.response.send_message("게임이 종료되었습니다.", ephemeral=True); return False
-        if game["idx"] >= len(game["turn_order"]):
-            await interaction.response.send_message("턴 정보가 없습니다.", ephemeral=True); return False
-            
-        current_actor = game["turn_order"][game["idx"]]
-        if interaction.user.id != self.actor_id or current_actor != self.actor_id:
-            await interaction.response.send_message("당신의 턴이 아니거나 턴이 지났습니다.", ephemeral=True); return False
-            
-        # [버그 수정] 이 뷰가 현재 턴의 뷰인지 확인
-        if self.deadline_ts != game.get("deadline_ts"):
-            await interaction.response.send_message("이전 턴의 버튼입니다. 새로고침/채팅방을 확인하세요.", ephemeral=True); return False
+# 아래 View들은 버튼을 담아 보내기만 하는 껍데기 (timeout=None, 전부 동적 아이템이라 ViewStore에 남지 않음)
+class ActionPromptView(discord.ui.View):
+    def __init__(self, table_id: int, seat: int, nonce: int):
+        super().__init__(timeout=None)
+        self.add_item(PromptButton(table_id, seat, nonce))
 
-        return True
-    
-    @discord.ui.button(label="체크", style=discord.ButtonStyle.secondary)
-    async def _check(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await handle_check(interaction, self.actor_id)
-    
-    @discord.ui.button(label="콜", style=discord.ButtonStyle.primary)
-    async def _call(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await handle_call(interaction, self.actor_id)
-    
-    @discord.ui.button(label="레이즈", style=discord.ButtonStyle.success)
-    async def _raise(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_modal(RaiseModal(self.actor_id))
-    
-    @discord.ui.button(label="폴드", style=discord.ButtonStyle.danger)
-    async def _fold(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await handle_fold(interaction, self.actor_id)
+class ActionView(discord.ui.View):
+    def __init__(self, actor_id: int, table_id: int, seat: int, nonce: int):
+        super().__init__(timeout=None)
+        # 체크가 불가능하면(콜해야 하면) 체크 버튼 비활성화, 콜이 0이면 (체크 상황) 콜 버튼 비활성화
+        p = players.get(actor_id)
+        can_check = bool(p) and game.current_bet - p.bet == 0
+        for action in _ACTION_BUTTONS:
+            disabled = (action == "check" and not can_check) or (action == "call" and can_check)
+            self.add_item(ActionButton(table_id, seat, nonce, action, disabled=disabled))
 
 class MultiPeekCardsView(discord.ui.View):
-    """참가자 전원의 '내 카드 보기' 버튼을 한 메시지에 가로로 배치 (본인만 클릭 가능)"""
-    def __init__(self, uid_name_pairs, timeout=300):
-        super().__init__(timeout=timeout)
+    """참가자 전원의 '내 카드 보기' 버튼을 한 메시지에 가로로 배치"""
+    def __init__(self, uid_name_pairs):
+        super().__init__(timeout=None)
         for i, (uid, name) in enumerate(uid_name_pairs):
-            row_index = i // 5  # 한 줄 최대 5개 버튼
-            btn = discord.ui.Button(
-                label=name, style=discord.ButtonStyle.secondary,
-                row=row_index, custom_id=f"peek_{uid}"
-            )
-            
-            async def callback(interaction: discord.Interaction, target_uid=uid):
-                if interaction.user.id != target_uid:
-                    await interaction.response.send_message("이 버튼은 해당 플레이어만 사용할 수 있어요!", ephemeral=True); return
-                
-                p = players.get(target_uid)
-                if not p:
-                    await interaction.response.send_message("게임이 시작되지 않았거나 참가자가 아닙니다!", ephemeral=True); return
-
-                cards = p.get("cards")
-                if not cards:
-                    await interaction.response.send_message("아직 카드가 배분되지 않았어요!", ephemeral=True); return
-                
-                buf = compose(cards)
-                if buf:
-                    # [수정] "홀카드" -> "핸드"
-                    await interaction.response.send_message(
-                        "🎴 당신의 핸드:", file=discord.File(buf, filename="my_cards.png"), ephemeral=True
-                    )
-                else:
-                    await interaction.response.send_message("카드 이미지를 생성할 수 없습니다.", ephemeral=True)
-            
-            btn.callback = callback
-            self.add_item(btn)
+            self.add_item(PeekButton(uid, name, row=i // 5)) # 한 줄 최대 5개 버튼
 
 # ====== 액션 처리 ======
+@timed("handle_check")
 async def handle_check(inter: discord.Interaction, uid: int):
     p = players.get(uid)
-    if not p: await inter.response.send_message("플레이어 정보를 찾을 수 없습니다!", ephemeral=True); return
-    need = game["current_bet"] - p["bet"]
+    if not p: await respond(inter, "플레이어 정보를 찾을 수 없습니다!", ephemeral=True); return
+    need = game.current_bet - p.bet
     if need > 0:
-        await inter.response.send_message(f"체크 불가! {need} 코인 콜 필요", ephemeral=True); return
-    await inter.response.edit_message(content="✅ 체크!", view=None) # Ephemeral 응답 수정
-    game["acted"].add(uid)
+        await respond(inter, f"체크 불가! {need} 코인 콜 필요", ephemeral=True); return
+    await respond_edit(inter, content="✅ 체크!", view=None) # Ephemeral 응답 수정
+    live_note(inter.channel, f"**{p.name}**: 체크")
+    anomaly_event("act", uid, "check")
+    game.acted.add(uid)
     await advance_or_next_round(inter.channel)
 
+@timed("handle_call")
 async def handle_call(inter: discord.Interaction, uid: int):
     p = players.get(uid)
-    if not p: await inter.response.send_message("플레이어 정보를 찾을 수 없습니다!", ephemeral=True); return
-    need = max(0, game["current_bet"] - p["bet"])
+    if not p: await respond(inter, "플레이어 정보를 찾을 수 없습니다!", ephemeral=True); return
+    need = max(0, game.current_bet - p.bet)
     if need == 0:
-        await inter.response.edit_message(content="✅ 체크! (콜 필요 없음)", view=None); return # 콜 버튼 눌렀지만 체크인 상황
-    pay = min(need, p["coins"])
-    p["coins"] -= pay; p["bet"] += pay
-    if p["coins"] == 0:
-        p["all_in"] = True; await inter.response.edit_message(content=f"🔥 올인! {pay} 코인", view=None)
+        await respond_edit(inter, content="✅ 체크! (콜 필요 없음)", view=None); return # 콜 버튼 눌렀지만 체크인 상황
+    pay = min(need, p.coins)
+    p.coins -= pay; p.bet += pay
+    if p.coins == 0:
+        p.all_in = True; await respond_edit(inter, content=f"🔥 올인! {pay} 코인", view=None)
     else:
-        await inter.response.edit_message(content=f"📞 콜 {pay} 코인", view=None)
-    game["acted"].add(uid)
+        await respond_edit(inter, content=f"📞 콜 {pay} 코인", view=None)
+    hud_action(uid, "call")
+    anomaly_event("act", uid, "call")
+    live_note(inter.channel, f"**{p.name}**: {'올인' if p.all_in else '콜'} {pay}")
+    game.acted.add(uid)
     await advance_or_next_round(inter.channel)
 
+@timed("handle_raise")
 async def handle_raise(inter: discord.Interaction, uid: int, raise_amt: int):
     p = players.get(uid)
-    if not p: await inter.response.send_message("플레이어 정보를 찾을 수 없습니다!", ephemeral=True); return
+    if not p: await respond(inter, "플레이어 정보를 찾을 수 없습니다!", ephemeral=True); return
     
-    need_to_call = max(0, game["current_bet"] - p["bet"])
-    min_raise = game.get("bb", 20) # 최소 레이즈폭은 BB
+    need_to_call = max(0, game.current_bet - p.bet)
+    min_raise = game.bb # 최소 레이즈폭은 BB
     
     # 1. 입력한 raise_amt가 최소 레이즈폭보다 작은지?
     if raise_amt < min_raise:
         # 단, 올인인 경우는 예외
-        if p["coins"] == need_to_call + raise_amt:
+        if p.coins == need_to_call + raise_amt:
              pass # 올인 레이즈는 금액 미달이어도 허용
         else:
-             await inter.response.send_message(f"최소 레이즈 금액은 {min_raise} (BB) 입니다!", ephemeral=True); return
+             await respond(inter, f"최소 레이즈 금액은 {min_raise} (BB) 입니다!", ephemeral=True); return
 
     # 2. 총 내야 할 돈 (콜 + 레이즈)
     total_need = need_to_call + raise_amt
 
     # 3. 가진 돈보다 많이 낼 순 없음 (올인 처리)
-    if total_need > p["coins"]:
-        total_need = p["coins"]
+    if total_need > p.coins:
+        total_need = p.coins
         raise_amt = total_need - need_to_call # 실제 레이즈 금액 조정
 
     if total_need <= need_to_call: # 올인했는데 콜 금액보다 적거나 같은 경우
@@ -996,35 +3062,41 @@ async def handle_raise(inter: discord.Interaction, uid: int, raise_amt: int):
         return
 
     # 4. 베팅 처리
-    p["coins"] -= total_need; p["bet"] += total_need
-    game["current_bet"] = max(game["current_bet"], p["bet"]) # 현재 베팅 갱신
+    p.coins -= total_need; p.bet += total_need
+    game.current_bet = max(game.current_bet, p.bet) # 현재 베팅 갱신
     
-    if p["coins"] == 0:
-        p["all_in"] = True; await inter.response.edit_message(content=f"🔥 올인 레이즈! {total_need} 코인 (총 베팅: {game['current_bet']})", view=None)
+    if p.coins == 0:
+        p.all_in = True; await respond_edit(inter, content=f"🔥 올인 레이즈! {total_need} 코인 (총 베팅: {game.current_bet})", view=None)
     else:
-        await inter.response.edit_message(content=f"📈 레이즈 {raise_amt} 코인 (총 베팅: {game['current_bet']})", view=None)
+        await respond_edit(inter, content=f"📈 레이즈 {raise_amt} 코인 (총 베팅: {game.current_bet})", view=None)
+    live_note(inter.channel, f"**{p.name}**: {'올인 ' if p.all_in else ''}레이즈 → {game.current_bet}")
+    hud_action(uid, "raise")
+    anomaly_event("act", uid, "raise")
     
-    game["acted"] = {uid}  # 레이즈했으므로, 이 사람 빼고 모두 다시 행동해야 함
+    game.acted = {uid}  # 레이즈했으므로, 이 사람 빼고 모두 다시 행동해야 함
     
     # 다음 턴으로
     await advance_or_next_round(inter.channel)
 
 
 # [수정] 폴드 시 핸드 공개 로직 추가
+@timed("handle_fold")
 async def handle_fold(inter: discord.Interaction, uid: int):
     p = players.get(uid)
-    if not p: await inter.response.send_message("플레이어 정보를 찾을 수 없습니다!", ephemeral=True); return
+    if not p: await respond(inter, "플레이어 정보를 찾을 수 없습니다!", ephemeral=True); return
     
     # 1. 일단 폴드 상태로 만듦
-    p["folded"] = True
-    game["acted"].add(uid)
+    p.folded = True
+    game.acted.add(uid)
+    live_note(inter.channel, f"**{p.name}**: 폴드")
+    anomaly_event("act", uid, "fold")
     
-    # 2. 이전 120초 타이머(ActionPromptView) 정리
+    # 2. 이전 턴 타이머(ActionPromptView) 정리
     await disable_prev_prompt(inter.channel)
     
-    # 3. 10초짜리 "핸드 공개?" 뷰를 에페메럴 응답으로 보냄
+    # 3. fold_show_seconds짜리 "핸드 공개?" 뷰를 에페메럴 응답으로 보냄
     view = ShowHandOnFoldView(actor_id=uid, channel=inter.channel)
-    await inter.response.edit_message(content="🚫 폴드했습니다. 핸드를 공개하시겠습니까?", view=view)
+    await respond_edit(inter, content="🚫 폴드했습니다. 핸드를 공개하시겠습니까?", view=view)
     
     # [중요] advance_or_next_round는 ShowHandOnFoldView의 콜백/타임아웃에서 호출됨
     # (여기서는 advance_or_next_round를 호출하지 않음)
@@ -1033,23 +3105,23 @@ async def handle_fold(inter: discord.Interaction, uid: int):
 async def handle_afk_fold(uid: int):
     """
     턴 타임아웃으로 인한 자동 폴드 처리
-    뷰의 on_timeout에서 호출됨 (interaction 객체가 없음)
+    턴 타이머(_run_countdown)에서 호출됨 (interaction 객체가 없음)
     """
     # 1. 게임/채널 상태 확인
-    if not game["game_started"] or not game["channel_id"]:
+    if not game.game_started or not game.channel_id:
         return # 게임이 이미 끝났거나 채널 정보가 없음
-    channel = bot.get_channel(game["channel_id"])
+    channel = bot.get_channel(game.channel_id)
     if not channel:
-        logging.error(f"AFK: 채널 ID {game['channel_id']}를 찾을 수 없음")
+        logging.error(f"AFK: 채널 ID {game.channel_id}를 찾을 수 없음")
         return
 
     # 2. 현재 턴이 타임아웃된 유저가 맞는지 확인 (중요: 레이스 컨디션 방지)
-    # [버그 수정] game["idx"]가 턴 순서를 벗어났는지 먼저 확인
-    if not game["turn_order"] or game["idx"] >= len(game["turn_order"]):
+    # [버그 수정] game.idx가 턴 순서를 벗어났는지 먼저 확인
+    if not game.turn_order or game.idx >= len(game.turn_order):
         logging.info(f"AFK: 턴 정보가 이미 없음, 무시")
         return
         
-    current_turn_uid = game["turn_order"][game["idx"]]
+    current_turn_uid = game.turn_order[game.idx]
     if current_turn_uid != uid:
         # 타임아웃이 발생했지만, 그 직전에 유저가 행동했거나 턴이 이미 넘어간 경우
         logging.info(f"AFK: 턴이 이미 {uid}가 아님 (현재: {current_turn_uid}), 무시")
@@ -1057,15 +3129,16 @@ async def handle_afk_fold(uid: int):
 
     # 3. 플레이어 정보 확인
     p = players.get(uid)
-    if not p or p["folded"] or p["all_in"]:
+    if not p or p.folded or p.all_in:
         return
 
     # 4. 강제 폴드 처리
-    logging.info(f"AFK: {p['name']} ({uid}) 자동 폴드 처리")
-    p["folded"] = True
-    p["afk_kicked"] = True # [수정] AFK 플래그 설정 (게임 종료 시 퇴장 처리용)
-    game["acted"].add(uid) 
-    await channel.send(f"⏰ **{p['name']}**님의 턴 시간이 초과되어 자동으로 **폴드**합니다. (다음 게임에서 제외됩니다)")
+    logging.info(f"AFK: {p.name} ({uid}) 자동 폴드 처리")
+    p.folded = True
+    p.afk_kicked = True # [수정] AFK 플래그 설정 (게임 종료 시 퇴장 처리용)
+    game.acted.add(uid) 
+    anomaly_event("afk", uid)
+    await table_say(channel, f"⏰ **{p.name}**님의 턴 시간이 초과되어 자동으로 **폴드**합니다. (다음 게임에서 제외됩니다)")
     
     # 5. 이전 프롬프트 정리 (중요)
     await disable_prev_prompt(channel)
@@ -1074,31 +3147,370 @@ async def handle_afk_fold(uid: int):
     await advance_or_next_round(channel)
 
 
+# ====== AI 봇 ======
+# 연습 테이블용 AI 좌석. uid는 음수(실제 Discord ID와 겹치지 않음)이고 DB/통계에는 남기지 않음.
+# 봇 차례가 오면 prompt_action이 View 대신 _bot_turn을 예약하고, 결정(bot_decide)은 1ms 이내의 순수 계산:
+#   프리플랍 — 169개 시작 핸드 클래스의 1:1 승률표 (hand_strength로 오프라인 몬테카를로, 클래스당 2만 회)
+#   포스트플랍 — 지금 만든 족보 범주 + 드로우 아웃츠 보정 (몬테카를로 없이 평가기 한 번)
+BOT_THINK_SECONDS = float(os.getenv("BOT_THINK_SECONDS", "1.0")) # 사람이 따라볼 수 있게 행동 전 대기
+BOT_START_COINS = 1000
+BOT_RAISE_POT = 0.6 # 레이즈 크기 (콜 후 팟 대비)
+BOT_BLUFF_P = 0.05
+_bot_rng = random.Random()
+BOT_DECIDE_SECONDS = Histogram("poker_bot_decide_seconds", "봇 결정(bot_decide) 시간",
+                               buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01))
+
+def is_bot(uid):
+    return uid < 0
+
+# 13x13 격자 (행/열 모두 A..2), 랜덤 핸드 1개 상대 승률 x1000.
+# 대각선 = 페어, 위쪽(열 > 행) = 수티드, 아래쪽(행 > 열) = 오프수트
+PREFLOP_EQUITY = (
+    853, 675, 664, 653, 645, 625, 620, 608, 596, 602, 593, 580, 573,  # A
+    657, 823, 635, 626, 614, 598, 582, 579, 564, 557, 554, 541, 535,  # K
+    647, 621, 800, 603, 590, 575, 563, 542, 536, 526, 519, 508, 513,  # Q
+    640, 605, 580, 772, 572, 559, 538, 521, 509, 509, 492, 480, 473,  # J
+    628, 594, 575, 555, 748, 540, 522, 513, 493, 473, 471, 462, 447,  # T
+    604, 579, 555, 535, 516, 721, 504, 492, 474, 457, 432, 435, 427,  # 9
+    598, 559, 533, 514, 492, 486, 693, 487, 467, 444, 428, 410, 402,  # 8
+    594, 551, 514, 497, 483, 470, 456, 662, 451, 441, 420, 400, 380,  # 7
+    576, 539, 511, 483, 457, 443, 430, 422, 636, 438, 412, 401, 378,  # 6
+    580, 532, 498, 474, 437, 431, 417, 403, 399, 610, 420, 396, 379,  # 5
+    564, 527, 489, 458, 435, 410, 390, 387, 378, 380, 572, 389, 365,  # 4
+    558, 513, 481, 461, 423, 396, 374, 365, 362, 369, 351, 534, 360,  # 3
+    548, 500, 473, 451, 417, 392, 368, 351, 340, 344, 333, 325, 504,  # 2
+)
+# 족보 범주(0~8)별 대략적인 1:1 승률 (원페어는 postflop_equity에서 따로)
+_MADE_EQUITY = (0.0, 0.0, 0.76, 0.84, 0.88, 0.91, 0.96, 0.99, 1.0)
+
+def preflop_equity(hole):
+    return PREFLOP_EQUITY[hand_class(hole)] / 1000
+
+def _board_category(board):
+    """보드만으로 만들어진 족보 범주 (3~4장은 페어류만)"""
+    if len(board) == 5: return score_5cards(board)[0]
+    counts = {}
+    for c in board:
+        r = parse_card(c)[0]
+        counts[r] = counts.get(r, 0) + 1
+    c = sorted(counts.values(), reverse=True) + [0]
+    if c[0] == 4: return 7
+    if c[0] == 3: return 6 if c[1] >= 2 else 3
+    if c[0] == 2: return 2 if c[1] == 2 else 1
+    return 0
+
+def _draw_outs(cards):
+    """플러시 드로우(9) + 양방/거트샷 스트레이트 드로우(8/4) 아웃츠 (대략)"""
+    suits, vals = {}, set()
+    for c in cards:
+        r, s = parse_card(c)
+        suits[s] = suits.get(s, 0) + 1
+        vals.add(RANK_ORDER[r])
+    if 14 in vals: vals.add(1)
+    straight = 0
+    for lo in range(1, 11):
+        n = sum(v in vals for v in range(lo, lo + 5))
+        if n == 4:
+            straight = max(straight, 8 if lo >= 2 and all(v in vals for v in range(lo, lo + 4)) else 4)
+    return (9 if max(suits.values()) == 4 else 0) + straight
+
+def postflop_equity(hole, board):
+    best = hand_strength(list(hole) + list(board))
+    cat = best[0]
+    hole_vals = [RANK_ORDER[parse_card(c)[0]] for c in hole]
+    if cat <= _board_category(board):
+        eq = 0.12 + 0.18 * (max(hole_vals) - 2) / 12 # 보드가 플레이 → 키커 싸움
+    elif cat == 1:
+        top = max(RANK_ORDER[parse_card(c)[0]] for c in board)
+        eq = 0.8 if best[1] > top else 0.68 if best[1] == top else 0.5
+    else:
+        eq = _MADE_EQUITY[cat]
+    if len(board) < 5 and cat < 4:
+        # 내 카드가 보태는 아웃츠만 (4-2 법칙)
+        outs = _draw_outs(list(hole) + list(board)) - _draw_outs(board)
+        if outs > 0:
+            eq = min(0.95, eq + outs * (0.04 if len(board) == 3 else 0.02))
+    return eq
+
+def bot_decide(hole, board, need, pot, coins, bb, opponents, rng=_bot_rng):
+    """
+    (action, raise_amt). action은 'fold'/'check'/'call'/'raise', raise_amt는 콜 이후 얹는 금액
+    pot은 이번 스트리트 베팅 포함, opponents는 폴드하지 않은 상대 수
+    """
+    with BOT_DECIDE_SECONDS.time():
+        eq = preflop_equity(hole) if len(board) < 3 else postflop_equity(hole, board)
+        eq **= max(1, opponents) # 상대가 여럿이면 모두를 이겨야 함 (대략)
+        roll = rng.random()
+        if coins > need:
+            strong = 0.7 if need <= bb else 0.8 # 레이즈를 받았으면 리레이즈 기준을 높임
+            if eq >= strong or (eq >= strong - 0.15 and roll < 0.3) or (need == 0 and roll < BOT_BLUFF_P):
+                return "raise", max(bb, int((pot + need) * BOT_RAISE_POT))
+        if need == 0:
+            return "check", 0
+        if eq >= need / (pot + need) + 0.05:
+            return "call", 0
+        return "fold", 0
+
+async def _bot_turn(channel, uid):
+    """prompt_action이 봇 차례에 game.timer_task로 예약. 대기 후에도 이 봇의 턴이면 행동"""
+    tracer.detach()
+    try:
+        await asyncio.sleep(BOT_THINK_SECONDS)
+    except asyncio.CancelledError:
+        return
+    if game.timer_task is asyncio.current_task():
+        game.timer_task = None # disable_prev_prompt가 자기 자신을 취소/대기하지 않도록
+    if not game.game_started or game.idx >= len(game.turn_order) or game.turn_order[game.idx] != uid:
+        return
+    try:
+        await bot_act(channel, uid)
+    except Exception as e:
+        logging.exception(f"봇 행동 에러: {e}")
+
+def bot_step(uid):
+    """봇 한 명의 결정을 game/players에 반영하고 채널에 보낼 문구를 반환 (Discord 호출 없음)"""
+    p = players[uid]
+    need = max(0, game.current_bet - p.bet)
+    pot = game.pot + sum(q.bet for q in players.values())
+    opponents = sum(1 for u, q in players.items() if u != uid and not q.folded)
+    action, amt = bot_decide(p.cards, game.community, need, pot, p.coins, game.bb, opponents)
+    return apply_action(uid, action, amt)
+
+def apply_action(uid, action, amt=0):
+    """Interaction 없이 액션을 game/players에 반영하고 안내 문구를 반환 (봇/시뮬레이션)"""
+    p = players[uid]
+    need = max(0, game.current_bet - p.bet)
+    if action == "raise":
+        # handle_raise와 같은 규칙: 가진 것보다 많으면 올인, 콜 금액 이하면 콜
+        total = min(need + amt, p.coins)
+        if total <= need:
+            action = "call"
+        else:
+            p.coins -= total; p.bet += total
+            game.current_bet = max(game.current_bet, p.bet)
+            p.all_in = p.coins == 0
+            text = f"🔥 올인 레이즈! {total} 코인 (총 베팅: {game.current_bet})" if p.all_in \
+                else f"📈 레이즈 {total - need} 코인 (총 베팅: {game.current_bet})"
+            game.acted = {uid}
+    if action == "call":
+        pay = min(need, p.coins)
+        p.coins -= pay; p.bet += pay
+        p.all_in = p.coins == 0
+        text = f"🔥 올인! {pay} 코인" if p.all_in else f"📞 콜 {pay} 코인"
+    elif action == "check":
+        text = "✅ 체크"
+    elif action == "fold":
+        p.folded = True
+        text = "🚫 폴드"
+    game.acted.add(uid)
+    return text
+
+@timed("bot_act")
+async def bot_act(channel, uid):
+    bet_before = game.current_bet
+    text = bot_step(uid)
+    anomaly_event("act", uid, "raise" if game.current_bet > bet_before else "other")
+    await table_say(channel, f"**{players[uid].name}**: {text}")
+    await advance_or_next_round(channel)
+
+
+# ====== 핸드 시작 / 자동 진행 ======
+AUTO_DEAL_DELAY = int(os.getenv("AUTO_DEAL_DELAY", "10")) # /자동진행에서 간격을 생략했을 때 (초)
+auto_deal = {} # channel_id -> 다음 핸드까지 대기(초). 자동 진행이 켜진 채널만
+_auto_deal_task = None
+_prepared = None # (uid_name_pairs, MultiPeekCardsView) — 자동 진행 대기 중에 미리 만든 것
+
+async def start_hand(channel, reply):
+    """
+    /시작과 자동 진행 공용. reply(content=None, *, embed=None, ephemeral=False)로 첫 응답을 보냄
+    (/시작이면 respond(inter, ...)). 핸드를 시작했으면 True
+    """
+    global _prepared
+    table = tourney.upcoming_table() if tourney and tourney.started else None
+    cfg = settings.resolve(channel_guild_id(channel), channel.id)
+    seats = len(players) if table is None else len(tourney.tables[table])
+    if seats < 2:
+        await reply("최소 2명이 필요해요!", ephemeral=True); return False
+    if table is None and seats > cfg["max_players"]: # 토너먼트 테이블 인원은 /토너먼트개설의 테이블인원을 따름
+        await reply(f"최대 {cfg['max_players']}명까지 가능해요!", ephemeral=True); return False
+    if table is not None: # 거절될 수 있는 확인이 끝난 뒤에만 좌석/순번을 바꿈
+        tourney.load_table(table)
+
+    game.reset(channel_id=channel.id)
+    game.cfg = cfg
+    game.sb, game.bb = cfg["sb"], cfg["bb"]
+    if table is not None:
+        game.sb, game.bb = tourney.blinds()
+        game.dealer_pos = tourney.buttons[table]
+        save_tourney()
+    game.round = "preflop"
+    game.turn_order.extend(players)
+    game.game_started = True
+    tracer.start_hand(channel=channel.id, players=len(players))
+    # 딜러 버튼 회전
+    n = len(game.turn_order)
+    game.dealer_pos = (game.dealer_pos + 1) % n
+
+    # 핸드 배분 (및 플레이어 상태 초기화). 자동 진행 대기 중에 미리 만든 덱/뷰가 있으면 사용
+    prepared, _prepared = _prepared, None
+    uid_name_pairs = [(uid, p.name) for uid, p in players.items() if not is_bot(uid)]
+    if prepared is None or prepared[0] != uid_name_pairs:
+        prepared = None
+    deal_hole()
+    hud_new_hand(game.turn_order)
+    anomaly_event("hand")
+    if tracer.hand:
+        tracer.hand.attrs["deck_seed"] = f"{game.deck_seed:032x}"
+
+    # 블라인드 게시
+    sb_uid, sb_paid, bb_uid, bb_paid = post_blinds()
+    first_to_act_i = game.idx
+
+    # 시작 임베드
+    embed = discord.Embed(title="🃏 텍사스 홀덤 시작!" if table is None else f"🏆 토너먼트 테이블 {table + 1}", color=0x0099ff)
+    embed.add_field(name="참가자", value=", ".join([p.name for p in players.values()]), inline=False)
+    embed.add_field(name="블라인드", value=f"SB {game.sb}, BB {game.bb}" + (f" (레벨 {tourney.level + 1})" if table is not None else ""), inline=True)
+    embed.add_field(name="딜러", value=players[game.turn_order[game.dealer_pos]].name, inline=True)
+    embed.add_field(name="라운드", value="프리플랍", inline=True)
+    await reply(embed=embed)
+
+    if PRERENDER_HOLE_CARDS:
+        spawn(prerender_hole_cards())
+    if game.cfg["live_table"]:
+        # 라이브 테이블: '핸드 보기' 버튼도 테이블 메시지에 달림
+        live_tables[channel.id] = LiveTable(channel, uid_name_pairs)
+    else:
+        # “내 카드 보기” — 모든 플레이어 이름 버튼을 한 메시지에 가로로
+        view = prepared[1] if prepared else MultiPeekCardsView(uid_name_pairs)
+        # [수정] "홀카드" -> "핸드"
+        await channel.send("🎴 **내 핸드 보기** — 자신의 이름 버튼을 눌러 확인하세요!", view=view)
+
+    # 블라인드 안내 + 첫 액터 안내
+    # [수정] 첫 액터를 next_actor_index로 정확히 찾아서 안내
+    real_first_actor_i = next_actor_index(first_to_act_i)
+    if real_first_actor_i is None:
+         # (예: SB, BB가 모두 올인)
+         await table_say(channel,
+            f"🪙 블라인드 게시 — SB: **{players[sb_uid].name}** {sb_paid} (올인), "
+            f"BB: **{players[bb_uid].name}** {bb_paid} (올인)\n"
+            f"🎯 행동할 플레이어가 없습니다. 즉시 다음 스트리트로 넘어갑니다."
+         )
+         await asyncio.sleep(1)
+         await go_next_street(channel)
+         return True
+
+    game.idx = real_first_actor_i # 턴 인덱스 확정
+    first_actor_name = players[game.turn_order[game.idx]].name
+    
+    await table_say(channel,
+        f"🪙 블라인드 게시 — SB: **{players[sb_uid].name}** {sb_paid}, "
+        f"BB: **{players[bb_uid].name}** {bb_paid}\n"
+        f"🎯 프리플랍 선행: **{first_actor_name}**"
+    )
+
+    # 첫 턴 시작
+    await asyncio.sleep(1)
+    await prompt_action(channel)
+    return True
+
+def post_blind(uid: int, amount: int):
+    p = players[uid]
+    pay = min(amount, p.coins)
+    p.coins -= pay
+    p.bet += pay
+    if p.coins == 0: p.all_in = True
+    return pay
+
+def post_blinds():
+    """딜러 위치 기준으로 SB/BB 게시, game.idx = 프리플랍 선행. (sb_uid, sb_paid, bb_uid, bb_paid)"""
+    n = len(game.turn_order)
+    dealer_i = game.dealer_pos
+    sb_i = (dealer_i + 1) % n if n > 2 else dealer_i
+    bb_i = (sb_i + 1) % n if n > 2 else (dealer_i + 1) % n
+    sb_uid = game.turn_order[sb_i]; bb_uid = game.turn_order[bb_i]
+
+    sb_paid = post_blind(sb_uid, game.sb)
+    bb_paid = post_blind(bb_uid, game.bb)
+    game.current_bet = max(bb_paid, sb_paid) # current_bet은 BB 금액
+
+    # 프리플랍 선행 (next_actor_index는 prompt_action에서 처리)
+    game.idx = (bb_i + 1) % n if n > 2 else sb_i
+    return sb_uid, sb_paid, bb_uid, bb_paid
+
+def _eligible_for_next_hand(channel_id):
+    if tourney and tourney.started and tourney.channel_id == channel_id:
+        return len(tourney.stacks) >= 2
+    return len(players) >= 2 and not all(is_bot(uid) for uid in players) # 봇끼리만 남으면 멈춤
+
+def prepare_next_hand():
+    """다음 핸드 인원으로 '내 핸드 보기' 뷰를 미리 만들어 둠 (덱은 deck_pool에서)"""
+    global _prepared
+    if tourney and tourney.started:
+        t = tourney.upcoming_table()
+        pairs = [(uid, tourney.names[uid]) for uid in tourney.tables[t]]
+    else:
+        pairs = [(uid, p.name) for uid, p in players.items() if not is_bot(uid)]
+    _prepared = (pairs, MultiPeekCardsView(pairs))
+
+def schedule_auto_deal(channel):
+    """자동 진행이 켜진 채널이면 대기 후 다음 핸드를 시작하는 태스크를 (다시) 예약"""
+    global _auto_deal_task
+    # 자동 시작한 핸드가 곧바로 끝나면 이 함수가 _auto_deal 태스크 안에서 불릴 수 있음 → 자기 자신은 취소하지 않음
+    if _auto_deal_task and not _auto_deal_task.done() and _auto_deal_task is not asyncio.current_task():
+        _auto_deal_task.cancel()
+    _auto_deal_task = None
+    if channel is None or channel.id not in auto_deal or not _eligible_for_next_hand(channel.id):
+        return
+    _auto_deal_task = spawn(_auto_deal(channel, auto_deal[channel.id]))
+
+def cancel_auto_deal():
+    global _auto_deal_task, _prepared
+    if _auto_deal_task and not _auto_deal_task.done():
+        _auto_deal_task.cancel()
+    _auto_deal_task = None
+    _prepared = None
+
+async def _auto_deal(channel, delay):
+    prepare_next_hand()
+    await channel.send(f"⏭️ {delay}초 후 다음 핸드를 자동으로 시작합니다. (중지: `/자동진행 켜기:False`)")
+    await asyncio.sleep(delay)
+    if game.game_started or channel.id not in auto_deal or not _eligible_for_next_hand(channel.id):
+        return
+
+    async def reply(content=None, *, embed=None, ephemeral=False):
+        await channel.send(content, embed=embed)
+
+    try:
+        await start_hand(channel, reply)
+    except Exception as e:
+        logging.exception(f"자동 진행 실패: {e}")
+
 # ====== 슬래시 커맨드 ======
-@bot.tree.command(name="등록", description="캐릭터 등록 (1000 코인 시작)")
+@bot.tree.command(name="등록", description="캐릭터 등록 (서버 설정의 시작 코인 지급)")
 @app_commands.describe(이름="사용할 캐릭터 이름")
+@interaction_handler("등록")
 async def 등록(inter: discord.Interaction, 이름: str):
     if len(이름) > 20:
-        await inter.response.send_message("이름은 20자 이하로 입력해 주세요!", ephemeral=True); return
+        await respond(inter, "이름은 20자 이하로 입력해 주세요!", ephemeral=True); return
     uid = inter.user.id
-    async with aiosqlite.connect("test.db") as db:
-        cur = await db.execute("SELECT name FROM character WHERE user_id=?", (uid,))
-        row = await cur.fetchone()
-        if row:
-            await inter.response.send_message(f"이미 '{row[0]}'로 등록되어 있어요!", ephemeral=True); return
-        await db.execute("INSERT INTO character (user_id,name,coin,in_game,bet,all_in) VALUES (?,?,?,?,?,?)",
-                         (uid, 이름, 1000, 0, 0, 0))
+    row = await get_character(uid)
+    if row:
+        await respond(inter, f"이미 '{row[0]}'로 등록되어 있어요!", ephemeral=True); return
+    coins = settings.resolve(inter.guild_id, inter.channel_id)["start_coins"]
+    async with db_connect("등록") as db:
+        await db.execute("INSERT INTO character (user_id,name,coin,in_game) VALUES (?,?,?,?)",
+                         (uid, 이름, coins, 0))
         await db.commit()
-    await inter.response.send_message(f"🎉 '{이름}' 등록 완료! 시작 코인 1000", ephemeral=True)
+    char_cache.put(uid, 이름, coins, 0)
+    await respond(inter, f"🎉 '{이름}' 등록 완료! 시작 코인 {coins}", ephemeral=True)
 
 @bot.tree.command(name="조회", description="내 캐릭터 정보 조회")
+@interaction_handler("조회")
 async def 조회(inter: discord.Interaction):
     uid = inter.user.id
-    async with aiosqlite.connect("test.db") as db:
-        cur = await db.execute("SELECT name, coin, in_game FROM character WHERE user_id=?", (uid,))
-        row = await cur.fetchone()
+    row = await get_character(uid)
     if not row:
-        await inter.response.send_message("먼저 `/등록`으로 캐릭터를 만들어줘!", ephemeral=True); return
+        await respond(inter, "먼저 `/등록`으로 캐릭터를 만들어줘!", ephemeral=True); return
     
     name, coin, in_game_db = row
     
@@ -1106,7 +3518,7 @@ async def 조회(inter: discord.Interaction):
     status = "알 수 없음"
     if uid in players:
         status = "게임 참가 중"
-        if game["game_started"]:
+        if game.game_started:
             status = "게임 플레이 중"
         else:
             status = "게임 대기 중"
@@ -1119,306 +3531,669 @@ async def 조회(inter: discord.Interaction):
     embed.add_field(name="이름", value=name, inline=True)
     embed.add_field(name="코인", value=f"{coin:,}개", inline=True)
     embed.add_field(name="상태", value=status, inline=True)
-    await inter.response.send_message(embed=embed, ephemeral=True)
+    await respond(inter, embed=embed, ephemeral=True)
 
 @bot.tree.command(name="참가", description="현재 게임 로비에 참가")
+@interaction_handler("참가")
 async def 참가(inter: discord.Interaction):
-    global players # players 딕셔너리를 수정
-    
-    if game["game_started"]:
-        await inter.response.send_message("이미 게임이 시작되었어요! 다음 게임에 합류해줘요.", ephemeral=True); return
+    if game.game_started:
+        await respond(inter, "이미 게임이 시작되었어요! 다음 게임에 합류해줘요.", ephemeral=True); return
+    if tourney and tourney.started:
+        await respond(inter, "토너먼트 진행 중에는 일반 게임에 참가할 수 없어요.", ephemeral=True); return
     uid = inter.user.id
     
     # 1. 이미 로컬 캐시(players)에 있는가? (정상 참가 상태)
     if uid in players:
-        await inter.response.send_message("이미 참가 중이에요!", ephemeral=True); return
+        await respond(inter, "이미 참가 중이에요!", ephemeral=True); return
     
     # 2. 로컬 캐시(players)에는 없지만, DB에는 있는가? (봇 재시작 복구)
-    async with aiosqlite.connect("test.db") as db:
-        cur_db = await db.execute("SELECT name, coin, in_game FROM character WHERE user_id=?", (uid,))
-        row_db = await cur_db.fetchone()
-        
-        if not row_db:
-            await inter.response.send_message("먼저 `/등록`으로 캐릭터 생성!", ephemeral=True); return
-        
-        name, coin, in_game_db = row_db
-
-        if coin <= 0:
-            await inter.response.send_message("코인이 0이라 참가 불가! (파산)", ephemeral=True)
-            # DB 상태도 0으로 클린
-            if in_game_db == 1:
-                 await db.execute("UPDATE character SET in_game=0 WHERE user_id=?", (uid,))
-                 await db.commit()
-            return
-        
-        # 3. 로컬 캐시에도 없고, DB에도 in_game=0인가? (신규 참가)
-        if in_game_db == 0:
-            players[uid] = {"name": name, "coins": coin, "bet": 0, "contrib": 0, "cards": [], "folded": False, "all_in": False, "afk_kicked": False}
+    row_db = await get_character(uid)
+    if not row_db:
+        await respond(inter, "먼저 `/등록`으로 캐릭터 생성!", ephemeral=True); return
+    
+    name, coin, in_game_db = row_db
+
+    if coin <= 0:
+        await respond(inter, "코인이 0이라 참가 불가! (파산)", ephemeral=True)
+        # DB 상태도 0으로 클린
+        if in_game_db == 1:
+            async with db_connect("참가") as db:
+                await db.execute("UPDATE character SET in_game=0 WHERE user_id=?", (uid,))
+                await db.commit()
+            char_cache.put(uid, name, coin, 0)
+        return
+    
+    # 3. 로컬 캐시에도 없고, DB에도 in_game=0인가? (신규 참가)
+    if in_game_db == 0:
+        players[uid] = Player(name=name, coins=coin)
+        async with db_connect("참가") as db:
             await db.execute("UPDATE character SET in_game=1 WHERE user_id=?", (uid,))
             await db.commit()
-            # [수정] 공개 메시지로 변경
-            await inter.response.send_message(f"✅ **{name}**님이 참가했습니다! (현재 인원 {len(players)}명)")
-        
-        # 4. 로컬 캐시에는 없는데, DB에는 in_game=1인가? (봇 재시작 복구)
-        elif in_game_db == 1:
-            logging.info(f"봇 재시작 복구: {name}({uid}) 님을 로비에 다시 추가합니다.")
-            players[uid] = {"name": name, "coins": coin, "bet": 0, "contrib": 0, "cards": [], "folded": False, "all_in": False, "afk_kicked": False}
-            # DB는 이미 1이므로 건드릴 필요 없음
-            # [수정] 공개 메시지로 변경
-            await inter.response.send_message(f"✅ 봇 재시작 복구 완료! (**{name}**님 참가 처리)\n현재 인원 {len(players)}명")
+        char_cache.put(uid, name, coin, 1)
+        # [수정] 공개 메시지로 변경
+        await respond(inter, f"✅ **{name}**님이 참가했습니다! (현재 인원 {len(players)}명)")
+    
+    # 4. 로컬 캐시에는 없는데, DB에는 in_game=1인가? (봇 재시작 복구)
+    elif in_game_db == 1:
+        logging.info(f"봇 재시작 복구: {name}({uid}) 님을 로비에 다시 추가합니다.")
+        players[uid] = Player(name=name, coins=coin)
+        # DB는 이미 1이므로 건드릴 필요 없음
+        # [수정] 공개 메시지로 변경
+        await respond(inter, f"✅ 봇 재시작 복구 완료! (**{name}**님 참가 처리)\n현재 인원 {len(players)}명")
 
 @bot.tree.command(name="퇴장", description="현재 게임 로비에서 퇴장 (다음 게임부터 미참여)")
+@interaction_handler("퇴장")
 async def 퇴장(inter: discord.Interaction):
     uid = inter.user.id
     if uid not in players:
-        await inter.response.send_message("현재 게임에 참가하지 않았어요.", ephemeral=True); return
+        await respond(inter, "현재 게임에 참가하지 않았어요.", ephemeral=True); return
     
-    if game["game_started"]:
-        await inter.response.send_message("게임 진행 중에는 퇴장할 수 없어요! (AFK 시 자동 퇴장)", ephemeral=True); return
+    if game.game_started:
+        await respond(inter, "게임 진행 중에는 퇴장할 수 없어요! (AFK 시 자동 퇴장)", ephemeral=True); return
     
     # 게임 대기 중일 때만 퇴장 가능
     p = players.pop(uid)
-    name = p["name"]; coin = p["coins"]
+    name = p.name; coin = p.coins
     
-    async with aiosqlite.connect("test.db") as db:
+    async with db_connect("퇴장") as db:
         await db.execute("UPDATE character SET in_game=0, coin=? WHERE user_id=?", (coin, uid))
         await db.commit()
-    await inter.response.send_message(f"🚪 **{name}**님이 퇴장했습니다.")
+    char_cache.put(uid, name, coin, 0)
+    await respond(inter, f"🚪 **{name}**님이 퇴장했습니다.")
+
+@bot.tree.command(name="봇추가", description="연습용 AI 봇을 로비에 추가")
+@app_commands.describe(인원="추가할 봇 수 (1~9, 기본 1)")
+@interaction_handler("봇추가")
+async def 봇추가(inter: discord.Interaction, 인원: app_commands.Range[int, 1, 9] = 1):
+    if game.game_started:
+        await respond(inter, "게임 진행 중에는 봇을 추가할 수 없어요.", ephemeral=True); return
+    if tourney and tourney.started:
+        await respond(inter, "토너먼트 진행 중에는 봇을 추가할 수 없어요.", ephemeral=True); return
+    limit = settings.resolve(inter.guild_id, inter.channel_id)["max_players"]
+    room = limit - len(players)
+    if room <= 0:
+        await respond(inter, f"최대 {limit}명까지 가능해요!", ephemeral=True); return
+
+    added = []
+    for _ in range(min(인원, room)):
+        k = next(k for k in itertools.count(1) if -k not in players)
+        players[-k] = Player(name=f"🤖 봇{k}", coins=BOT_START_COINS)
+        added.append(players[-k].name)
+    await respond(inter, f"🤖 봇 {len(added)}명 추가: {', '.join(added)} (현재 인원 {len(players)}명)")
+
+@bot.tree.command(name="봇제거", description="로비의 AI 봇을 모두 제거")
+@interaction_handler("봇제거")
+async def 봇제거(inter: discord.Interaction):
+    if game.game_started:
+        await respond(inter, "게임 진행 중에는 봇을 제거할 수 없어요.", ephemeral=True); return
+    bots = [uid for uid in players if is_bot(uid)]
+    if not bots:
+        await respond(inter, "로비에 봇이 없어요.", ephemeral=True); return
+    for uid in bots:
+        players.pop(uid)
+    await respond(inter, f"🤖 봇 {len(bots)}명을 제거했습니다. (현재 인원 {len(players)}명)")
 
 @bot.tree.command(name="시작", description="텍사스 홀덤 게임 시작")
+@interaction_handler("시작")
 async def 시작(inter: discord.Interaction):
-    global game # game 딕셔너리 수정
-    
-    if game["game_started"]:
-        await inter.response.send_message("이미 게임이 진행 중이에요!", ephemeral=True); return
-    if len(players) < 2:
-        await inter.response.send_message("최소 2명이 필요해요!", ephemeral=True); return
-    if len(players) > 10:
-        await inter.response.send_message("최대 10명까지 가능해요!", ephemeral=True); return
-
-    game.update({
-        "deck": [], "community": [], "pot": 0, "round": "preflop",
-        "turn_order": list(players.keys()), "idx": 0,
-        "current_bet": 0, "acted": set(), "game_started": True,
-        "last_prompt_msg_id": None, "channel_id": inter.channel_id
-    })
-    # 딜러 버튼 회전
-    n = len(game["turn_order"])
-    game["dealer_pos"] = (game["dealer_pos"] + 1) % n
-
-    # 핸드 배분 (및 플레이어 상태 초기화)
-    deal_hole()
-
-    # 블라인드 게시
-    dealer_i = game["dealer_pos"]
-    sb_i = (dealer_i + 1) % n if n > 2 else dealer_i
-    bb_i = (sb_i + 1) % n if n > 2 else (dealer_i + 1) % n
-    sb_uid = game["turn_order"][sb_i]; bb_uid = game["turn_order"][bb_i]
-
-    def post_blind(uid: int, amount: int):
-        p = players[uid]
-        pay = min(amount, p["coins"])
-        p["coins"] -= pay
-        p["bet"] += pay
-        if p["coins"] == 0: p["all_in"] = True
-        return pay
-
-    sb_paid = post_blind(sb_uid, game["sb"])
-    bb_paid = post_blind(bb_uid, game["bb"])
-    game["current_bet"] = max(bb_paid, sb_paid) # current_bet은 BB 금액
-
-    # 프리플랍 선행
-    first_to_act_i = (bb_i + 1) % n if n > 2 else sb_i
-    game["idx"] = first_to_act_i # next_actor_index는 prompt_action에서 처리
-
-    # 시작 임베드
-    embed = discord.Embed(title="🃏 텍사스 홀덤 시작!", color=0x0099ff)
-    embed.add_field(name="참가자", value=", ".join([p["name"] for p in players.values()]), inline=False)
-    embed.add_field(name="블라인드", value=f"SB {game['sb']}, BB {game['bb']}", inline=True)
-    embed.add_field(name="딜러", value=players[game["turn_order"][game["dealer_pos"]]]["name"], inline=True)
-    embed.add_field(name="라운드", value="프리플랍", inline=True)
-    await inter.response.send_message(embed=embed)
-
-    # “내 카드 보기” — 모든 플레이어 이름 버튼을 한 메시지에 가로로
-    uid_name_pairs = [(uid, p["name"]) for uid, p in players.items()]
-    view = MultiPeekCardsView(uid_name_pairs)
-    # [수정] "홀카드" -> "핸드"
-    await inter.channel.send("🎴 **내 핸드 보기** — 자신의 이름 버튼을 눌러 확인하세요!", view=view)
-
-    # 블라인드 안내 + 첫 액터 안내
-    # [수정] 첫 액터를 next_actor_index로 정확히 찾아서 안내
-    real_first_actor_i = next_actor_index(first_to_act_i)
-    if real_first_actor_i is None:
-         # (예: SB, BB가 모두 올인)
-         await inter.channel.send(
-            f"🪙 블라인드 게시 — SB: **{players[sb_uid]['name']}** {sb_paid} (올인), "
-            f"BB: **{players[bb_uid]['name']}** {bb_paid} (올인)\n"
-            f"🎯 행동할 플레이어가 없습니다. 즉시 다음 스트리트로 넘어갑니다."
-         )
-         await asyncio.sleep(1)
-         await go_next_street(inter.channel)
-         return
-
-    game["idx"] = real_first_actor_i # 턴 인덱스 확정
-    first_actor_name = players[game['turn_order'][game['idx']]]['name']
-    
-    await inter.channel.send(
-        f"🪙 블라인드 게시 — SB: **{players[sb_uid]['name']}** {sb_paid}, "
-        f"BB: **{players[bb_uid]['name']}** {bb_paid}\n"
-        f"🎯 프리플랍 선행: **{first_actor_name}**"
-    )
-
-    # 첫 턴 시작
-    await asyncio.sleep(1)
-    await prompt_action(inter.channel)
+    if game.game_started:
+        await respond(inter, "이미 게임이 진행 중이에요!", ephemeral=True); return
+    if tourney and tourney.started and inter.channel_id != tourney.channel_id:
+        await respond(inter, "토너먼트 진행 중이에요! 토너먼트 채널에서 `/시작`해 주세요.", ephemeral=True); return
+    await start_hand(inter.channel, functools.partial(respond, inter))
+
+@bot.tree.command(name="자동진행", description="핸드가 끝나면 잠시 후 다음 핸드를 자동으로 시작 (이 채널)")
+@app_commands.describe(켜기="자동 진행 여부", 간격=f"다음 핸드까지 대기 시간 (초, 기본 {AUTO_DEAL_DELAY})")
+@interaction_handler("자동진행")
+async def 자동진행(inter: discord.Interaction, 켜기: bool, 간격: Optional[app_commands.Range[int, 3, 120]] = None):
+    if inter.user.id not in players and not inter.user.guild_permissions.administrator:
+        await respond(inter, "참가자나 관리자만 바꿀 수 있어요!", ephemeral=True); return
+    if not 켜기:
+        auto_deal.pop(inter.channel_id, None)
+        if not game.game_started:
+            cancel_auto_deal()
+        await respond(inter, "⏹️ 자동 진행 꺼짐 — 다음 핸드는 `/시작`으로 시작하세요."); return
+    auto_deal[inter.channel_id] = 간격 or AUTO_DEAL_DELAY
+    await respond(inter, f"🔁 자동 진행 켜짐 — 핸드가 끝나면 {auto_deal[inter.channel_id]}초 후 다음 핸드를 시작합니다.")
+    if not game.game_started:
+        schedule_auto_deal(inter.channel)
+
+@bot.tree.command(name="런잇", description="올인 런아웃 때 남은 보드를 여러 번 깔아 팟을 나눔 (이 채널)")
+@app_commands.describe(횟수="보드를 깔 횟수 (1 = 끄기)")
+@interaction_handler("런잇")
+async def 런잇(inter: discord.Interaction, 횟수: app_commands.Range[int, 1, RUN_IT_MAX]):
+    if inter.user.id not in players and not inter.user.guild_permissions.administrator:
+        await respond(inter, "참가자나 관리자만 바꿀 수 있어요!", ephemeral=True); return
+    if 횟수 == 1:
+        run_it.pop(inter.channel_id, None)
+        await respond(inter, "⏹️ 런 잇 꺼짐 — 올인 런아웃은 보드를 한 번만 깝니다."); return
+    run_it[inter.channel_id] = 횟수
+    await respond(inter, f"🔀 런 잇 {RUN_IT_NAMES[횟수]} 켜짐 — 올인 런아웃 때 남은 카드를 {횟수}번 깔고 팟을 나눕니다.")
 
 # [수정] "홀카드" -> "핸드"
 @bot.tree.command(name="내핸드", description="내 핸드 보기 (나만)")
+@interaction_handler("내핸드")
 async def 내핸드(inter: discord.Interaction):
     uid = inter.user.id
     p = players.get(uid)
-    if not p or not p.get("cards"):
-        await inter.response.send_message("아직 카드가 없어요! (게임이 시작되지 않았거나, 참가자가 아님)", ephemeral=True); return
+    if not p or not p.cards:
+        await respond(inter, "아직 카드가 없어요! (게임이 시작되지 않았거나, 참가자가 아님)", ephemeral=True); return
     
-    buf = compose(p["cards"])
-    if buf:
-        # [수정] "홀카드" -> "핸드"
-        await inter.response.send_message("🎴 당신의 핸드:", file=discord.File(buf, filename="my_cards.png"), ephemeral=True)
-    else:
-        await inter.response.send_message("카드 이미지를 생성할 수 없습니다.", ephemeral=True)
+    await send_hole_image(inter, uid, p)
 
 @bot.tree.command(name="상태", description="현재 게임 상태 확인")
+@interaction_handler("상태")
 async def 상태(inter: discord.Interaction):
-    if not game["game_started"]:
+    if not game.game_started:
         if players:
             embed = discord.Embed(title="🎰 게임 대기 중", color=0xffaa00)
             embed.add_field(name="참가자 수", value=f"{len(players)}명", inline=True)
-            embed.add_field(name="참가자", value=", ".join([p["name"] for p in players.values()]), inline=False)
+            embed.add_field(name="참가자", value=", ".join([p.name for p in players.values()]), inline=False)
             embed.add_field(name="게임 시작", value="2명 이상일 때 `/시작`", inline=False)
         else:
             embed = discord.Embed(title="🎰 참가자 없음", color=0x666666)
             embed.description = "`/참가` 명령어로 게임에 참가하세요!"
-        await inter.response.send_message(embed=embed); return
+        await respond(inter, embed=embed); return
 
     embed = discord.Embed(title="🃏 게임 진행 중", color=0x00ff00)
-    embed.add_field(name="라운드", value=game.get("round", "preflop"), inline=True)
-    embed.add_field(name="현재 팟", value=f"{game['pot']} 코인", inline=True)
-    embed.add_field(name="현재 베팅", value=f"{game['current_bet']} 코인", inline=True)
+    embed.add_field(name="라운드", value=game.round, inline=True)
+    embed.add_field(name="현재 팟", value=f"{game.pot} 코인", inline=True)
+    embed.add_field(name="현재 베팅", value=f"{game.current_bet} 코인", inline=True)
     try:
-        dealer_name = players[game["turn_order"][game["dealer_pos"]]]["name"]
+        dealer_name = players[game.turn_order[game.dealer_pos]].name
         embed.add_field(name="딜러", value=dealer_name, inline=True)
-        embed.add_field(name="블라인드", value=f"SB {game['sb']}, BB {game['bb']}", inline=True)
+        embed.add_field(name="블라인드", value=f"SB {game.sb}, BB {game.bb}", inline=True)
     except Exception:
         pass
     
-    if game["idx"] < len(game["turn_order"]):
+    if game.idx < len(game.turn_order):
         try:
-             actor_name = players[game["turn_order"][game["idx"]]]["name"]
+             actor_name = players[game.turn_order[game.idx]].name
              embed.add_field(name="현재 턴", value=actor_name, inline=True)
         except (KeyError, IndexError):
              embed.add_field(name="현재 턴", value="알 수 없음", inline=True)
 
 
     lines = []
-    for uid in game.get("turn_order", []): # 턴 순서대로 표시
+    for uid in game.turn_order: # 턴 순서대로 표시
         p = players.get(uid)
         if not p: continue
         
-        status = "폴드" if p["folded"] else ("올인" if p["all_in"] else f"{p['coins']}코인")
-        bet = f" / 베팅:{p['bet']}" if p["bet"] > 0 else ""
-        contrib = f" / 총액:{p['contrib']}" if p.get("contrib", 0) > 0 else ""
-        lines.append(f"{p['name']}: {status}{bet}{contrib}")
+        status = "폴드" if p.folded else ("올인" if p.all_in else f"{p.coins}코인")
+        bet = f" / 베팅:{p.bet}" if p.bet > 0 else ""
+        contrib = f" / 총액:{p.contrib}" if p.contrib > 0 else ""
+        lines.append(f"{p.name}: {status}{bet}{contrib}")
     
     embed.add_field(name="플레이어 상태", value="\n".join(lines), inline=False)
     
-    if game["community"]:
-        embed.add_field(name="보드 카드", value=f"{' '.join(game['community'])}", inline=False)
-        buf = compose(game["community"])
+    if game.community:
+        embed.add_field(name="보드 카드", value=f"{' '.join(game.community)}", inline=False)
+        await defer(inter) # 보드 이미지 합성은 ACK 뒤에
+        buf = await compose_board_async(game.channel_id, game.community) # 보통은 이번 스트리트에 인코딩해 둔 PNG 재사용
         if buf:
-            await inter.response.send_message(embed=embed, file=discord.File(buf, "board_state.png"))
+            await respond(inter, embed=embed, file=discord.File(buf, "board_state.png"))
             return
 
-    await inter.response.send_message(embed=embed)
+    await respond(inter, embed=embed)
+
+@bot.tree.command(name="랭킹", description="코인 랭킹 (상위 N명)")
+@app_commands.describe(인원="표시할 인원 (1~25, 기본 10)")
+@interaction_handler("랭킹")
+async def 랭킹(inter: discord.Interaction, 인원: app_commands.Range[int, 1, 25] = 10):
+    await defer(inter)
+    # idx_character_coin 인덱스를 역순으로 N개만 읽고, 통계는 PK로 조회
+    async with db_connect("랭킹") as db:
+        cur = await db.execute(
+            "SELECT c.name, c.coin, IFNULL(s.hands_played, 0), IFNULL(s.hands_won, 0), IFNULL(s.biggest_pot, 0) "
+            "FROM character AS c INDEXED BY idx_character_coin "
+            "LEFT JOIN character_stats AS s ON s.user_id = c.user_id "
+            "ORDER BY c.coin DESC LIMIT ?", (인원,))
+        rows = await cur.fetchall()
+    if not rows:
+        await respond(inter, "등록된 캐릭터가 없어요!"); return # 공개 defer 뒤라 ephemeral은 적용되지 않음
+
+    lines = []
+    for rank, (name, coin, played, won, biggest) in enumerate(rows, 1):
+        lines.append(f"**{rank}.** {name} — {coin:,} 코인 (승 {won}/{played}판, 최대 팟 {biggest:,})")
+    embed = discord.Embed(title="🏅 코인 랭킹", description="\n".join(lines), color=0xffd700)
+    await respond(inter, embed=embed)
+
+@bot.tree.command(name="통계", description="HUD 통계 (VPIP/PFR/AF/쇼다운 승률/족보 분포)")
+@app_commands.describe(유저="볼 유저 (생략하면 나)")
+@interaction_handler("통계")
+async def 통계(inter: discord.Interaction, 유저: Optional[discord.User] = None):
+    target = 유저 or inter.user
+    st = await hud_get(target.id)
+    if st.hands == 0:
+        await respond(inter, "아직 기록된 핸드가 없어요.", ephemeral=True); return
+    pct = lambda a, b: f"{a / b:.1%}" if b else "-"
+    af = f"{st.aggr / st.calls:.2f}" if st.calls else ("∞" if st.aggr else "-")
+    embed = discord.Embed(title=f"📈 {getattr(target, 'display_name', target.name)} HUD", color=0x9b59b6)
+    embed.add_field(name="핸드", value=f"{st.hands:,}", inline=True)
+    embed.add_field(name="VPIP", value=pct(st.vpip, st.hands), inline=True)
+    embed.add_field(name="PFR", value=pct(st.pfr, st.hands), inline=True)
+    embed.add_field(name="AF (벳·레이즈/콜)", value=af, inline=True)
+    embed.add_field(name="쇼다운 승률", value=f"{pct(st.sd_wins, st.showdowns)} ({st.sd_wins}/{st.showdowns})", inline=True)
+    dist = [f"{hand_name((c,))}: {n} ({n / st.showdowns:.0%})" for c, n in reversed(list(enumerate(st.classes))) if n]
+    if dist:
+        embed.add_field(name="쇼다운 족보", value="\n".join(dist), inline=False)
+    await respond(inter, embed=embed, ephemeral=True)
+
+@bot.tree.command(name="토너먼트개설", description="이 채널에 토너먼트 개설 (관리자)")
+@app_commands.describe(바이인="참가비 (코인)", 시작칩="시작 칩", 테이블인원="테이블당 최대 인원",
+                       레벨간격="블라인드 레벨업 간격 (핸드 수, 시간제면 분)", 시간제="레벨업을 시간(분) 기준으로")
+@interaction_handler("토너먼트개설")
+async def 토너먼트개설(inter: discord.Interaction, 바이인: app_commands.Range[int, 0, 100000] = 100,
+                  시작칩: app_commands.Range[int, 100, 1000000] = 1500, 테이블인원: app_commands.Range[int, 3, 10] = 9,
+                  레벨간격: app_commands.Range[int, 1, 120] = 10, 시간제: bool = False):
+    global tourney
+    if not inter.user.guild_permissions.administrator:
+        await respond(inter, "관리자만 가능!", ephemeral=True); return
+    if tourney:
+        await respond(inter, "이미 토너먼트가 있어요! (`/토너먼트현황`)", ephemeral=True); return
+    tourney = Tournament(channel_id=inter.channel_id, buy_in=바이인, start_stack=시작칩, table_size=테이블인원,
+                         level_minutes=레벨간격 if 시간제 else 0, level_hands=레벨간격)
+    save_tourney()
+    every = f"{레벨간격}분" if 시간제 else f"테이블당 {레벨간격}핸드"
+    await respond(inter,
+        f"🏆 토너먼트 개설! 바이인 {바이인:,} 코인, 시작 칩 {시작칩:,}, 테이블당 {테이블인원}명, 블라인드 {every}마다 상승\n"
+        f"최대 {tourney.capacity()}명 (테이블 {TOURNEY_MAX_TABLES}개까지 — 이 채널에서 테이블들이 한 핸드씩 돌아가며 진행)\n"
+        f"`/토너먼트등록`으로 참가하세요!")
+
+@bot.tree.command(name="토너먼트등록", description="개설된 토너먼트에 바이인하고 등록")
+@interaction_handler("토너먼트등록")
+async def 토너먼트등록(inter: discord.Interaction):
+    uid = inter.user.id
+    if not tourney or tourney.started:
+        await respond(inter, "등록 중인 토너먼트가 없어요.", ephemeral=True); return
+    if uid in tourney.names:
+        await respond(inter, "이미 등록했어요!", ephemeral=True); return
+    if len(tourney.names) >= tourney.capacity():
+        await respond(inter, f"정원({tourney.capacity()}명)이 찼어요!", ephemeral=True); return
+    row = await get_character(uid)
+    if not row:
+        await respond(inter, "먼저 `/등록`으로 캐릭터 생성!", ephemeral=True); return
+    name, coin, in_game = row
+    if uid in players:
+        await respond(inter, "일반 게임 로비에서 `/퇴장`한 뒤 등록해 주세요.", ephemeral=True); return
+    if coin < tourney.buy_in:
+        await respond(inter, f"코인이 부족해요! (바이인 {tourney.buy_in:,})", ephemeral=True); return
+    if tourney.buy_in:
+        await _credit_coins([(uid, -tourney.buy_in)], "tourney_buy_in")
+    tourney.names[uid] = name
+    tourney.stacks[uid] = tourney.start_stack
+    save_tourney()
+    await respond(inter, f"✅ **{name}**님 토너먼트 등록! (현재 {len(tourney.names)}명)")
+
+@bot.tree.command(name="토너먼트시작", description="등록을 마감하고 테이블 배정 후 토너먼트 시작 (관리자)")
+@interaction_handler("토너먼트시작")
+async def 토너먼트시작(inter: discord.Interaction):
+    if not inter.user.guild_permissions.administrator:
+        await respond(inter, "관리자만 가능!", ephemeral=True); return
+    if not tourney or tourney.started:
+        await respond(inter, "시작할 토너먼트가 없어요.", ephemeral=True); return
+    if len(tourney.names) < 2:
+        await respond(inter, "최소 2명이 등록해야 해요!", ephemeral=True); return
+    if game.game_started or players:
+        await respond(inter, "일반 게임 로비가 비어 있어야 해요! (진행 중인 게임 종료 후 `/퇴장`)", ephemeral=True); return
+    tourney.seat_all()
+    tourney.started = True
+    tourney.level_ts = time.time()
+    save_tourney()
+    sb, bb = tourney.blinds()
+    lines = [f"테이블 {t + 1}: " + ", ".join(tourney.names[uid] for uid in seats) for t, seats in enumerate(tourney.tables)]
+    await respond(inter,
+        f"🏆 토너먼트 시작! {len(tourney.names)}명, 테이블 {len(tourney.tables)}개, 블라인드 {sb}/{bb}\n"
+        + "\n".join(lines) + "\n\n`/시작`으로 테이블 1부터 한 핸드씩 돌아가며 진행합니다.")
+
+@bot.tree.command(name="토너먼트현황", description="토너먼트 레벨/테이블/칩 현황")
+@interaction_handler("토너먼트현황")
+async def 토너먼트현황(inter: discord.Interaction):
+    if not tourney:
+        await respond(inter, "진행 중인 토너먼트가 없어요.", ephemeral=True); return
+    if not tourney.started:
+        names = ", ".join(tourney.names.values()) or "-"
+        await respond(inter, f"🏆 등록 중 ({len(tourney.names)}명): {names}", ephemeral=True); return
+    sb, bb = tourney.blinds()
+    if tourney.level_minutes:
+        left = tourney.level_minutes * 60 - (time.time() - tourney.level_ts)
+        next_level = f"{max(0, int(left)) // 60}분 {max(0, int(left)) % 60}초 후"
+    else:
+        next_level = f"테이블당 {tourney.level_hands - tourney.hands_in_level}핸드 후"
+    embed = discord.Embed(title="🏆 토너먼트 현황", color=0xffcc00)
+    embed.add_field(name="레벨", value=f"{tourney.level + 1} (SB {sb} / BB {bb})", inline=True)
+    embed.add_field(name="다음 레벨", value=next_level, inline=True)
+    embed.add_field(name="생존", value=f"{len(tourney.stacks)} / {len(tourney.names)}명", inline=True)
+    for t, seats in enumerate(tourney.tables[:20]): # 임베드 필드 25개 제한
+        value = "\n".join(f"{tourney.names[uid]}: {tourney.stacks[uid]:,}" for uid in seats)
+        embed.add_field(name=f"테이블 {t + 1}", value=value[:1024] or "-", inline=True)
+    await respond(inter, embed=embed)
+
+@bot.tree.command(name="토너먼트취소", description="토너먼트 취소 및 바이인 환불 (관리자)")
+@interaction_handler("토너먼트취소")
+async def 토너먼트취소(inter: discord.Interaction):
+    global tourney
+    if not inter.user.guild_permissions.administrator:
+        await respond(inter, "관리자만 가능!", ephemeral=True); return
+    if not tourney:
+        await respond(inter, "진행 중인 토너먼트가 없어요.", ephemeral=True); return
+    if tourney_hand_live() and game.game_started:
+        await respond(inter, "핸드 진행 중이에요! 끝난 뒤(또는 `/강제종료` 후) 취소해 주세요.", ephemeral=True); return
+    if tourney.buy_in:
+        await _credit_coins([(uid, tourney.buy_in) for uid in tourney.names], "tourney_refund")
+    n = len(tourney.names)
+    tourney = None
+    save_tourney()
+    await respond(inter, f"🛑 토너먼트 취소, {n}명에게 바이인 환불 (관리자: {inter.user.name})")
+
+@bot.tree.command(name="설정", description="서버/테이블 설정 변경, 다음 핸드부터 적용 (관리자)")
+@app_commands.describe(항목="바꿀 설정", 값="새 값 (생략하면 지워서 상위 설정을 따름)", 테이블만="이 채널에만 적용 (기본: 서버 전체)")
+@app_commands.choices(항목=[app_commands.Choice(name=v[3], value=k) for k, v in SETTINGS.items()])
+@interaction_handler("설정")
+async def 설정(inter: discord.Interaction, 항목: str, 값: Optional[float] = None, 테이블만: bool = False):
+    if not inter.user.guild_permissions.administrator:
+        await respond(inter, "관리자만 가능!", ephemeral=True); return
+    default, lo, hi, desc = SETTINGS[항목]
+    if 값 is not None:
+        if not lo <= 값 <= hi:
+            await respond(inter, f"{desc}: {lo}~{hi} 사이로 입력해 주세요.", ephemeral=True); return
+        if isinstance(default, int):
+            if 값 != int(값):
+                await respond(inter, f"{desc}: 정수로 입력해 주세요.", ephemeral=True); return
+            값 = int(값)
+        cfg = {**settings.resolve(inter.guild_id, inter.channel_id), 항목: 값}
+        if cfg["bb"] < cfg["sb"]:
+            await respond(inter, "빅 블라인드는 스몰 블라인드 이상이어야 해요.", ephemeral=True); return
+    await settings.set(inter.guild_id, inter.channel_id if 테이블만 else 0, 항목, 값)
+    now = settings.resolve(inter.guild_id, inter.channel_id)[항목]
+    scope = "이 테이블" if 테이블만 else "서버 전체"
+    msg = f"⚙️ {scope} **{desc}** {'초기화' if 값 is None else '변경'} → 현재 값 **{now}**"
+    if game.game_started:
+        msg += " (진행 중인 핸드는 그대로, 다음 핸드부터 적용)"
+    await respond(inter, msg)
+
+@bot.tree.command(name="설정보기", description="이 테이블에 적용되는 설정 보기")
+@interaction_handler("설정보기")
+async def 설정보기(inter: discord.Interaction):
+    cfg = settings.resolve(inter.guild_id, inter.channel_id)
+    lines = [f"{desc}: **{cfg[k]}** ({settings.source(inter.guild_id, inter.channel_id, k)})"
+             for k, (_, _, _, desc) in SETTINGS.items()]
+    await respond(inter, "⚙️ **테이블 설정**\n" + "\n".join(lines), ephemeral=True)
+
+@bot.tree.command(name="워치독", description="이벤트 루프 정지 감시 켜기/끄기 (관리자)")
+@app_commands.describe(켜기="감시 여부", 임계값="정지로 판단할 시간 (ms, 생략 시 유지)")
+@interaction_handler("워치독")
+async def 워치독(inter: discord.Interaction, 켜기: bool, 임계값: Optional[app_commands.Range[int, 20, 10000]] = None):
+    if not inter.user.guild_permissions.administrator:
+        await respond(inter, "관리자만 가능!", ephemeral=True); return
+    if 켜기:
+        watchdog.enable(임계값 / 1000 if 임계값 else None)
+    else:
+        watchdog.disable()
+    state = "켜짐" if watchdog.enabled else "꺼짐"
+    await respond(inter, f"🐶 워치독 {state} (임계값 {watchdog.threshold * 1000:.0f}ms)", ephemeral=True)
 
 @bot.tree.command(name="강제종료", description="게임 강제 종료 및 로비 초기화 (관리자)")
+@interaction_handler("강제종료")
 async def 강제종료(inter: discord.Interaction):
-    global game, players
-
     if not inter.user.guild_permissions.administrator:
-        await inter.response.send_message("관리자만 가능!", ephemeral=True); return
+        await respond(inter, "관리자만 가능!", ephemeral=True); return
     
-    if not game["game_started"] and not players:
-         await inter.response.send_message("진행 중인 게임이나 대기 중인 플레이어가 없어요.", ephemeral=True); return
+    if not game.game_started and not players:
+         await respond(inter, "진행 중인 게임이나 대기 중인 플레이어가 없어요.", ephemeral=True); return
     
-    channel_id = game.get("channel_id") or inter.channel_id
+    channel_id = game.channel_id or inter.channel_id
     channel = bot.get_channel(channel_id)
 
     if channel:
         await disable_prev_prompt(channel) # 이전 프롬프트 정리
             
-    # DB에 모든 플레이어(players 캐시 기준)를 'in_game=0'으로 설정
-    async with aiosqlite.connect("test.db") as db:
+    if tourney_hand_live():
+        # 토너먼트 핸드는 무효 처리 (칩은 핸드 시작 전으로, 코인/in_game은 건드리지 않음)
+        tourney.live_table = None
+        save_tourney()
+    else:
+        # DB에 모든 플레이어(players 캐시 기준)를 'in_game=0'으로 설정
+        async with db_connect("강제종료") as db:
+            for uid, p in players.items():
+                if is_bot(uid): continue
+                await db.execute("UPDATE character SET coin=?, in_game=0 WHERE user_id=?", (p.coins, uid))
+            await db.commit()
         for uid, p in players.items():
-            await db.execute("UPDATE character SET coin=?, in_game=0, bet=0, all_in=0 WHERE user_id=?", (p["coins"], uid))
-        await db.commit()
+            if not is_bot(uid): char_cache.put(uid, p.name, p.coins, 0)
 
     # 메모리 초기화
-    players = {}
-    game = {
-        "deck": [], "community": [], "pot": 0, "round": None,
-        "turn_order": [], "idx": 0, "current_bet": 0, "acted": set(),
-        "game_started": False, "last_prompt_msg_id": None, "channel_id": channel_id,
-        "dealer_pos": -1, "sb": 10, "bb": 20,
-        "timer_task": None, "deadline_ts": None,
-    }
+    cancel_auto_deal()
+    await close_live_table(game.channel_id)
+    tracer.end_hand(aborted=True)
+    players.clear()
+    game.reset(channel_id=channel_id, dealer_pos=-1)
+    clear_snapshot()
             
-    await inter.response.send_message(f"🛑 게임 강제 종료 및 로비 초기화 (관리자: {inter.user.name})")
+    await respond(inter, f"🛑 게임 강제 종료 및 로비 초기화 (관리자: {inter.user.name})")
 
 
-def _progress_bar(seconds_left: int, total: int = 120, width: int = 12) -> str:
+def _progress_bar(seconds_left: int, total: int, width: int = 12) -> str:
     seconds_left = max(0, min(total, seconds_left))
     elapsed = total - seconds_left
     filled = int(round(elapsed / total * width))
     return "█" * filled + "░" * (width - filled)
 
-async def _run_countdown(msg: discord.Message, base_text: str, deadline_ts: int):
+async def _run_countdown(msg: Optional[discord.Message], base_text: str, deadline_ts: int, actor_id: int):
+    """턴 타이머 (테이블당 하나): 5초마다 진행바 갱신, 마감되면 자동 폴드. msg가 None이면(라이브 테이블) 갱신 없이 마감만"""
+    tracer.detach() # 진행바 편집은 이 태스크를 만든 핸들러가 아니라 핸드 루트에 기록
+    editing = msg is not None
     try:
         while True:
-            await asyncio.sleep(5)  # 5초 간격 갱신
+            now = int(datetime.utcnow().timestamp())
+            left = max(0, deadline_ts - now)
+            if left == 0:
+                break
+            await asyncio.sleep(min(5, left))  # 5초 간격 갱신
             now = int(datetime.utcnow().timestamp())
             left = max(0, deadline_ts - now)
             
             # 턴이 이미 넘어갔는지 (deadline_ts가 바뀌었는지)
-            if game.get("deadline_ts") != deadline_ts:
+            if game.deadline_ts != deadline_ts:
                  logging.debug("카운트다운: 턴이 이미 넘어감, 중지")
                  return
 
-            bar = _progress_bar(left, 120) # 120초 기준
+            if not editing:
+                continue
+            bar = _progress_bar(left, game.cfg["turn_seconds"])
             extra = f"\n⏳ 마감: <t:{deadline_ts}:R> (<t:{deadline_ts}:T>)\n`[{bar}] {left}s`"
             
             try:
                 await msg.edit(content=base_text + extra)
             except discord.NotFound:
-                 logging.debug("카운트다운 편집 실패 (메시지 삭제됨), 중지")
-                 return
+                 logging.debug("카운트다운 편집 실패 (메시지 삭제됨), 편집 중지")
+                 editing = False
             except Exception as e:
                 logging.debug(f"카운트다운 편집 실패: {e}")
-                return # 편집 실패 시 루프 중단
-                
-            if left == 0:
-                logging.debug("카운트다운 0초 도달, 종료")
-                return
+                editing = False # 편집은 중단하되 마감 처리는 계속
             
     except asyncio.CancelledError:
         logging.debug("카운트다운 작업 취소됨")
-        pass
+        return
     except Exception as e:
         logging.exception(f"카운트다운 루프 에러: {e}")
+        return
 
+    # 마감 도달 → 자동 폴드
+    if game.deadline_ts != deadline_ts:
+        return
+    logging.info(f"턴 타임아웃: {actor_id} (ts={deadline_ts})")
+    if game.timer_task is asyncio.current_task():
+        game.timer_task = None # disable_prev_prompt가 자기 자신을 취소/대기하지 않도록
+    try:
+        await handle_afk_fold(actor_id)
+    except Exception as e:
+        logging.exception(f"자동 폴드 처리 에러: {e}")
+
+
+
+# ====== 오프라인 시뮬레이션 ======
+# python poker.py simulate --hands 1000000 --seats bot,bot,bot,call,random,afk
+# Discord 없이 같은 게임 로직(post_blinds, 베팅 순서, deal_next_street, settle_showdown)을 돌림.
+# 워커 프로세스마다 자기 players/game을 쓰고, 핸드 결과는 out/hands-<chunk>.jsonl로 바로 흘려 씀
+SIM_POLICIES = ("bot", "call", "random", "afk")
+
+def _sim_act(uid, policy, rng):
+    p = players[uid]
+    need = max(0, game.current_bet - p.bet)
+    if policy == "bot":
+        bot_step(uid); return
+    if policy == "afk": # 턴 시간 초과와 같음 (실제 게임이면 다음 핸드에서 제외)
+        p.afk_kicked = True
+        apply_action(uid, "fold"); return
+    if policy == "random": # benchmarks/_fakes.random_policy와 같은 분포
+        r = rng.random()
+        if need > 0 and r < 0.15:
+            apply_action(uid, "fold"); return
+        if r < 0.3 and p.coins > need:
+            apply_action(uid, "raise", max(game.bb, 40)); return
+    apply_action(uid, "call" if need > 0 else "check")
+
+def _sim_betting_round(seats, rng):
+    """advance_or_next_round와 같은 순서로 한 스트리트 베팅. 한 명만 남으면 False"""
+    idx = next_actor_index(game.idx)
+    while idx is not None:
+        game.idx = idx
+        uid = game.turn_order[idx]
+        _sim_act(uid, seats[uid], rng)
+        if sum(1 for p in players.values() if not p.folded) <= 1:
+            return False
+        if ready_to_advance():
+            break
+        idx = next_actor_index(idx + 1)
+    return True
 
+def simulate_hand(seats, rng, sb, bb):
+    """players에 앉은 seats {uid: 정책}으로 한 핸드를 끝까지 진행. 핸드 결과 dict"""
+    start = {uid: p.coins for uid, p in players.items()}
+    game.reset()
+    game.sb, game.bb = sb, bb
+    game.round = "preflop"
+    game.turn_order.extend(players)
+    game.game_started = True
+    game.dealer_pos = (game.dealer_pos + 1) % len(game.turn_order)
+    deal_hole(rng.getrandbits(128))
+    post_blinds()
+
+    showdown, betting = False, True
+    while True:
+        if betting and not _sim_betting_round(seats, rng):
+            # handle_single_winner와 같음: 남은 베팅까지 모아서 승자에게
+            for p in players.values():
+                game.pot += p.bet; p.contrib += p.bet; p.bet = 0
+            winner = next(uid for uid, p in players.items() if not p.folded)
+            players[winner].coins += game.pot
+            break
+        street = deal_next_street()
+        if street is None:
+            raise RuntimeError("덱 카드 부족")
+        if street == "showdown":
+            settle_showdown()
+            showdown = True
+            break
+        # go_next_street와 같음: 행동할 사람이 1명 이하면(리버 제외) 베팅 없이 다음 카드
+        can = sum(1 for uid in game.turn_order if can_act(uid))
+        betting = can >= 2 or (can == 1 and game.round == "river")
+    result = {"seed": f"{game.deck_seed:032x}", "dealer": game.turn_order[game.dealer_pos], "pot": game.pot,
+              "round": game.round, "showdown": showdown,
+              "delta": {uid: p.coins - start[uid] for uid, p in players.items()}}
+    game.reset()
+    return result
+
+def _sim_chunk(args):
+    """워커 프로세스에서 실행: hands개 핸드를 진행하고 좌석별 집계를 반환"""
+    chunk, hands, seed, seats_cfg, stack, sb, bb, out_dir = args
+    rng = random.Random(seed)
+    _bot_rng.seed(rng.getrandbits(64))
+    players.clear()
+    game.reset(dealer_pos=-1)
+    seats = {}
+    for i, policy in enumerate(seats_cfg, 1):
+        players[i] = Player(name=f"{policy}{i}", coins=stack)
+        seats[i] = policy
+    agg = {"hands": 0, "showdowns": 0, "pot_sum": 0, "rounds": {},
+           "net": {i: 0 for i in seats}, "won": {i: 0 for i in seats}, "rebuys": {i: 0 for i in seats}}
+    with open(os.path.join(out_dir, f"hands-{chunk:05d}.jsonl"), "w", encoding="utf-8") as f:
+        for h in range(hands):
+            for uid, p in players.items():
+                if p.coins < bb: # 파산 → 시작 칩으로 리바이 (순손익은 net에 이미 반영됨)
+                    p.coins = stack
+                    agg["rebuys"][uid] += 1
+            r = simulate_hand(seats, rng, sb, bb)
+            agg["hands"] += 1
+            agg["showdowns"] += r["showdown"]
+            agg["pot_sum"] += r["pot"]
+            agg["rounds"][r["round"]] = agg["rounds"].get(r["round"], 0) + 1
+            for uid, d in r["delta"].items():
+                agg["net"][uid] += d
+                if d > 0: agg["won"][uid] += 1
+            r["hand"] = chunk * hands + h
+            f.write(json.dumps(r, separators=(",", ":")) + "\n")
+    return agg
+
+def run_simulation(argv):
+    import argparse
+    from concurrent.futures import ProcessPoolExecutor
+    ap = argparse.ArgumentParser(prog="python poker.py simulate", description="Discord 없이 핸드를 대량으로 돌려 칩 흐름 집계")
+    ap.add_argument("--hands", type=int, default=100_000)
+    ap.add_argument("--seats", default="bot,bot,bot,bot,bot,bot", help=f"좌석별 정책 (쉼표 구분, {'/'.join(SIM_POLICIES)})")
+    ap.add_argument("--stack", type=int, default=1000, help="시작 칩 (파산하면 이 금액으로 리바이)")
+    ap.add_argument("--sb", type=int, default=10)
+    ap.add_argument("--bb", type=int, default=20)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunk", type=int, default=2000, help="워커에 한 번에 맡길 핸드 수")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default="sim_out", help="핸드별 결과(JSONL) 디렉터리")
+    args = ap.parse_args(argv)
+    seats = args.seats.split(",")
+    if not 2 <= len(seats) <= 10 or any(s not in SIM_POLICIES for s in seats):
+        ap.error(f"--seats: 2~10개, 정책은 {', '.join(SIM_POLICIES)}")
+    logging.getLogger().setLevel(logging.WARNING)
+    os.makedirs(args.out, exist_ok=True)
+
+    n_chunks = -(-args.hands // args.chunk)
+    tasks = [(c, min(args.chunk, args.hands - c * args.chunk), args.seed * 1_000_003 + c, seats,
+              args.stack, args.sb, args.bb, args.out) for c in range(n_chunks)]
+    total = {"hands": 0, "showdowns": 0, "pot_sum": 0, "rounds": {},
+             "net": dict.fromkeys(range(1, len(seats) + 1), 0), "won": dict.fromkeys(range(1, len(seats) + 1), 0),
+             "rebuys": dict.fromkeys(range(1, len(seats) + 1), 0)}
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as ex:
+        for agg in ex.map(_sim_chunk, tasks):
+            for k in ("hands", "showdowns", "pot_sum"):
+                total[k] += agg[k]
+            for k in ("net", "won", "rebuys"):
+                for uid, v in agg[k].items():
+                    total[k][uid] += v
+            for r, v in agg["rounds"].items():
+                total["rounds"][r] = total["rounds"].get(r, 0) + v
+            el = time.perf_counter() - t0
+            print(f"\r{total['hands']:,}/{args.hands:,} 핸드 ({total['hands'] / el:,.0f} hands/s)", end="", flush=True)
+    elapsed = time.perf_counter() - t0
+
+    n = total["hands"]
+    print(f"\n\n{n:,} 핸드, {elapsed:.1f}s, {n / elapsed:,.0f} hands/s (워커 {args.workers}개)")
+    print(f"평균 팟 {total['pot_sum'] / n:.1f}, 쇼다운 {total['showdowns'] / n:.1%}, 끝난 스트리트 "
+          + ", ".join(f"{r} {total['rounds'].get(r, 0) / n:.1%}" for r in ("preflop", "flop", "turn", "river")))
+    print(f"\n{'좌석':<6}{'정책':<8}{'순손익':>12}{'bb/100':>10}{'핸드 승':>10}{'리바이':>8}")
+    for uid, policy in enumerate(seats, 1):
+        net = total["net"][uid]
+        print(f"{uid:<6}{policy:<8}{net:>12,}{net / args.bb / n * 100:>10.2f}{total['won'][uid] / n:>10.1%}{total['rebuys'][uid]:>8}")
+    print(f"\n핸드별 결과: {os.path.join(args.out, 'hands-*.jsonl')}")
+
+
+STARTUP_SECONDS.observe(time.perf_counter() - _BOOT_TS, "import") # 모듈 로드 (discord 등 import 포함)
 
 # ====== 실행부: 환경변수에서 토큰 읽기 ======
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["simulate"]:
+        run_simulation(sys.argv[2:])
+        sys.exit(0)
     token = os.getenv("TOKEN")
     if not token:
         try:
@@ -0,0 +1,110 @@
+"""헤즈업 프리플랍 올인 승률표(169x169) 생성 → preflop_equity.bin
+
+    python tools/gen_preflop_equity.py                    # 기본: 클래스 쌍마다 4000회, 전체 코어
+    python tools/gen_preflop_equity.py --samples 10000    # 저장소의 preflop_equity.bin (1코어 ~40분)
+
+클래스 순서는 poker.hand_class와 같은 13x13 격자 (행/열 A..2, 대각선 페어, 위쪽 수티드, 아래쪽 오프수트).
+표[a][b] = 클래스 a가 클래스 b를 상대로 이길 확률(무승부는 절반) x 10000. 구체적인 카드 조합은
+매 샘플마다 두 클래스에서 겹치지 않게 무작위로 골라 평균을 냄 (표[b][a] = 10000 - 표[a][b]).
+
+평가는 poker.rank7 (비트마스크 평가기, 카드 = 랭크*4 + 무늬)로 하고, 시작할 때 hand_strength와 승패 판정이
+같은지 무작위 핸드로 검증한다.
+"""
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from poker import CARD_INDEX, hand_strength, rank7  # noqa: E402
+
+MAGIC = b"PFEQ"
+VERSION = 1
+N = 169
+
+
+def class_combos():
+    """클래스 인덱스 순서대로 [(c1, c2), ...] 구체적인 조합 목록"""
+    out = []
+    for i in range(13):
+        for j in range(13):
+            hi, lo = 12 - min(i, j), 12 - max(i, j)
+            if i == j:
+                combos = [(hi * 4 + a, hi * 4 + b) for a, b in combinations(range(4), 2)]
+            elif i < j: # 수티드
+                combos = [(hi * 4 + s, lo * 4 + s) for s in range(4)]
+            else:
+                combos = [(hi * 4 + a, lo * 4 + b) for a in range(4) for b in range(4) if a != b]
+            out.append(combos)
+    return out
+
+
+def _verify(n=20000):
+    names = sorted(CARD_INDEX, key=CARD_INDEX.get)
+    rng = random.Random(0)
+    for _ in range(n):
+        cards = rng.sample(range(52), 9)
+        a, b = cards[:2] + cards[4:], cards[2:4] + cards[4:]
+        mine = (rank7(a) > rank7(b)) - (rank7(a) < rank7(b))
+        sa, sb = hand_strength([names[c] for c in a]), hand_strength([names[c] for c in b])
+        ref = (sa > sb) - (sa < sb)
+        if mine != ref:
+            raise SystemExit(f"평가기 불일치: {[names[c] for c in a]} vs {[names[c] for c in b]}")
+
+
+def _row(args):
+    a, samples, seed = args
+    combos = class_combos()
+    rng = random.Random(seed)
+    deck = list(range(52))
+    row = []
+    for b in range(a + 1, N):
+        ca, cb = combos[a], combos[b]
+        win = 0
+        done = 0
+        while done < samples:
+            h1 = rng.choice(ca); h2 = rng.choice(cb)
+            if h1[0] in h2 or h1[1] in h2: continue
+            used = {h1[0], h1[1], h2[0], h2[1]}
+            board = []
+            while len(board) < 5:
+                c = deck[int(rng.random() * 52)]
+                if c not in used:
+                    used.add(c); board.append(c)
+            x = rank7((h1[0], h1[1], *board)); y = rank7((h2[0], h2[1], *board))
+            win += 2 if x > y else 1 if x == y else 0
+            done += 1
+        row.append(round(win * 5000 / samples))
+    return a, row
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--samples", type=int, default=4000, help="클래스 쌍마다 샘플 수")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--seed", type=int, default=169)
+    ap.add_argument("--out", default=os.path.join(ROOT, "preflop_equity.bin"))
+    args = ap.parse_args()
+    _verify()
+
+    table = [[5000] * N for _ in range(N)] # 같은 클래스끼리는 대칭이라 50%
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as ex:
+        for k, (a, row) in enumerate(ex.map(_row, [(a, args.samples, args.seed + a) for a in range(N)]), 1):
+            for b, v in enumerate(row, a + 1):
+                table[a][b] = v
+                table[b][a] = 10000 - v
+            print(f"\r{k}/{N} ({time.perf_counter() - t0:.0f}s)", end="", flush=True)
+    with open(args.out, "wb") as f:
+        f.write(MAGIC + struct.pack("<HH", VERSION, N))
+        f.write(struct.pack(f"<{N * N}H", *(v for row in table for v in row)))
+    print(f"\n{args.out}: {os.path.getsize(args.out):,} bytes")
+
+
+if __name__ == "__main__":
+    main()